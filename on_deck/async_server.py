@@ -0,0 +1,354 @@
+"""
+asyncio serving mode of the scoreboard server, with the same routes as
+on_deck_server. Requests wait on Redis without holding a thread, so a
+slow client or hundreds of idle /stream connections cost a socket each
+instead of a worker thread each.
+
+    python -m on_deck.async_server
+
+Needs aiohttp. The async Redis client comes with redis-py and all
+requests share its connection pool.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List, Tuple
+
+import redis.asyncio as aioredis
+from aiohttp import web
+
+from on_deck.startup import timer
+from on_deck.statsapi_standin import install_from_env
+from on_deck.tracing import TRACE_KEY
+from on_deck.metrics import KEY_PREFIX, render_prometheus
+from on_deck import profiler
+from on_deck.stream_hub import AsyncStreamHub, KEEPALIVE, KEEPALIVE_EVENT, RESYNC, snapshot_event
+from on_deck.frame_snapshot import FRAME_ETAG_KEY, FRAME_KEY
+from on_deck.server_cache import AsyncSingleFlightCache, build_game, encode_json, is_set
+
+REDIS_IP = '10.0.1.10'
+PORT = 8889
+
+# Connections in the shared Redis pool
+MAX_CONNECTIONS = 32
+
+
+def _matches_etag(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return ('*' in tags) or (f'"{etag}"' in tags) or (f'W/"{etag}"' in tags)
+
+
+def _json_response(data, mimetype: str = 'application/json') -> web.Response:
+    return web.Response(body=json.dumps(data, indent=4), status=200, content_type=mimetype)
+
+
+class AsyncServer:
+    """
+    Server for the scoreboard on asyncio. See on_deck_server.Server for
+    what every route does.
+
+    Args:
+        redis_client (redis.asyncio.Redis): Client to use, for example
+            an AsyncLocalRedis. Defaults to a pooled client of the
+            scoreboard's Redis server
+    """
+    def __init__(self, redis_client: aioredis.Redis = None):
+        if redis_client is None:
+            pool = aioredis.ConnectionPool(host=REDIS_IP, port=6379, db=0,
+                max_connections=MAX_CONNECTIONS)
+            redis_client = aioredis.Redis(connection_pool=pool)
+        self.redis = redis_client
+        self._home_cache: dict = None
+        self._games = AsyncSingleFlightCache(build_game)
+        self.stream_hub = AsyncStreamHub(self.redis)
+        self._frame: Tuple[str, bytes] = None
+
+        self.app = web.Application()
+        self.app.router.add_get('/', self.home)
+        self.app.router.add_get('/reboot', self.reboot)
+        self.app.router.add_get('/settings', self.settings)
+        self.app.router.add_get('/s', self.settings)
+        self.app.router.add_get(r'/{gamepk:\d+}', self.gamepk)
+        self.app.router.add_get('/gamecast', self.gamecast)
+        self.app.router.add_get('/stream', self.stream)
+        self.app.router.add_get('/frame.png', self.frame)
+        self.app.router.add_get('/trace', self.trace)
+        self.app.router.add_get('/metrics', self.metrics)
+        self.app.router.add_get('/profile', self.profile)
+
+
+    async def _home_games(self) -> dict:
+        version, num_games = await self.redis.mget('games_version', 'num_games')
+        cache = self._home_cache
+        if (version is not None) and (cache is not None) and (cache['version'] == version):
+            return cache
+
+        if num_games is None:
+            games = {}
+        else:
+            keys = [str(i) for i in range(int(num_games))]
+            values = await self.redis.mget(keys) if keys else []
+            games = [json.loads(game) for game in values if game is not None]
+
+        cache = {'version': version, 'games': games, 'bodies': {}}
+        if version is not None:
+            self._home_cache = cache
+        return cache
+
+
+    async def home(self, request: web.Request) -> web.Response:
+        compact = is_set(request.query.get('compact'))
+        gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+
+        cache = await self._home_games()
+        body = cache['bodies'].get((compact, gzipped))
+        if body is None:
+            body = cache['bodies'][(compact, gzipped)] = encode_json(cache['games'], compact,
+                gzipped)
+        body, etag = body
+
+        headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding'}
+        if _matches_etag(request.headers.get('If-None-Match', ''), etag):
+            return web.Response(status=304, headers=headers)
+        if gzipped:
+            headers['Content-Encoding'] = 'gzip'
+        return web.Response(body=body, status=200, content_type='application/json',
+            headers=headers)
+
+
+    async def reboot(self, request: web.Request) -> web.Response:
+        sys.stdout.flush()
+        await asyncio.get_running_loop().run_in_executor(None, os.system, 'sudo reboot')
+        return web.Response(status=200)
+
+
+    async def _set_and_publish(self, key: str, value):
+        await self.redis.set(key, value)
+        await self.redis.publish(key, value)
+
+
+    async def _parse_mode(self, mode: str):
+        if mode is None:
+            return
+        if mode in ('overview', '0'):
+            mode = 'overview'
+        elif mode in ('gamecast', '1'):
+            mode = 'gamecast'
+        else:
+            return
+        await self._set_and_publish('mode', mode)
+
+
+    async def _parse_delay(self, delay: str):
+        if delay is None:
+            return
+        if delay[0] in ('p', 'm'):
+            old_delay = int(await self.redis.get('delay'))
+            delay_delta = int(delay[1:])
+            delay = old_delay + delay_delta if delay[0] == 'p' else old_delay - delay_delta
+        delay = max(0, int(delay))
+        await self._set_and_publish('delay', delay)
+
+
+    async def _parse_brightness(self, brightness: str):
+        if brightness is None:
+            return
+        brightness = int(brightness)
+        if not (0 <= brightness <= 7):
+            return
+        await self._set_and_publish('brightness', brightness)
+
+
+    async def _parse_gamecast_id(self, gamecast_id: str):
+        if gamecast_id is None:
+            return
+        gamecast_id = int(gamecast_id)
+        max_gamecast_id = int(await self.redis.get('num_games')) - 1
+        if not (0 <= gamecast_id <= max_gamecast_id):
+            return
+        await self._set_and_publish('gamecast_id', gamecast_id)
+
+
+    async def _parse_profile(self, seconds: str, process: str = None) -> int:
+        if seconds is None:
+            return None
+        request_data = {'seconds': float(seconds), 'process': process}
+        return await self.redis.publish(profiler.PROFILE_CHANNEL, json.dumps(request_data))
+
+
+    async def settings(self, request: web.Request) -> web.Response:
+        query = request.query
+        delay = query.get('delay', query.get('d'))
+        brightness = query.get('brightness', query.get('b'))
+        gamecast_id = query.get('gamecast_id', query.get('id'))
+
+        await self._parse_mode(query.get('mode'))
+        await self._parse_delay(delay)
+        await self._parse_brightness(brightness)
+        await self._parse_gamecast_id(gamecast_id)
+        await self._parse_profile(query.get('profile'))
+
+        mode, delay, brightness, gamecast_id, num_games = await self.redis.mget(
+            'mode', 'delay', 'brightness', 'gamecast_id', 'num_games')
+
+        return_dict = {
+            'mode': mode.decode('utf-8') if mode is not None else None,
+            'delay': int(delay) if delay is not None else None,
+            'brightness': int(brightness) if brightness is not None else None,
+            'gamecast_id': int(gamecast_id) if gamecast_id is not None else None,
+            'num_games': int(num_games) if num_games is not None else None,
+        }
+        return _json_response(return_dict, 'text/plain')
+
+
+    async def _tracked_game(self, gamepk: int) -> str:
+        gamepks = await self.redis.get('gamepks')
+        if gamepks is None:
+            return None
+        gamepks = json.loads(gamepks)
+        if gamepk not in gamepks:
+            return None
+        game = await self.redis.get(str(gamepks.index(gamepk)))
+        if game is None:
+            return None
+        return json.dumps(json.loads(game), indent=4)
+
+
+    async def gamepk(self, request: web.Request) -> web.Response:
+        gamepk = int(request.match_info['gamepk'])
+        game = await self._tracked_game(gamepk)
+        if game is None:
+            game = await self._games.get(gamepk)
+        return web.Response(text=game, status=200, content_type='text/plain')
+
+
+    async def gamecast(self, request: web.Request) -> web.Response:
+        gamecast_game = json.loads(await self.redis.get('gamecast'))
+        if is_set(request.query.get('reset')):
+            await self.redis.publish('gamecast_reset', 'gamecast_reset')
+        return _json_response(gamecast_game, 'text/plain')
+
+
+    async def _stream_snapshot(self) -> bytes:
+        gamecast_game = await self.redis.get('gamecast')
+        snapshot = {
+            'games': (await self._home_games())['games'],
+            'gamecast': json.loads(gamecast_game) if gamecast_game is not None else None,
+        }
+        return json.dumps(snapshot, separators=(',', ':')).encode('utf-8')
+
+
+    async def stream(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(status=200, headers={
+            'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'})
+        await response.prepare(request)
+
+        client = await self.stream_hub.subscribe()
+        try:
+            await response.write(snapshot_event(await self._stream_snapshot()))
+            while True:
+                try:
+                    event = await asyncio.wait_for(client.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    event = KEEPALIVE_EVENT
+                if event is RESYNC:
+                    await self.stream_hub.resubscribe()
+                    event = snapshot_event(await self._stream_snapshot())
+                await response.write(event)
+        except ConnectionResetError:
+            pass
+        finally:
+            self.stream_hub.unsubscribe(client)
+        return response
+
+
+    async def frame(self, request: web.Request) -> web.Response:
+        etag = await self.redis.get(FRAME_ETAG_KEY)
+        if etag is None:
+            return web.Response(text='No frame yet', status=404, content_type='text/plain')
+
+        frame = self._frame
+        if (frame is None) or (frame[0] != etag.decode('utf-8')):
+            etag, png = await self.redis.mget(FRAME_ETAG_KEY, FRAME_KEY)
+            frame = self._frame = (etag.decode('utf-8'), png)
+
+        headers = {'ETag': f'"{frame[0]}"', 'Cache-Control': 'max-age=1'}
+        if _matches_etag(request.headers.get('If-None-Match', ''), frame[0]):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=frame[1], status=200, content_type='image/png', headers=headers)
+
+
+    async def trace(self, request: web.Request) -> web.Response:
+        stats = await self.redis.get(TRACE_KEY)
+        if stats is None:
+            return _json_response({})
+        stats = json.loads(stats)
+        stats['age'] = round(time.time() - stats['time'], 1)
+        return _json_response(stats)
+
+
+    async def _load_all(self, prefix: str) -> List[dict]:
+        keys = sorted(await self.redis.keys(f'{prefix}*'))
+        if not keys:
+            return []
+        return [json.loads(value) for value in await self.redis.mget(keys) if value is not None]
+
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        snapshots = await self._load_all(KEY_PREFIX)
+        return web.Response(text=render_prometheus(snapshots), status=200,
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+
+    async def profile(self, request: web.Request) -> web.Response:
+        query = request.query
+        seconds = query.get('seconds')
+        process = query.get('process')
+        top = int(query.get('top', 30))
+
+        if seconds is not None:
+            listeners = await self._parse_profile(seconds, process)
+            return _json_response({
+                'seconds': min(float(seconds), profiler.MAX_SECONDS),
+                'process': process,
+                'listeners': listeners,
+            })
+
+        if process is not None:
+            value = await self.redis.get(f'{profiler.RESULT_PREFIX}{process}')
+            results = [json.loads(value)] if value is not None else []
+        else:
+            results = await self._load_all(profiler.RESULT_PREFIX)
+
+        if query.get('format') == 'collapsed':
+            text = ''.join(profiler.collapsed(result) for result in results)
+            return web.Response(text=text, status=200, content_type='text/plain')
+
+        for result in results:
+            result['age'] = round(time.time() - result['time'], 1)
+            result['functions'] = result['functions'][:top]
+            del result['stacks']
+        return _json_response(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='asyncio server for the scoreboard')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args()
+
+    timer.mark('imports')
+    install_from_env()
+    server = AsyncServer()
+    timer.mark('app init')
+    timer.report()
+    web.run_app(server.app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
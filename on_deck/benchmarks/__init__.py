@@ -0,0 +1,176 @@
+"""
+Micro benchmarks for the display's hot paths. Each module can be run on
+its own, for example:
+    python -m on_deck.benchmarks.game_model
+
+or all of them together, writing the results as JSON:
+    python -m on_deck.benchmarks --output results.json
+"""
+
+import copy
+import os
+import random
+import timeit
+from typing import Callable, List
+
+# Time on_deck's own drawing, not the emulator's, unless another matrix
+# backend is asked for
+os.environ.setdefault('ON_DECK_MATRIX', 'null')
+
+
+def best_time(func: Callable[[], None], number: int, repeat: int = 5,
+        setup: Callable[[], None] = None) -> float:
+    """
+    Returns the fastest time of one call out of repeat runs of number
+    calls.
+
+    Args:
+        func (Callable[[], None]): Function to time
+        number (int): Calls per run
+        repeat (int): Number of runs
+        setup (Callable[[], None]): Called before every run, not timed
+
+    Returns:
+        float: Seconds per call
+    """
+    return min(timeit.repeat(func, setup=setup or 'pass', number=number, repeat=repeat)) / number
+
+
+def null_display():
+    """
+    Returns a DisplayManager for the main board that draws onto the
+    null matrix backend's canvas instead of a matrix or emulator.
+
+    Returns:
+        DisplayManager: Display manager without a matrix behind it
+    """
+    # Only needed here, the matrix library is slow to load
+    from on_deck import display_manager, null_matrix
+    from on_deck.layout import load_layout
+
+    options = load_layout('main').matrix_options(True)
+    matrix = display_manager.RGBMatrix
+    display_manager.RGBMatrix = null_matrix.RGBMatrix
+    try:
+        return display_manager.DisplayManager(options)
+    finally:
+        display_manager.RGBMatrix = matrix
+
+
+def _team(abv: str, runs: int) -> dict:
+    return {
+        'abv': abv, 'name': abv.title(), 'runs': runs, 'hits': 7, 'errors': 0,
+        'left_on_base': 4, 'xba': 0.251, 'xslg': 0.402, 'abs_challenges': 2, 'challenges': 1,
+    }
+
+
+_GAMECAST = {
+    'gamepk': 745123,
+    'game_state': 'L',
+    'start_time': '7:05',
+    'inning': 7,
+    'inning_state': 'T',
+    'runners': 5,
+    'away': _team('CLE', 3),
+    'home': _team('TEX', 11),
+    'count': {'balls': 2, 'strikes': 1, 'outs': 1},
+    'flags': {'no_hitter': False, 'perfect_game': False},
+    'umpire': {'num_missed': 4, 'total_calls': 120, 'home_favor': -0.35, 'home_wpa': 0.021},
+    'run_expectancy': {'average_runs': 0.87, 'to_score': 0.41},
+    'win_probability': {'away': 0.31, 'home': 0.69},
+    'pitch_details': {
+        'type': 'Slider', 'at_bat_pitch_count': 4, 'speed': 86.4, 'pitch_hand': 'R',
+        'break_horizontal': -5.2, 'break_vertical_induced': 1.4, 'zone': 12,
+        'umpire_missed_call': False,
+    },
+    'hit_details': {
+        'exit_velo': 101.2, 'launch_angle': 24.0, 'xba': 0.61, 'xslg': 1.4, 'distance': 380.0,
+    },
+    'batting_order': {
+        'at_bat_index': 3,
+        'batting_order': [
+            {'last_name': f'Player{i}', 'position': 'SS', 'slg': '.400', 'ops': '.750',
+                'scorebook': None}
+            for i in range(9)
+        ],
+    },
+    'matchup': {
+        'pitcher': {
+            'name': 'Eovaldi', 'era': '3.21', 'innings_pitched': '6.1', 'hits_allowed': 5,
+            'runs_allowed': 2, 'strike_outs': 7, 'walks': 1, 'pitches': 88, 'strikes': 55,
+        },
+    },
+    'pitch_counts': {
+        'Four-Seam Fastball': {'total': 40, 'strikes': 26, 'avg_speed': 95.1},
+        'Slider': {'total': 22, 'strikes': 15, 'avg_speed': 86.0},
+        'Changeup': {'total': 9, 'strikes': 5, 'avg_speed': 88.3},
+    },
+}
+
+
+def sample_gamecast() -> dict:
+    """
+    Returns a live gamecast game in the wire format. Overview games use
+    the same format.
+
+    Returns:
+        dict: New copy of the sample game
+    """
+    return copy.deepcopy(_GAMECAST)
+
+
+def sample_deltas(count: int = 500, seed: int = 0) -> List[dict]:
+    """
+    Returns gamecast deltas shaped like the ones the fetcher publishes
+    during a live game, mostly pitch by pitch count and pitch detail
+    updates with the occasional pitch type appearing or disappearing.
+
+    Args:
+        count (int): Number of deltas
+        seed (int): Random seed, the same seed gives the same deltas
+
+    Returns:
+        List[dict]: Deltas in publish order
+    """
+    rng = random.Random(seed)
+    pitch_types = ('Four-Seam Fastball', 'Slider', 'Changeup', 'Sinker', 'Cutter')
+    deltas = []
+    pitches = 88
+
+    for _ in range(count):
+        pitches += 1
+        pitch_type = rng.choice(pitch_types)
+        speed = round(rng.uniform(80, 99), 1)
+        delta = {
+            'count': {'balls': rng.randint(0, 3), 'strikes': rng.randint(0, 2)},
+            'pitch_details': {
+                'type': pitch_type, 'speed': speed, 'zone': rng.randint(1, 14),
+                'break_horizontal': round(rng.uniform(-15, 15), 1),
+                'break_vertical_induced': round(rng.uniform(-10, 20), 1),
+                'at_bat_pitch_count': rng.randint(1, 8),
+            },
+            'matchup': {'pitcher': {'pitches': pitches, 'strikes': pitches * 2 // 3}},
+            'pitch_counts': {pitch_type: {
+                'total': pitches // 3, 'strikes': pitches // 5, 'avg_speed': speed}},
+        }
+
+        roll = rng.random()
+        if roll < 0.05:
+            delta['pitch_counts'][rng.choice(pitch_types)] = None
+        elif roll < 0.2:
+            delta['runners'] = rng.randint(0, 7)
+            delta['count']['outs'] = rng.randint(0, 2)
+            delta['batting_order'] = {'at_bat_index': rng.randint(1, 9)}
+            delta['hit_details'] = {
+                'exit_velo': round(rng.uniform(60, 115), 1),
+                'launch_angle': round(rng.uniform(-20, 50), 1),
+                'distance': round(rng.uniform(10, 450), 1),
+            }
+        elif roll < 0.25:
+            delta['away' if rng.random() < 0.5 else 'home'] = {
+                'runs': rng.randint(0, 12), 'hits': rng.randint(0, 15),
+            }
+            delta['win_probability'] = {'away': 0.4, 'home': 0.6}
+        deltas.append(delta)
+
+    return deltas
@@ -0,0 +1,105 @@
+"""
+Runs every benchmark and writes the results as JSON so runs from
+different commits can be compared.
+
+    python -m on_deck.benchmarks --output results.json
+    python -m on_deck.benchmarks --only display,wire --compare results.json
+
+The fetch benchmark needs recorded Stats API fixtures and only runs when
+--fixtures and --date are given.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+SUITES = ('game_model', 'merge_patch', 'display', 'wire', 'serve', 'frame_codec', 'fetch')
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suites(names, fixtures: str = None, date: str = None) -> dict:
+    """
+    Runs benchmark modules and collects their results.
+
+    Args:
+        names (Iterable[str]): Modules in on_deck.benchmarks to run
+        fixtures (str): Stats API fixtures directory for fetch
+        date (str): Date of the fixtures for fetch
+
+    Returns:
+        dict: Results of every module, or the error it failed with
+    """
+    results = {}
+    for name in names:
+        if (name == 'fetch') and (fixtures is None or date is None):
+            continue
+        print(f'Running {name}', file=sys.stderr)
+        try:
+            module = importlib.import_module(f'on_deck.benchmarks.{name}')
+            if name == 'fetch':
+                results[name] = module.run(fixtures, date)
+            else:
+                results[name] = module.run()
+        except Exception as e:
+            results[name] = {'error': f'{type(e).__name__}: {e}'}
+    return results
+
+
+def compare(results: dict, baseline: dict):
+    """
+    Prints how much every result changed from a baseline run.
+
+    Args:
+        results (dict): Results of this run
+        baseline (dict): Results of the baseline run
+    """
+    for suite, values in results.items():
+        old_values = baseline.get(suite, {})
+        for name, value in values.items():
+            old = old_values.get(name)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old * 100
+            print(f'{suite + "." + name:<48} {old:10.2f} {value:10.2f} {change:+7.1f}%')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the on_deck benchmarks')
+    parser.add_argument('--only', help='comma separated modules to run, default all')
+    parser.add_argument('--output', help='file to write the results to, default stdout')
+    parser.add_argument('--compare', help='results file of an earlier run to compare to')
+    parser.add_argument('--fixtures', help='Stats API fixtures directory for fetch')
+    parser.add_argument('--date', help='date of the fixtures, YYYY-MM-DD')
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else SUITES
+    report = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': run_suites(names, args.fixtures, args.date),
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report['results'], json.load(f)['results'])
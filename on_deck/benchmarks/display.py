@@ -0,0 +1,82 @@
+"""
+Times the display side of an update: patching a game with
+recursive_update, drawing it with Overview.print_game and
+Gamecast.print_game, and the DisplayManager drawing primitives. Drawing
+goes to the null matrix backend so only on_deck's own work is timed.
+Set ON_DECK_MATRIX to time it with another backend's graphics instead.
+
+    python -m on_deck.benchmarks.display
+"""
+
+import copy
+
+from on_deck.benchmarks import best_time, sample_deltas, sample_gamecast, null_display
+from on_deck.colors import Colors
+from on_deck.game_model import GamecastGame, OverviewGame
+from on_deck.gamecast import Gamecast
+from on_deck.on_deck_display import get_changed_paths, recursive_update
+from on_deck.overview import Overview
+
+
+def run() -> dict:
+    """
+    Runs the benchmark.
+
+    Returns:
+        dict: Microseconds per call
+    """
+    results = {}
+    display = null_display()
+
+    deltas = sample_deltas()
+    state = {}
+
+    def setup():
+        state['game'] = sample_gamecast()
+        state['deltas'] = copy.deepcopy(deltas)
+
+    def update_all():
+        game = state['game']
+        for delta in state['deltas']:
+            recursive_update(game, delta)
+    results['recursive_update_us'] = best_time(
+        update_all, 1, repeat=7, setup=setup) / len(deltas) * 1e6
+
+    def changed_paths_all():
+        for delta in deltas:
+            get_changed_paths(delta)
+    results['get_changed_paths_us'] = best_time(changed_paths_all, 3) / len(deltas) * 1e6
+
+    overview = Overview(display)
+    overview_game = OverviewGame.from_dict(sample_gamecast())
+    results['overview_print_game_us'] = best_time(
+        lambda: overview.print_game(overview_game, 0), 200) * 1e6
+
+    gamecast = Gamecast(display)
+    gamecast_game = GamecastGame.from_dict(sample_gamecast())
+    results['gamecast_print_game_full_us'] = best_time(
+        lambda: gamecast.print_game(gamecast_game), 20) * 1e6
+
+    # A pitch usually changes the count, the pitch details and the
+    # pitcher's totals
+    pitch_paths = get_changed_paths(deltas[0])
+    results['gamecast_print_game_pitch_us'] = best_time(
+        lambda: gamecast.print_game(gamecast_game, pitch_paths), 100) * 1e6
+
+    results['draw_circle_us'] = best_time(
+        lambda: display.draw_circle(10, 10, 6, 1, False, Colors.red), 200) * 1e6
+    results['draw_circle_filled_us'] = best_time(
+        lambda: display.draw_circle(10, 10, 6, 1, True, Colors.red), 200) * 1e6
+    results['draw_diamond_us'] = best_time(
+        lambda: display.draw_diamond(30, 30, 6, 1, False, Colors.red), 500) * 1e6
+    results['draw_diamond_filled_us'] = best_time(
+        lambda: display.draw_diamond(30, 30, 6, 1, True, Colors.red), 500) * 1e6
+    results['clear_section_us'] = best_time(
+        lambda: display.clear_section(0, 0, 127, 63), 200) * 1e6
+
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:<32} {value:10.2f}')
@@ -0,0 +1,92 @@
+"""
+Measures how the fetcher scales with the number of games by running
+what Fetcher.initialize_games and Fetcher.update_games do against the
+local Stats API stand-in, so the numbers only depend on the fixtures and
+the injected latency, not on the network.
+
+    python -m on_deck.benchmarks.fetch fixtures/2024-05-29 2024-05-29 [--latency 0.05]
+
+The fixtures are recorded with on_deck.statsapi_standin --record while
+a fetcher runs for that date.
+"""
+
+import argparse
+import time
+from typing import Sequence
+
+from on_deck.statsapi_standin import StandinServer, use_standin
+
+
+def run(fixtures: str, date: str, game_counts: Sequence[int] = (1, 5, 15),
+        latency: float = 0.0, updates: int = 3) -> dict:
+    """
+    Runs the benchmark.
+
+    Args:
+        fixtures (str): Fixtures directory
+        date (str): Date the fixtures were recorded for, YYYY-MM-DD
+        game_counts (Sequence[int]): Numbers of games to fetch. Counts
+            above the number of games on the date are capped
+        latency (float): Seconds the stand-in adds to every response
+        updates (int): Update passes over the games after initializing
+
+    Returns:
+        dict: Seconds and requests per game for every game count
+    """
+    standin = StandinServer(fixtures, port=0, latency=latency)
+    use_standin(standin.start())
+
+    # Only importable once the stand-in is running, at_bat may make
+    # requests when it is imported
+    from at_bat import statsapi_plus as ssp
+    from at_bat.scoreboard_data import ScoreboardData
+
+    results = {}
+    try:
+        gamepks = ssp.get_daily_gamepks(date)
+        for count in game_counts:
+            count = min(count, len(gamepks))
+            if count == 0:
+                continue
+            standin.reset()
+
+            start = time.perf_counter()
+            games = [ScoreboardData(gamepk, 0) for gamepk in gamepks[:count]]
+            for game in games:
+                game.to_dict()
+            initialize = time.perf_counter() - start
+            initialize_requests = standin.stats['requests']
+
+            start = time.perf_counter()
+            for _ in range(updates):
+                for game in games:
+                    game.update_return_difference(0)
+            update = (time.perf_counter() - start) / max(updates, 1)
+
+            results[f'{count}_games'] = {
+                'initialize_s_per_game': initialize / count,
+                'update_s_per_game': update / count,
+                'initialize_requests_per_game': initialize_requests / count,
+                'update_requests_per_game':
+                    (standin.stats['requests'] - initialize_requests) / max(updates, 1) / count,
+                'missing_fixtures': standin.stats['missing'],
+            }
+    finally:
+        standin.stop()
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the fetcher against the stand-in')
+    parser.add_argument('fixtures', help='fixtures directory')
+    parser.add_argument('date', help='date the fixtures were recorded for, YYYY-MM-DD')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--updates', type=int, default=3)
+    args = parser.parse_args()
+
+    for name, result in run(args.fixtures, args.date, latency=args.latency,
+            updates=args.updates).items():
+        print(name)
+        for key, value in result.items():
+            print(f'    {key:<32} {value:10.4f}')
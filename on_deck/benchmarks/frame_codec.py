@@ -0,0 +1,172 @@
+"""
+Compares the frame codecs of on_deck.frame_codec on the frames of a
+gamecast session: bytes per frame against a raw frame, and encode and
+decode time. zlib on the XOR delta is timed too as a yardstick.
+
+    python -m on_deck.benchmarks.frame_codec [--recording game.odr]
+
+Without a recording the session is the sample game with sample_deltas.
+A recording from on_deck.recorder is drawn message by message instead,
+the gamecast messages with Gamecast.print_game and the game channels
+with Overview.print_game.
+"""
+
+import argparse
+import copy
+import json
+import zlib
+from typing import List
+
+from on_deck.benchmarks import best_time, null_display, sample_deltas, sample_gamecast
+from on_deck.frame_codec import apply_spans, apply_xor, encode_spans, encode_xor
+from on_deck.game_model import GamecastGame, OverviewGame
+from on_deck.gamecast import Gamecast
+from on_deck.on_deck_display import get_changed_paths
+from on_deck.overview import Overview
+from on_deck.recorder import KEY, read_recording
+
+NUM_FRAMES = 300
+
+
+def session_frames(recording: str = None, count: int = NUM_FRAMES) -> List[bytes]:
+    """
+    Draws a gamecast session on the null matrix backend.
+
+    Args:
+        recording (str): Recording to draw, None draws the sample game
+        count (int): Most frames to draw
+
+    Returns:
+        List[bytes]: Framebuffer after every swap
+    """
+    display = null_display()
+    gamecast = Gamecast(display)
+    overview = Overview(display)
+    frames = []
+
+    def swap():
+        display.swap_frame()
+        frames.append(bytes(display.canvas.buffer))
+
+    if recording is None:
+        game = GamecastGame.from_dict(sample_gamecast())
+        games = [OverviewGame.from_dict(sample_gamecast()) for _ in range(6)]
+        gamecast.print_game(game)
+        for i, overview_game in enumerate(games):
+            overview.print_game(overview_game, i)
+        swap()
+        for i, delta in enumerate(sample_deltas(count - 1)):
+            game = GamecastGame.merge(game, copy.deepcopy(delta))
+            gamecast.print_game(game, get_changed_paths(delta))
+            games[i % 6] = OverviewGame.merge(games[i % 6], copy.deepcopy(delta))
+            overview.print_game(games[i % 6], i % 6)
+            swap()
+        return frames
+
+    game = None
+    games = {}
+    for entry in read_recording(recording):
+        if len(frames) >= count:
+            break
+        data = json.loads(entry.data) if entry.data[:1] == b'{' else None
+        if data is None:
+            continue
+
+        if entry.kind == KEY:
+            if entry.channel == b'gamecast':
+                game = GamecastGame.from_dict(data)
+            elif entry.channel.isdigit():
+                games[int(entry.channel)] = OverviewGame.from_dict(data)
+            continue
+
+        if (entry.channel == b'gamecast') and (game is not None):
+            game = GamecastGame.merge(game, data)
+            gamecast.print_game(game, get_changed_paths(data))
+        elif entry.channel.isdigit() and (int(entry.channel) in games):
+            game_id = int(entry.channel)
+            games[game_id] = OverviewGame.merge(games[game_id], data)
+            overview.print_game(games[game_id], game_id % 6)
+        else:
+            continue
+        swap()
+    return frames
+
+
+def run(recording: str = None) -> dict:
+    """
+    Runs the benchmark.
+
+    Args:
+        recording (str): Recording to draw, None draws the sample game
+
+    Returns:
+        dict: Bytes per delta frame, raw bytes over encoded bytes and
+            microseconds per frame
+    """
+    results = {}
+    frames = session_frames(recording)
+    if len(frames) < 2:
+        raise ValueError('The session has fewer than 2 frames')
+    display = null_display()
+    width, height = display.matrix.width, display.matrix.height
+    raw = len(frames[0])
+    pairs = list(zip(frames, frames[1:]))
+    results['frames'] = len(frames)
+    results['raw_bytes'] = raw
+
+    for name, encode, apply in (('spans', encode_spans, apply_spans),
+            ('xor', encode_xor, apply_xor)):
+        messages = [encode(previous, frame, width, height, i)
+            for i, (previous, frame) in enumerate(pairs)]
+        size = sum(len(message) for message in messages) / len(messages)
+        results[f'{name}_bytes'] = size
+        results[f'{name}_ratio'] = raw / size
+        results[f'{name}_keyframe_bytes'] = len(encode(None, frames[-1], width, height, 0))
+
+        def encode_all():
+            for i, (previous, frame) in enumerate(pairs):
+                encode(previous, frame, width, height, i)
+        results[f'{name}_encode_us'] = best_time(encode_all, 1) / len(pairs) * 1e6
+
+        buffer = bytearray(frames[0])
+
+        def setup():
+            buffer[:] = frames[0]
+
+        def decode_all():
+            for message in messages:
+                apply(message, buffer)
+        results[f'{name}_decode_us'] = best_time(
+            decode_all, 1, setup=setup) / len(messages) * 1e6
+        if bytes(buffer) != frames[-1]:
+            raise AssertionError(f'{name} did not decode to the last frame')
+
+    deltas = [encode_xor(previous, frame, width, height, 0) for previous, frame in pairs]
+    compressed = [zlib.compress(delta, 1) for delta in deltas]
+    results['xor_zlib_bytes'] = sum(len(c) for c in compressed) / len(compressed)
+    results['xor_zlib_ratio'] = raw / results['xor_zlib_bytes']
+
+    # Inflating is only half of decoding, the delta is applied after
+    target = bytearray(frames[0])
+
+    def reset():
+        target[:] = frames[0]
+
+    def decode_compressed():
+        for c in compressed:
+            apply_xor(zlib.decompress(c), target)
+    results['xor_zlib_decode_us'] = best_time(
+        decode_compressed, 1, setup=reset) / len(compressed) * 1e6
+    if bytes(target) != frames[-1]:
+        raise AssertionError('xor_zlib did not decode to the last frame')
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the frame codecs')
+    parser.add_argument('--recording', help='recording to draw instead of the sample game')
+    args = parser.parse_args()
+
+    for name, value in run(args.recording).items():
+        print(f'{name:<24} {value:12.2f}')
@@ -0,0 +1,133 @@
+"""
+Compares the slotted game records with the nested dicts they replace:
+memory per game, the cost of reading every field a gamecast frame
+reads, building a game from the wire format and applying a delta.
+
+    python -m on_deck.benchmarks.game_model
+"""
+
+import copy
+import gc
+import json
+import tracemalloc
+
+from on_deck.benchmarks import best_time, sample_gamecast
+from on_deck.game_model import GamecastGame
+from on_deck.merge_patch import GAME_PATCH
+
+DELTA = {
+    'count': {'balls': 3, 'strikes': 2},
+    'pitch_details': {'speed': 97.8, 'zone': 3, 'type': 'Sinker'},
+    'pitch_counts': {'Sinker': {'total': 1, 'strikes': 1, 'avg_speed': 97.8}, 'Changeup': None},
+    'matchup': {'pitcher': {'pitches': 89, 'strikes': 56}},
+}
+
+
+def _read_dict(game: dict):
+    away = game['away']
+    home = game['home']
+    for team in (away, home):
+        (team['abv'], team['runs'], team['hits'], team['errors'], team['left_on_base'],
+            team['xba'], team['xslg'], team['abs_challenges'], team['challenges'])
+    count = game['count']
+    (game['inning'], game['inning_state'], game['runners'],
+        count.get('balls'), count.get('strikes'), count.get('outs'))
+    umpire = game['umpire']
+    (umpire['num_missed'], umpire['total_calls'], umpire['home_favor'], umpire['home_wpa'])
+    pitch = game['pitch_details']
+    (pitch['type'], pitch['at_bat_pitch_count'], pitch['speed'], pitch['pitch_hand'],
+        pitch['break_horizontal'], pitch['break_vertical_induced'], pitch['zone'],
+        pitch['umpire_missed_call'])
+    hit = game['hit_details']
+    (hit['exit_velo'], hit['launch_angle'], hit['xba'], hit['xslg'], hit['distance'])
+    for batter in game['batting_order']['batting_order']:
+        (batter['last_name'], batter['position'], batter['ops'], batter['scorebook'])
+    pitcher = game['matchup']['pitcher']
+    (pitcher['name'], pitcher['era'], pitcher['innings_pitched'], pitcher['hits_allowed'],
+        pitcher['runs_allowed'], pitcher['strike_outs'], pitcher['walks'], pitcher['pitches'],
+        pitcher['strikes'])
+    for count in game['pitch_counts'].values():
+        (count['total'], count['strikes'], count['avg_speed'])
+
+
+def _read_model(game: GamecastGame):
+    away = game.away
+    home = game.home
+    for team in (away, home):
+        (team.abv, team.runs, team.hits, team.errors, team.left_on_base,
+            team.xba, team.xslg, team.abs_challenges, team.challenges)
+    count = game.count
+    (game.inning, game.inning_state, game.runners, count.balls, count.strikes, count.outs)
+    umpire = game.umpire
+    (umpire.num_missed, umpire.total_calls, umpire.home_favor, umpire.home_wpa)
+    pitch = game.pitch_details
+    (pitch.type, pitch.at_bat_pitch_count, pitch.speed, pitch.pitch_hand,
+        pitch.break_horizontal, pitch.break_vertical_induced, pitch.zone,
+        pitch.umpire_missed_call)
+    hit = game.hit_details
+    (hit.exit_velo, hit.launch_angle, hit.xba, hit.xslg, hit.distance)
+    for batter in game.batting_order.batting_order:
+        (batter.last_name, batter.position, batter.ops, batter.scorebook)
+    pitcher = game.matchup.pitcher
+    (pitcher.name, pitcher.era, pitcher.innings_pitched, pitcher.hits_allowed,
+        pitcher.runs_allowed, pitcher.strike_outs, pitcher.walks, pitcher.pitches,
+        pitcher.strikes)
+    for count in game.pitch_counts.values():
+        (count.total, count.strikes, count.avg_speed)
+
+
+def _memory_per_game(build, wire: str, games: int = 1000) -> float:
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(wire) for _ in range(games)]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size / games
+
+
+def _patch_time(patch, number: int = 5000) -> float:
+    # The deltas are consumed by the patch, so every call gets its own
+    # copy. The copies are made before each run so only the patch is
+    # timed
+    deltas = []
+
+    def setup():
+        deltas[:] = [copy.deepcopy(DELTA) for _ in range(number)]
+
+    return best_time(lambda: patch(deltas.pop()), number, setup=setup) * 1e6
+
+
+def run() -> dict:
+    """
+    Runs the benchmark.
+
+    Returns:
+        dict: Results, times are in microseconds and sizes in bytes
+    """
+    wire = json.dumps(sample_gamecast())
+    game_dict = json.loads(wire)
+    game_model = GamecastGame.from_dict(json.loads(wire))
+
+    results = {}
+    results['memory_dict_bytes'] = _memory_per_game(json.loads, wire)
+    results['memory_model_bytes'] = _memory_per_game(
+        lambda w: GamecastGame.from_dict(json.loads(w)), wire)
+
+    results['read_dict_us'] = best_time(lambda: _read_dict(game_dict), 20000) * 1e6
+    results['read_model_us'] = best_time(lambda: _read_model(game_model), 20000) * 1e6
+
+    results['build_dict_us'] = best_time(lambda: json.loads(wire), 5000) * 1e6
+    results['build_model_us'] = best_time(
+        lambda: GamecastGame.from_dict(json.loads(wire)), 5000) * 1e6
+
+    results['patch_dict_us'] = _patch_time(lambda delta: GAME_PATCH.apply(game_dict, delta))
+    results['patch_model_us'] = _patch_time(game_model.patch)
+
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:<20} {value:10.2f}')
@@ -0,0 +1,187 @@
+"""
+Load test of the Flask server against the asyncio server. Each server
+runs in a child process on a LocalRedis filled like serve.fill_redis,
+so no Redis server is needed. This process first opens idle /stream
+connections and then sends requests from many concurrent connections.
+It reports requests per second and latency percentiles per route.
+
+    python -m on_deck.benchmarks.load [--modes sync,async] [--requests 2000]
+        [--concurrency 50] [--idle-streams 200]
+
+The Flask server is the threaded development server that
+on_deck_server runs, so every idle stream holds one of its threads.
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Sequence
+
+ROUTES = ('/', '/settings', '/gamecast')
+
+
+def serve(mode: str, port: int):
+    """
+    Runs a server on a filled LocalRedis until the process is killed.
+
+    Args:
+        mode (str): 'sync' for the Flask server, 'async' for the
+            asyncio server
+        port (int): Port to listen on
+    """
+    from on_deck.local_redis import LocalRedis
+    from on_deck.benchmarks.serve import fill_redis
+
+    bus = LocalRedis()
+    fill_redis(bus)
+    if mode == 'sync':
+        from werkzeug.serving import make_server
+        from on_deck.on_deck_server import Server
+
+        # One log line per request would be part of the numbers
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        make_server('127.0.0.1', port, Server(redis_client=bus).app, threaded=True).serve_forever()
+    else:
+        from aiohttp import web
+        from on_deck.local_redis import AsyncLocalRedis
+        from on_deck.async_server import AsyncServer
+
+        web.run_app(AsyncServer(AsyncLocalRedis(bus)).app, host='127.0.0.1', port=port,
+            print=None, access_log=None)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f'Server on port {port} did not start')
+
+
+async def _request(port: int, path: str) -> float:
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    if not response.startswith((b'HTTP/1.1 200', b'HTTP/1.0 200')):
+        raise RuntimeError(f'{path} returned {response[:40]!r}')
+    return time.perf_counter() - start
+
+
+async def _open_stream(port: int):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'GET /stream HTTP/1.1\r\nHost: localhost\r\n\r\n')
+    await writer.drain()
+    # Headers, then the snapshot event
+    await reader.readuntil(b'\r\n\r\n')
+    await reader.readuntil(b'\n\n')
+    return writer
+
+
+def _percentile(latencies: List[float], q: float) -> float:
+    return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+async def _load(port: int, routes: Sequence[str], requests: int, concurrency: int,
+        idle_streams: int) -> dict:
+    streams = []
+    start = time.perf_counter()
+    for _ in range(idle_streams):
+        streams.append(await _open_stream(port))
+    results = {'stream_open_seconds': time.perf_counter() - start}
+
+    for path in routes:
+        remaining = [requests]
+        latencies: List[float] = []
+
+        async def worker():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                latencies.append(await _request(port, path))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        results[path] = {
+            'rps': len(latencies) / elapsed,
+            'p50_ms': _percentile(latencies, 0.5) * 1e3,
+            'p99_ms': _percentile(latencies, 0.99) * 1e3,
+        }
+
+    for writer in streams:
+        writer.close()
+    return results
+
+
+def run(modes: Sequence[str] = ('sync', 'async'), routes: Sequence[str] = ROUTES,
+        requests: int = 2000, concurrency: int = 50, idle_streams: int = 200) -> dict:
+    """
+    Runs the load test against every mode.
+
+    Args:
+        modes (Sequence[str]): Servers to test, 'sync' and/or 'async'
+        routes (Sequence[str]): Paths to request
+        requests (int): Requests per route
+        concurrency (int): Connections sending requests at once
+        idle_streams (int): /stream connections held open during the
+            test
+
+    Returns:
+        dict: Requests per second and p50 and p99 latency in ms per
+            route for every mode
+    """
+    results = {}
+    for mode in modes:
+        port = _free_port()
+        child = subprocess.Popen([sys.executable, '-m', 'on_deck.benchmarks.load', '--serve',
+            mode, '--port', str(port)], stdout=subprocess.DEVNULL)
+        try:
+            _wait_for_port(port)
+            results[mode] = asyncio.run(_load(port, routes, requests, concurrency, idle_streams))
+        finally:
+            child.kill()
+            child.wait()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the sync and async servers')
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--idle-streams', type=int, default=200)
+    parser.add_argument('--serve', choices=('sync', 'async'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        sys.exit()
+
+    results = run(args.modes.split(','), requests=args.requests, concurrency=args.concurrency,
+        idle_streams=args.idle_streams)
+    print(f'{"mode":<6} {"route":<12} {"rps":>10} {"p50 ms":>10} {"p99 ms":>10}')
+    for mode, mode_results in results.items():
+        print(f'{mode:<6} {"streams":<12} opened in {mode_results["stream_open_seconds"]:.2f} s')
+        for route in ROUTES:
+            values = mode_results.get(route)
+            if values is not None:
+                print(f'{mode:<6} {route:<12} {values["rps"]:10.1f} {values["p50_ms"]:10.2f} '
+                    f'{values["p99_ms"]:10.2f}')
@@ -0,0 +1,142 @@
+"""
+Applies a stream of gamecast deltas with the compiled merge patch
+engine, the slotted game records and the path comparing recursive
+update they replaced, with and without collecting the touched paths.
+
+    python -m on_deck.benchmarks.merge_patch [game.odr | deltas.jsonl]
+
+The gamecast deltas of a recording made with on_deck.recorder, or a
+JSON lines file with one delta per line, can be used instead of the
+generated sample deltas.
+"""
+
+import copy
+import json
+import sys
+from typing import List
+
+from on_deck.benchmarks import best_time, sample_deltas, sample_gamecast
+from on_deck.game_model import GamecastGame
+from on_deck.merge_patch import GAME_PATCH
+from on_deck.recorder import MAGIC, MESSAGE, read_recording
+
+
+def _reference_update(d: dict, u: dict, path: tuple = ()) -> dict:
+    # recursive_update as it was before the merge patch engine
+    if not isinstance(d, dict):
+        d = {}
+    for key, value in u.items():
+        current_path = path + (key,)
+        if path == ("pitch_counts",) and value is None:
+            d.pop(key, None)
+            continue
+        if isinstance(value, dict):
+            existing = d.get(key)
+            if not isinstance(existing, dict):
+                existing = {}
+            d[key] = _reference_update(existing, value, current_path)
+        else:
+            d[key] = value
+    return d
+
+
+def _reference_paths(u: dict, path: tuple = ()) -> set:
+    # get_changed_paths as it was before the merge patch engine
+    paths = set()
+    for key, value in u.items():
+        current_path = path + (key,)
+        if isinstance(value, dict) and value:
+            paths |= _reference_paths(value, current_path)
+        else:
+            paths.add(current_path)
+    return paths
+
+
+def load_deltas(path: str) -> List[dict]:
+    """
+    Loads the gamecast deltas of a recording or a JSON lines file.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        List[dict]: Deltas in file order
+    """
+    with open(path, 'rb') as f:
+        is_recording = f.read(len(MAGIC)) == MAGIC
+
+    if is_recording:
+        return [
+            json.loads(entry.data) for entry in read_recording(path)
+            if (entry.kind == MESSAGE) and (entry.channel == b'gamecast')
+        ]
+
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(deltas: List[dict] = None) -> dict:
+    """
+    Runs the benchmark.
+
+    Args:
+        deltas (List[dict]): Deltas to apply. Defaults to the sample
+            deltas
+
+    Returns:
+        dict: Microseconds per delta for every variant
+    """
+    if deltas is None:
+        deltas = sample_deltas()
+
+    # Patching keeps references to the delta's sub dicts, so every run
+    # works on its own copy
+    state = {}
+
+    def setup():
+        state['game'] = sample_gamecast()
+        state['deltas'] = copy.deepcopy(deltas)
+
+    def timed(apply) -> float:
+        def apply_all():
+            game = state['game']
+            for delta in state['deltas']:
+                game = apply(game, delta)
+        return best_time(apply_all, 1, repeat=7, setup=setup)
+
+    def reference(game, delta):
+        _reference_paths(delta)
+        return _reference_update(game, delta)
+
+    def engine(game, delta):
+        GAME_PATCH.apply(game, delta, [])
+        return game
+
+    def model(game, delta):
+        if not isinstance(game, GamecastGame):
+            game = GamecastGame.from_dict(game)
+        return game.patch(delta, [])
+
+    def model_without_paths(game, delta):
+        if not isinstance(game, GamecastGame):
+            game = GamecastGame.from_dict(game)
+        return game.patch(delta)
+
+    variants = {
+        'reference_update_us': lambda game, delta: _reference_update(game, delta),
+        'reference_with_paths_us': reference,
+        'engine_us': GAME_PATCH.apply,
+        'engine_with_paths_us': engine,
+        'model_us': model_without_paths,
+        'model_with_paths_us': model,
+    }
+    return {
+        name: timed(apply) / len(deltas) * 1e6
+        for name, apply in variants.items()
+    }
+
+
+if __name__ == '__main__':
+    recorded = load_deltas(sys.argv[1]) if len(sys.argv) > 1 else None
+    for result, value in run(recorded).items():
+        print(f'{result:<24} {value:8.2f}')
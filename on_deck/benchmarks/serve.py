@@ -0,0 +1,70 @@
+"""
+Times the server's home and settings endpoints through Flask's test
+client against a LocalRedis holding a full slate of games, so neither
+the network nor a Redis server is part of the numbers.
+
+    python -m on_deck.benchmarks.serve
+"""
+
+import json
+
+from on_deck.benchmarks import best_time, sample_gamecast
+from on_deck.local_redis import LocalRedis
+from on_deck.on_deck_server import Server
+
+NUM_GAMES = 15
+
+
+def fill_redis(client: LocalRedis, num_games: int = NUM_GAMES):
+    """
+    Sets the keys the fetcher sets for a slate of games.
+
+    Args:
+        client (LocalRedis): Client to fill
+        num_games (int): Number of games
+    """
+    for i in range(num_games):
+        client.set(f'{i}', json.dumps(sample_gamecast()))
+    client.set('gamecast', json.dumps(sample_gamecast()))
+    client.set('num_games', num_games)
+    client.incr('games_version')
+    client.set('mode', 'overview')
+    client.set('delay', 0)
+    client.set('brightness', 7)
+    client.set('gamecast_id', 0)
+
+
+def run() -> dict:
+    """
+    Runs the benchmark.
+
+    Returns:
+        dict: Microseconds per request
+    """
+    bus = LocalRedis()
+    fill_redis(bus)
+    client = Server(redis_client=bus).app.test_client()
+
+    results = {}
+    results['home_us'] = best_time(lambda: client.get('/'), 200) * 1e6
+    results['home_compact_us'] = best_time(lambda: client.get('/?compact=1'), 200) * 1e6
+    results['home_gzip_us'] = best_time(
+        lambda: client.get('/', headers={'Accept-Encoding': 'gzip'}), 200) * 1e6
+    etag = client.get('/').headers['ETag']
+    results['home_not_modified_us'] = best_time(
+        lambda: client.get('/', headers={'If-None-Match': etag}), 200) * 1e6
+
+    def home_uncached():
+        bus.incr('games_version')
+        client.get('/')
+
+    results['home_uncached_us'] = best_time(home_uncached, 200) * 1e6
+    results['settings_us'] = best_time(lambda: client.get('/settings'), 500) * 1e6
+    results['settings_change_us'] = best_time(
+        lambda: client.get('/settings?delay=0&mode=overview'), 500) * 1e6
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:<20} {value:10.2f}')
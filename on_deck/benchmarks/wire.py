@@ -0,0 +1,47 @@
+"""
+Times encoding and decoding the JSON the fetcher, display and server
+pass through Redis: full games, deltas and the server's list of games.
+
+    python -m on_deck.benchmarks.wire
+"""
+
+import json
+
+from on_deck.benchmarks import best_time, sample_deltas, sample_gamecast
+
+NUM_GAMES = 15
+
+
+def run() -> dict:
+    """
+    Runs the benchmark.
+
+    Returns:
+        dict: Microseconds per call and sizes in bytes
+    """
+    results = {}
+    game = sample_gamecast()
+    game_wire = json.dumps(game)
+    deltas = sample_deltas(100)
+    delta_wires = [json.dumps(delta) for delta in deltas]
+    games = [sample_gamecast() for _ in range(NUM_GAMES)]
+
+    results['game_bytes'] = len(game_wire)
+    results['game_dumps_us'] = best_time(lambda: json.dumps(game), 2000) * 1e6
+    results['game_loads_us'] = best_time(lambda: json.loads(game_wire), 2000) * 1e6
+
+    results['delta_bytes'] = sum(len(wire) for wire in delta_wires) / len(delta_wires)
+    results['delta_dumps_us'] = best_time(
+        lambda: [json.dumps(delta) for delta in deltas], 50) / len(deltas) * 1e6
+    results['delta_loads_us'] = best_time(
+        lambda: [json.loads(wire) for wire in delta_wires], 50) / len(deltas) * 1e6
+
+    # What Server.home returns for a full slate of games
+    results['home_dumps_indent_us'] = best_time(lambda: json.dumps(games, indent=4), 100) * 1e6
+
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:<24} {value:10.2f}')
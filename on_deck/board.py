@@ -0,0 +1,60 @@
+"""
+Settings every process that drives a board shares: the Redis server,
+the matrix options of the board layout and the brightness steps. Only
+redis and the matrix library are imported, so on_deck.thin_client can
+use them without loading the renderer.
+"""
+
+import json
+import os
+
+import redis
+
+from on_deck.emulator_checker import is_emulator
+from on_deck.matrix_loader import RGBMatrixOptions
+
+brightness_dict_2pwm = {0: 0, 1: 60, 2: 80, 3: 90}
+brightness_dict_3pwm = {0: 0, 1: 42, 2: 58, 3: 68, 4: 77, 5: 84, 6: 90, 7: 95}
+# brightness_dict = {i: i for i in range(256)}
+brightness_dict = brightness_dict_3pwm
+
+REDIS_IP = os.environ.get('REDIS_HOST')
+REDIS_IP = '10.0.1.10'
+
+# Name of a file in the layouts folder or a path to a layout file
+LAYOUT = os.environ.get('ON_DECK_LAYOUT', 'main')
+
+LAYOUTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'layouts')
+
+
+def get_options() -> RGBMatrixOptions:
+    """
+    Returns the RGBMatrixOptions object based on the platform. The
+    options come from the board layout file. Only its matrix section is
+    read, on_deck.layout compiles the rest.
+
+    Returns:
+        RGBMatrixOptions: RGBMatrixOptions object
+    """
+    path = LAYOUT
+    if not os.path.exists(path):
+        path = os.path.join(LAYOUTS_PATH, f'{LAYOUT}.json')
+    with open(path, encoding='utf-8') as f:
+        matrix = json.load(f)['matrix']
+
+    # Can run pwm_bits 2 with sudo, 1 without
+    # pwm_dither_bits decreaes brightness a little (i think)
+    options = RGBMatrixOptions()
+    for key, value in matrix['emulator' if is_emulator() else 'hardware'].items():
+        setattr(options, key, value)
+    return options
+
+
+def get_redis() -> redis.Redis:
+    """
+    Returns a client for the scoreboard's Redis server.
+
+    Returns:
+        redis.Redis: Redis client
+    """
+    return redis.Redis(REDIS_IP, port=6379, db=0)
@@ -0,0 +1,12 @@
+"""
+Redis keys and channels the display reads, shared by the recorders.
+Nothing is imported here so the display can use it without loading
+redis.
+"""
+
+# Keys the display handlers read besides the game keys 0..num_games-1
+SNAPSHOT_KEYS = ('num_games', 'mode', 'delay', 'brightness', 'gamecast_id', 'gamecast')
+
+# Messages after which the handlers read keys again
+SETTINGS_CHANNELS = (b'mode', b'init', b'delay', b'brightness', b'gamecast_id',
+    b'gamecast_reset')
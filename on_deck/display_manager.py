@@ -3,12 +3,23 @@ This module is used to manage the display of the scoreboard.
 It is used to draw lines, text, and clear sections of the display.
 """
 
+import functools
 import platform
 import time
 import math
+from typing import Tuple
 
 from on_deck.colors import Colors
+from on_deck.fonts import Fonts
+from on_deck.frame_governor import FrameGovernor
 from on_deck.matrix_loader import RGBMatrix, RGBMatrixOptions, graphics
+from on_deck.startup import timer
+from on_deck.metrics import registry
+from on_deck.tracing import tracer
+from on_deck.frame_snapshot import FrameSnapshot, SNAPSHOT_INTERVAL
+from on_deck.frame_stream import FrameStreamer
+
+FRAMES = registry.counter('frames', 'Frames swapped onto the matrix')
 
 def get_options() -> RGBMatrixOptions:
     """
@@ -24,21 +35,128 @@ def get_options() -> RGBMatrixOptions:
 
     return options
 
+@functools.lru_cache(maxsize=None)
+def circle_offsets(radius: int, thickness: int, fill: bool) -> Tuple[Tuple[int, int], ...]:
+    """
+    Returns the pixels of a circle relative to its center. They are
+    the same wherever the circle is drawn, so they are only worked out
+    once per size.
+
+    Args:
+        radius (int): Radius of the circle
+        thickness (int): Thickness of the circle
+        fill (bool): Whether or not to fill the circle
+
+    Returns:
+        Tuple[Tuple[int, int], ...]: x and y offsets of every pixel
+    """
+    start = radius
+    stop = radius - thickness
+    pixels = []
+    if fill:
+        stop = 0
+        pixels.append((0, 0)) # Not included in the loops
+
+    for degrees in range(0, 91, 1):
+        # Used to get rotational symmetry
+        for r in range(start, stop, -1):
+            # Used to prevent .5 (sin30 or cos60)
+            # to get rounded to nearest even number
+            # Want to avoid any errors with things getting rounded
+            # up in one direction but down in the other
+            r_eff = r - .01
+
+            for d in (degrees, degrees + 90, degrees + 180, degrees + 270):
+                a = math.radians(d)
+                pixels.append((round(r_eff * math.cos(a)), round(r_eff * math.sin(a))))
+
+    # Drawn in the same order as before, without the repeats
+    return tuple(dict.fromkeys(pixels))
+
 class DisplayManager:
     """
     This class is used to manage the display of the scoreboard.
     """
-    def __init__(self, options: RGBMatrixOptions = None):
+    def __init__(self, options: RGBMatrixOptions = None, governor: FrameGovernor = None):
         self.options = options
+        self.governor = governor
         self.matrix = RGBMatrix(options=self.options)
         self.canvas = self.matrix.CreateFrameCanvas()
         self.brightness = 255
+        # Shadow framebuffer for /frame.png, see enable_snapshots
+        self.snapshot: FrameSnapshot = None
+        # Publishes frames to thin clients, see stream_frames
+        self.streamer: FrameStreamer = None
+        # Ring buffer of recent messages and frames, see
+        # enable_flight_recorder
+        self.flight_recorder = None
 
         if platform.system() == 'Windows':
             # Fill the screen with grey so that the pixels can be seen
             # on the emulated display
             self.matrix.Fill(20, 20, 20)
 
+    def enable_snapshots(self, redis_client):
+        """
+        Starts saving PNG previews of the display to Redis, unless
+        ON_DECK_SNAPSHOT_INTERVAL is 0. Only what is drawn from now on
+        is in the previews.
+
+        Args:
+            redis_client (redis.Redis): Redis client
+        """
+        if SNAPSHOT_INTERVAL <= 0:
+            return
+        self.snapshot = FrameSnapshot(self.matrix.width, self.matrix.height, redis_client,
+            Fonts._paths)
+        if platform.system() == 'Windows':
+            self.snapshot.ops.append(('fill', (20, 20, 20)))
+
+    def stream_frames(self, redis_client):
+        """
+        Starts publishing every swapped frame to thin clients. Needs the
+        null matrix backend, the other canvases cannot be read.
+
+        Args:
+            redis_client (redis.Redis): Redis client
+        """
+        if not hasattr(self.canvas, 'buffer'):
+            raise RuntimeError('Streaming frames needs ON_DECK_MATRIX=null')
+        self.streamer = FrameStreamer(redis_client, self.matrix.width, self.matrix.height)
+
+    def enable_flight_recorder(self, redis_client):
+        """
+        Starts recording the messages published on Redis and the swapped
+        frames to the flight recorder file, unless
+        ON_DECK_FLIGHT_RECORDER_MB is 0. With a matrix whose canvas
+        cannot be read, the frames come from the shadow framebuffer of
+        enable_snapshots, so call that first.
+
+        Args:
+            redis_client (redis.Redis): Redis client
+        """
+        # Only needed when the recorder is on, keeps importing the
+        # display fast for the processes that never turn it on
+        from on_deck.flight_recorder import (FlightRecorder, FLIGHT_RECORDER_MB,
+            FLIGHT_RECORDER_PATH)
+
+        if FLIGHT_RECORDER_MB <= 0:
+            return
+        try:
+            self.flight_recorder = FlightRecorder(FLIGHT_RECORDER_PATH, self.matrix.width,
+                self.matrix.height)
+        except OSError as e:
+            print(f'Could not open flight recorder {FLIGHT_RECORDER_PATH}: {e}')
+            return
+        self.flight_recorder.listen(redis_client)
+
+        if hasattr(self.canvas, 'buffer'):
+            return
+        if self.snapshot is not None:
+            self.snapshot.on_frame = self.flight_recorder.swapped
+        else:
+            print('Flight recorder has no frames with ON_DECK_SNAPSHOT_INTERVAL=0')
+
     def set_brightness(self, brightness: int):
         """
         This method is used to change the brightness of the display.
@@ -50,22 +168,84 @@ class DisplayManager:
         self.matrix.brightness = brightness
 
     def swap_frame(self):
-        """This method is used to swap the frame on the display."""
+        """
+        This method is used to swap the frame on the display. With a
+        frame governor the swap is held back if it comes too soon after
+        the last one, flush_frame does it later.
+        """
+        tracer.frame_ready()
+        if self.governor is None:
+            self._swap()
+            return
+        self.governor.request_swap(self._swap)
+
+    def flush_frame(self):
+        """This method is used to do a swap held back by the governor."""
+        if self.governor is not None:
+            self.governor.flush(self._swap)
+
+    def _swap(self):
         self.matrix.SwapOnVSync(self.canvas)
+        if self.snapshot is not None:
+            self.snapshot.swapped()
+        if self.streamer is not None:
+            self.streamer.swapped(self.canvas.buffer)
+        if (self.flight_recorder is not None) and hasattr(self.canvas, 'buffer'):
+            self.flight_recorder.swapped(self.canvas.buffer)
+        FRAMES.inc()
+        tracer.swapped()
+        timer.mark('first frame', after='first snapshot')
 
     def draw_pixel(self, x: int, y: int, color: graphics.Color):
         """This method is used to draw a pixel on the display."""
         # graphics.SetPixel(self.canvas, x, y, color.red, color)
         self.canvas.SetPixel(x, y, color.red, color.green, color.blue)
+        if self.snapshot is not None:
+            self.snapshot.ops.append(('pixel', x, y, (color.red, color.green, color.blue)))
 
     def draw_line(self, x1: int, y1: int, x2: int, y2: int, color: graphics.Color):
         """This method is used to draw a line on the display."""
         graphics.DrawLine(self.canvas, x1, y1, x2, y2, color)
+        if self.snapshot is not None:
+            self.snapshot.ops.append(('line', x1, y1, x2, y2,
+                (color.red, color.green, color.blue)))
+
+    def _draw_text(self, font: graphics.Font, x: int, y: int,
+        color: graphics.Color, text: str):
+        graphics.DrawText(self.canvas, font, x, y, color, text)
+        if self.snapshot is not None:
+            self.snapshot.ops.append(('text', font, x, y, (color.red, color.green, color.blue),
+                text))
 
     def draw_text(self, font: graphics.Font, x: int, y: int,
         color: graphics.Color, text: str):
         """This method is used to draw text on the display."""
-        graphics.DrawText(self.canvas, font, x, y, color, text)
+        self._draw_text(font, x, y, color, text)
+
+    def draw_text_right(self, font: graphics.Font, x: int, y: int,
+        color: graphics.Color, text: str):
+        """
+        This method is used to draw text that ends at x. The last
+        glyph is drawn just left of column x.
+        """
+        x -= Fonts.text_width(font, text)
+        self._draw_text(font, x, y, color, text)
+
+    def draw_text_centered(self, font: graphics.Font, x: int, y: int,
+        color: graphics.Color, text: str):
+        """This method is used to draw text centered on column x."""
+        x -= Fonts.text_width(font, text) // 2
+        self._draw_text(font, x, y, color, text)
+
+    def draw_text_decimal(self, font: graphics.Font, x: int, y: int,
+        color: graphics.Color, text: str):
+        """
+        This method is used to draw a number with its decimal point at
+        column x. Numbers without a decimal point end at column x.
+        """
+        whole = text.split('.', 1)[0]
+        x -= Fonts.text_width(font, whole)
+        self._draw_text(font, x, y, color, text)
 
     def draw_circle(self, x: int, y: int, radius: int, thickness: int,
         fill: bool, color: graphics.Color):
@@ -81,46 +261,13 @@ class DisplayManager:
             color (graphics.Color): Color of the circle
         """
 
-        start = radius
-        stop = radius - thickness
-        if fill:
-            stop = 0
-            self.draw_pixel(x, y, color) # Not included in the loops
-
-        for degrees in range(0, 91, 1):
-            # Used to get rotational symmetry
-            for r in range(start, stop, -1):
-                # Used to prevent .5 (sin30 or cos60)
-                # to get rounded to nearest even number
-                # Want to avoid any errors with things getting rounded
-                # up in one direction but down in the other
-                r_eff = r - .01
-
-                d1 = degrees
-                d2 = d1 + 90
-                d3 = d2 + 90
-                d4 = d3 + 90
-
-                a1 = math.radians(d1)
-                a2 = math.radians(d2)
-                a3 = math.radians(d3)
-                a4 = math.radians(d4)
-
-                x1 = round(x + r_eff * math.cos(a1))
-                y1 = round(y + r_eff * math.sin(a1))
-                self.draw_pixel(x1, y1, color)
-
-                x2 = round(x + r_eff * math.cos(a2))
-                y2 = round(y + r_eff * math.sin(a2))
-                self.draw_pixel(x2, y2, color)
-
-                x3 = round(x + r_eff * math.cos(a3))
-                y3 = round(y + r_eff * math.sin(a3))
-                self.draw_pixel(x3, y3, color)
-
-                x4 = round(x + r_eff * math.cos(a4))
-                y4 = round(y + r_eff * math.sin(a4))
-                self.draw_pixel(x4, y4, color)
+        red, green, blue = color.red, color.green, color.blue
+        offsets = circle_offsets(radius, thickness, fill)
+        canvas = self.canvas
+        for dx, dy in offsets:
+            canvas.SetPixel(x + dx, y + dy, red, green, blue)
+        if self.snapshot is not None:
+            self.snapshot.ops.append(('pixels', x, y, offsets, (red, green, blue)))
 
     def draw_box(self, x1: int, y1: int, x2: int, y2: int, color: graphics.Color, fill: bool = False):
         self.draw_line(x1, y1, x2, y1, color) # Top
@@ -204,6 +351,11 @@ class DisplayManager:
         for i in range(num_rows):
             graphics.DrawLine(self.canvas, x1, y1 + i, x2, y1 + i, color)
 
+        if self.snapshot is not None:
+            rgb = (color.red, color.green, color.blue)
+            for i in range(num_rows):
+                self.snapshot.ops.append(('line', x1, y1 + i, x2, y1 + i, rgb))
+
 if __name__ == '__main__':
     display = DisplayManager(get_options())
     R = 6
@@ -1,24 +1,27 @@
 import os
 
-use_emulator = False
-
 # Get the directory of the current file
 current_dir = os.path.dirname(__file__)
 # Go one folder up
 parent_dir = os.path.dirname(current_dir)
 use_emulator_path = os.path.join(parent_dir, "USE_EMULATOR.txt")
 
-if os.path.exists(use_emulator_path):
-    with open(use_emulator_path, encoding='utf-8') as f:
-        use_emulator = f.read().strip().lower() == "true"
-elif os.environ("USE_EMULATOR") in ('1', 'true', 1, 'True', True):
-    use_emulator =  True
-else:
+# None until is_emulator is first called
+use_emulator: bool = None
+
+def _check_emulator() -> bool:
+    if os.path.exists(use_emulator_path):
+        with open(use_emulator_path, encoding='utf-8') as f:
+            return f.read().strip().lower() == "true"
+
+    if os.environ.get("USE_EMULATOR") in ('1', 'true', 'True'):
+        return True
+
     # Create the file with default content "false"
     with open(use_emulator_path, "w", encoding='utf-8') as f:
         f.write("false")
     print(f"'{use_emulator_path}' not found. Created with default value 'false'.")
-    use_emulator = False
+    return False
 
 def is_emulator():
     """
@@ -29,10 +32,13 @@ def is_emulator():
     The file is expected to be named "USE_EMULATOR.txt" and should be
     located in the parent directory of the current file.
     The content of the file should be "true" (case insensitive) to
+    use the emulator. The file is only read the first time this is
+    called, not when the module is imported.
 
     Returns:
         bool: True if the emulator is being used, False otherwise.
     """
-    if use_emulator:
-        return True
-    return False
+    global use_emulator
+    if use_emulator is None:
+        use_emulator = _check_emulator()
+    return use_emulator
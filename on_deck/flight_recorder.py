@@ -0,0 +1,428 @@
+"""
+Always on flight recorder of the display. The last minutes of what was
+published on Redis and of what was drawn are kept in a ring buffer in a
+memory mapped file of fixed size. When something looks wrong on the
+board, the moment can be rebuilt afterwards, even if the display
+crashed, because the mapped pages belong to the kernel and are written
+to the file whether or not the process exits cleanly.
+
+    python -m on_deck.flight_recorder [path]
+    python -m on_deck.flight_recorder [path] --at -30 --png frame.png
+    python -m on_deck.flight_recorder [path] --at 2026-06-01T19:42:05 --window 10
+
+The first form lists what the file covers. --at rebuilds the frame on
+the board at that moment (unix seconds, ISO local time, or seconds
+before the last record when negative) and prints the messages of the
+--window seconds before it.
+
+Every record has a header, then the channel or key name, then the data:
+
+    RECORD  sync b'ODFR', position, kind, time (unix seconds), name
+            length, data length, CRC32 of the name and data
+
+Swapped frames are XOR deltas from on_deck.frame_codec. A keyframe is
+written next to the delta every KEYFRAME_INTERVAL seconds, together
+with a snapshot of the keys the display reads. Frames before the oldest
+keyframe still in the file are rebuilt by applying the deltas backwards
+from it.
+
+Records are copied into the mapped file under a lock and frames are
+encoded on a background thread, so the render threads only pay for a
+copy of the framebuffer. Set ON_DECK_FLIGHT_RECORDER_MB=0 to turn the
+recorder off.
+"""
+
+import argparse
+import bisect
+import collections
+import datetime
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import Iterator, List, NamedTuple
+
+from on_deck.display_keys import SETTINGS_CHANNELS, SNAPSHOT_KEYS
+from on_deck.frame_codec import apply_xor, encode_xor
+from on_deck.frame_stream import FRAME_CHANNEL
+from on_deck.metrics import registry
+
+MAGIC = b'ODFR'
+VERSION = 1
+
+# magic, version, width, height, capacity of the ring in bytes
+FILE_HEADER = struct.Struct('<4sHHHI')
+# Bytes ever written to the ring, counting the padding at the end of
+# every lap. Updated after every record
+POSITION = struct.Struct('<Q')
+POSITION_OFFSET = 16
+DATA_OFFSET = 64
+
+# sync, position, kind, time, name length, data length, CRC32
+RECORD = struct.Struct('<4sQBdHII')
+
+PAD = 0
+KEY = 1
+MESSAGE = 2
+FRAME = 3
+KEYFRAME = 4
+
+KIND_NAMES = {KEY: 'key', MESSAGE: 'message', FRAME: 'frame', KEYFRAME: 'keyframe'}
+
+FLIGHT_RECORDER_PATH = os.environ.get('ON_DECK_FLIGHT_RECORDER',
+    os.path.join(tempfile.gettempdir(), 'on_deck_flight.odfr'))
+# Size of the ring, 0 turns the recorder off. At a few frames a second
+# 64 MB is somewhere around 20 to 60 minutes
+FLIGHT_RECORDER_MB = float(os.environ.get('ON_DECK_FLIGHT_RECORDER_MB', 64))
+# Seconds between keyframes and key snapshots
+KEYFRAME_INTERVAL = float(os.environ.get('ON_DECK_FLIGHT_KEYFRAME_INTERVAL', 30))
+# Swapped frames waiting to be encoded before the oldest are dropped
+FRAME_BACKLOG = 8
+
+FLIGHT_RECORDS = registry.counter('flight_records', 'Records written to the flight recorder')
+FLIGHT_BYTES = registry.counter('flight_bytes', 'Bytes written to the flight recorder')
+FLIGHT_DROPPED_FRAMES = registry.counter('flight_dropped_frames',
+    'Swapped frames the flight recorder could not encode in time')
+
+
+class Record(NamedTuple):
+    """One record read back from a flight recorder file."""
+    kind: int
+    time: float
+    name: bytes
+    data: bytes
+
+
+class FlightRecorder:
+    """
+    Ring buffer of records in a memory mapped file. An existing file
+    with the same size and frame size is appended to, so the records
+    from before a crash are kept.
+
+    Args:
+        path (str): File to map
+        width (int): Width of the matrix in pixels
+        height (int): Height of the matrix in pixels
+        size (int): Size of the ring in bytes
+        keyframe_interval (float): Seconds between keyframes
+    """
+    def __init__(self, path: str, width: int, height: int,
+            size: int = int(FLIGHT_RECORDER_MB * 1024 * 1024),
+            keyframe_interval: float = KEYFRAME_INTERVAL):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.capacity = size
+        self.keyframe_interval = keyframe_interval
+        self._lock = threading.Lock()
+        self._frames = collections.deque(maxlen=FRAME_BACKLOG)
+        self._ready = threading.Event()
+        self._previous: bytes = None
+        self._last_keyframe = 0.0
+
+        header = FILE_HEADER.pack(MAGIC, VERSION, width, height, size)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a+b') as f:
+            f.seek(0)
+            resume = (f.read(FILE_HEADER.size) == header)
+            if (not resume) or (os.path.getsize(path) != DATA_OFFSET + size):
+                resume = False
+                f.truncate(0)
+                f.truncate(DATA_OFFSET + size)
+            self._map = mmap.mmap(f.fileno(), DATA_OFFSET + size)
+
+        if resume:
+            self.position = POSITION.unpack_from(self._map, POSITION_OFFSET)[0]
+        else:
+            self._map[:FILE_HEADER.size] = header
+            self.position = 0
+            POSITION.pack_into(self._map, POSITION_OFFSET, 0)
+
+        threading.Thread(target=self._encode_frames, name='flight recorder frames',
+            daemon=True).start()
+
+    def append(self, kind: int, name: bytes, data: bytes, when: float = None):
+        """
+        Copies a record into the ring, over the oldest records.
+
+        Args:
+            kind (int): KEY, MESSAGE, FRAME or KEYFRAME
+            name (bytes): Key or channel name, empty for frames
+            data (bytes): Value, message data or encoded frame
+            when (float): Unix time of the record. Defaults to now
+        """
+        when = time.time() if when is None else when
+        size = RECORD.size + len(name) + len(data)
+        if size > self.capacity:
+            return
+        crc = zlib.crc32(data, zlib.crc32(name))
+
+        with self._lock:
+            offset = self.position % self.capacity
+            if offset + size > self.capacity:
+                # Records do not wrap, the rest of the lap is padding
+                if self.capacity - offset >= RECORD.size:
+                    RECORD.pack_into(self._map, DATA_OFFSET + offset, MAGIC, self.position, PAD,
+                        when, 0, 0, 0)
+                self.position += self.capacity - offset
+                offset = 0
+
+            start = DATA_OFFSET + offset
+            RECORD.pack_into(self._map, start, MAGIC, self.position, kind, when, len(name),
+                len(data), crc)
+            start += RECORD.size
+            self._map[start:start + len(name)] = name
+            start += len(name)
+            self._map[start:start + len(data)] = data
+            self.position += size
+            POSITION.pack_into(self._map, POSITION_OFFSET, self.position)
+
+        FLIGHT_RECORDS.inc(kind=KIND_NAMES[kind])
+        FLIGHT_BYTES.inc(size, kind=KIND_NAMES[kind])
+
+    def swapped(self, buffer: bytearray, when: float = None):
+        """
+        Hands a swapped frame to the encoding thread.
+
+        Args:
+            buffer (bytearray): Framebuffer of the swapped canvas
+            when (float): Unix time of the swap. Defaults to now
+        """
+        if len(self._frames) == self._frames.maxlen:
+            FLIGHT_DROPPED_FRAMES.inc()
+        self._frames.append((time.time() if when is None else when, bytes(buffer)))
+        self._ready.set()
+
+    def _encode_frames(self):
+        while True:
+            self._ready.wait()
+            self._ready.clear()
+            while self._frames:
+                when, frame = self._frames.popleft()
+                if frame == self._previous:
+                    continue
+                if self._previous is not None:
+                    self.append(FRAME, b'', encode_xor(self._previous, frame, self.width,
+                        self.height, 0), when)
+                if (self._previous is None) or (when - self._last_keyframe >= self.keyframe_interval):
+                    self.append(KEYFRAME, b'', encode_xor(None, frame, self.width, self.height, 0),
+                        when)
+                    self._last_keyframe = when
+                self._previous = frame
+
+    def snapshot(self, redis_client):
+        """
+        Records the current value of every key the display reads.
+
+        Args:
+            redis_client (redis.Redis): Redis client
+        """
+        keys = list(SNAPSHOT_KEYS)
+        num_games = redis_client.get('num_games')
+        if num_games is not None:
+            keys += [f'{i}' for i in range(int(num_games))]
+
+        when = time.time()
+        for key, value in zip(keys, redis_client.mget(keys)):
+            if value is not None:
+                self.append(KEY, key.encode('utf-8'), value, when)
+
+    def _listen(self, redis_client):
+        pubsub = redis_client.pubsub()
+        pubsub.psubscribe('*')
+        frame_channel = FRAME_CHANNEL.encode('utf-8')
+        last_snapshot: float = None
+        while True:
+            if (last_snapshot is None) or (time.monotonic() - last_snapshot >= self.keyframe_interval):
+                self.snapshot(redis_client)
+                last_snapshot = time.monotonic()
+
+            message = pubsub.get_message(timeout=1)
+            if (not message) or (message['type'] != 'pmessage'):
+                continue
+
+            channel = message['channel']
+            if channel == frame_channel:
+                continue
+            data = message['data']
+            if isinstance(data, int):
+                data = str(data).encode('utf-8')
+            if channel in SETTINGS_CHANNELS:
+                self.snapshot(redis_client)
+            self.append(MESSAGE, channel, data)
+
+    def listen(self, redis_client):
+        """
+        Starts recording every message published on Redis, except the
+        frames streamed to thin clients.
+
+        Args:
+            redis_client (redis.Redis): Redis client
+        """
+        threading.Thread(target=self._listen, args=(redis_client,),
+            name='flight recorder messages', daemon=True).start()
+
+
+def _walk(data: bytes, offset: int, base: int, end: int) -> Iterator[Record]:
+    # Records of one lap from offset until one does not check out
+    while offset + RECORD.size <= end:
+        sync, position, kind, when, name_length, data_length, crc = RECORD.unpack_from(
+            data, DATA_OFFSET + offset)
+        size = RECORD.size + name_length + data_length
+        if (sync != MAGIC) or (position != base + offset) or (kind == PAD) \
+                or (offset + size > end):
+            return
+        start = DATA_OFFSET + offset + RECORD.size
+        name = data[start:start + name_length]
+        value = data[start + name_length:start + name_length + data_length]
+        if zlib.crc32(value, zlib.crc32(name)) != crc:
+            return
+        yield Record(kind, when, name, value)
+        offset += size
+
+
+def read_flight(path: str):
+    """
+    Reads the records still in a flight recorder file, oldest first.
+    Records cut off by a crash or overwritten halfway are left out.
+
+    Args:
+        path (str): Flight recorder file
+
+    Returns:
+        Tuple[int, int, List[Record]]: Width and height of the frames,
+            and the records in the order they were written
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < DATA_OFFSET:
+        raise ValueError(f'{path} is not a flight recorder file')
+    magic, version, width, height, capacity = FILE_HEADER.unpack_from(data)
+    if (magic != MAGIC) or (version != VERSION):
+        raise ValueError(f'{path} is not a version {VERSION} flight recorder file')
+
+    position = POSITION.unpack_from(data, POSITION_OFFSET)[0]
+    lap, head = divmod(position, capacity)
+    records: List[Record] = []
+    if lap > 0:
+        # The oldest records are what is left of the lap before, after
+        # the first whole record past the head
+        base = (lap - 1) * capacity
+        offset = head
+        while True:
+            found = data.find(MAGIC, DATA_OFFSET + offset)
+            if (found == -1) or (found - DATA_OFFSET + RECORD.size > capacity):
+                break
+            offset = found - DATA_OFFSET
+            walked = list(_walk(data, offset, base, capacity))
+            if walked:
+                records += walked
+                break
+            offset += 1
+    records += _walk(data, 0, lap * capacity, head)
+    return width, height, records
+
+
+def frame_at(records: List[Record], when: float, width: int, height: int) -> bytearray:
+    """
+    Rebuilds the frame the board showed at a moment.
+
+    Args:
+        records (List[Record]): Records from read_flight
+        when (float): Unix time
+        width (int): Width of the frames
+        height (int): Height of the frames
+
+    Returns:
+        bytearray: Framebuffer, None if no keyframe is left
+    """
+    frames = [record for record in records if record.kind in (FRAME, KEYFRAME)]
+    keyframes = [i for i, record in enumerate(frames) if record.kind == KEYFRAME]
+    if not keyframes:
+        return None
+    # Index of the last frame swapped at or before when
+    target = bisect.bisect_right([record.time for record in frames], when) - 1
+    buffer = bytearray(width * height * 3)
+
+    before = [i for i in keyframes if i <= target]
+    if before:
+        start = before[-1]
+        apply_xor(frames[start].data, buffer)
+        for record in frames[start + 1:target + 1]:
+            if record.kind == FRAME:
+                apply_xor(record.data, buffer)
+        return buffer
+
+    # Going back from the first keyframe, every delta undoes itself. A
+    # keyframe is written right after the delta to the same frame, one
+    # without it is the first frame after a restart
+    start = keyframes[0]
+    if (start == 0) or (frames[start - 1].kind != FRAME) \
+            or (frames[start - 1].time != frames[start].time):
+        return None
+    apply_xor(frames[start].data, buffer)
+    # Before the oldest frame record (target -1) the oldest delta is
+    # undone too, which gives the frame it was made from
+    for record in reversed(frames[target + 1:start]):
+        apply_xor(record.data, buffer)
+    return buffer
+
+
+def _format_time(when: float) -> str:
+    return datetime.datetime.fromtimestamp(when).isoformat(sep=' ', timespec='milliseconds')
+
+
+def _parse_time(value: str, last: float) -> float:
+    try:
+        seconds = float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    return last + seconds if seconds <= 0 else seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read the display flight recorder')
+    parser.add_argument('path', nargs='?', default=FLIGHT_RECORDER_PATH,
+        help='flight recorder file')
+    parser.add_argument('--at', help='unix seconds, ISO local time or negative seconds from the end')
+    parser.add_argument('--png', help='file to write the frame at --at to')
+    parser.add_argument('--window', type=float, default=10,
+        help='seconds of messages before --at to print')
+    args = parser.parse_args()
+
+    width, height, records = read_flight(args.path)
+    if not records:
+        print(f'{args.path} is empty')
+        return
+
+    counts = collections.Counter(KIND_NAMES[record.kind] for record in records)
+    print(f'{args.path}: {width}x{height}, {_format_time(records[0].time)} to '
+        f'{_format_time(records[-1].time)} ({records[-1].time - records[0].time:.0f} s)')
+    print(', '.join(f'{count} {kind}s' for kind, count in sorted(counts.items())))
+    if args.at is None:
+        return
+
+    when = _parse_time(args.at, records[-1].time)
+    print(f'at {_format_time(when)}')
+    for record in records:
+        if (record.kind == MESSAGE) and (when - args.window <= record.time <= when):
+            text = record.data.decode('utf-8', errors='replace')
+            print(f'{_format_time(record.time)} {record.name.decode()}: {text[:200]}')
+
+    frame = frame_at(records, when, width, height)
+    if frame is None:
+        print('No keyframe left to rebuild the frame from')
+    elif args.png:
+        # Only needed here
+        from on_deck.frame_snapshot import encode_png
+
+        with open(args.png, 'wb') as f:
+            f.write(encode_png(bytes(frame), width, height))
+        print(f'wrote {args.png}')
+
+
+if __name__ == '__main__':
+    main()
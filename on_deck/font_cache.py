@@ -0,0 +1,318 @@
+"""
+Compiles BDF fonts into a compact binary glyph file that is memory
+mapped when it is loaded, so the text BDF files do not have to be parsed
+again on every boot. A compiled file is reused as long as its source
+BDF file has the same modification time, or the same SHA-256 hash if
+the modification time changed (the new time is then stored so the next
+boot does not hash it again). Otherwise it is compiled again.
+
+The compiled fonts are used for the glyph advance tables that text
+alignment looks up and by the software text renderer. The matrix
+library itself still loads its fonts from the BDF files.
+
+Run this module to compile every font ahead of time:
+    python -m on_deck.font_cache
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, List, Tuple
+
+FONTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fonts')
+CACHE_PATH = os.environ.get('ON_DECK_FONT_CACHE', os.path.join(FONTS_PATH, '.cache'))
+
+MAGIC = b'ODFC'
+VERSION = 1
+
+# magic, version, source mtime_ns, source sha256, ascent, descent,
+# default advance, glyph count
+HEADER = struct.Struct('<4sHQ32shhhI')
+# codepoint, advance, bbx width, bbx height, bbx x offset,
+# bbx y offset, bitmap offset
+GLYPH = struct.Struct('<IhhhhhI')
+# Where the source mtime_ns is in the header
+MTIME = struct.Struct('<Q')
+MTIME_OFFSET = 6
+
+# (advance, width, height, x offset, y offset, bitmap offset)
+GlyphEntry = Tuple[int, int, int, int, int, int]
+
+_lock = threading.Lock()
+
+
+def _file_hash(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def _parse_bdf(path: str):
+    """
+    Parses a BDF file into its font metrics and glyphs.
+
+    Returns:
+        tuple: ascent, descent, default codepoint and a list of
+            (codepoint, advance, width, height, x offset, y offset,
+            bitmap rows) tuples
+    """
+    ascent = 0
+    descent = 0
+    default_char = None
+    glyphs = []
+
+    encoding = None
+    advance = 0
+    bbx = (0, 0, 0, 0)
+    rows = None
+
+    with open(path, encoding='latin-1') as f:
+        for line in f:
+            if rows is not None:
+                if line.startswith('ENDCHAR'):
+                    if encoding is not None and encoding >= 0:
+                        glyphs.append((encoding, advance) + bbx + (b''.join(rows),))
+                    rows = None
+                    encoding = None
+                    continue
+                row_bytes = (bbx[0] + 7) // 8
+                rows.append(bytes.fromhex(line.strip())[:row_bytes].ljust(row_bytes, b'\0'))
+            elif line.startswith('ENCODING'):
+                encoding = int(line.split()[1])
+            elif line.startswith('DWIDTH'):
+                advance = int(line.split()[1])
+            elif line.startswith('BBX'):
+                bbx = tuple(int(value) for value in line.split()[1:5])
+            elif line.startswith('BITMAP'):
+                rows = []
+            elif line.startswith('FONTBOUNDINGBOX'):
+                _, height, _, y_offset = (int(value) for value in line.split()[1:5])
+                ascent = height + y_offset
+                descent = -y_offset
+            elif line.startswith('DEFAULT_CHAR'):
+                default_char = int(line.split()[1])
+
+    return ascent, descent, default_char, glyphs
+
+
+def compile_font(path: str, cache_path: str) -> str:
+    """
+    Compiles a BDF file into the binary glyph format.
+
+    Args:
+        path (str): Path to the BDF file
+        cache_path (str): Path to write the compiled file to
+
+    Returns:
+        str: cache_path
+    """
+    ascent, descent, default_char, glyphs = _parse_bdf(path)
+    glyphs.sort()
+
+    advances = {glyph[0]: glyph[1] for glyph in glyphs}
+    # The matrix library draws the replacement character for glyphs
+    # that are missing from the font, or nothing if there is none
+    default_advance = advances.get(0xFFFD, advances.get(default_char, 0))
+
+    header = HEADER.pack(MAGIC, VERSION, os.stat(path).st_mtime_ns, _file_hash(path),
+        ascent, descent, default_advance, len(glyphs))
+
+    index = bytearray()
+    bitmaps = bytearray()
+    for codepoint, advance, width, height, x_offset, y_offset, bitmap in glyphs:
+        index += GLYPH.pack(codepoint, advance, width, height, x_offset, y_offset, len(bitmaps))
+        bitmaps += bitmap
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(index)
+        f.write(bitmaps)
+    os.replace(temp_path, cache_path)
+
+    return cache_path
+
+
+def _cache_is_valid(path: str, cache_path: str) -> bool:
+    try:
+        with open(cache_path, 'rb') as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return False
+
+    if len(header) != HEADER.size:
+        return False
+
+    magic, version, mtime_ns, source_hash, *_ = HEADER.unpack(header)
+    if (magic != MAGIC) or (version != VERSION):
+        return False
+
+    source_mtime_ns = os.stat(path).st_mtime_ns
+    if mtime_ns == source_mtime_ns:
+        return True
+
+    # Checkouts and copies change the mtime without changing the font
+    if source_hash != _file_hash(path):
+        return False
+
+    # Store the new mtime so the next boot does not hash the font again
+    try:
+        with open(cache_path, 'r+b') as f:
+            f.seek(MTIME_OFFSET)
+            f.write(MTIME.pack(source_mtime_ns))
+    except OSError:
+        pass
+    return True
+
+
+class CompiledFont:
+    """
+    A compiled font that is memory mapped from its cache file. The
+    glyph index is read once when the font is opened, the glyph bitmaps
+    are read straight out of the mapping when a glyph is first drawn.
+    """
+    def __init__(self, cache_path: str):
+        with open(cache_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        _, _, _, _, ascent, descent, default_advance, count = HEADER.unpack_from(self._map, 0)
+        self.ascent: int = ascent
+        self.descent: int = descent
+        self.height: int = ascent + descent
+        self.default_advance: int = default_advance
+
+        self.glyphs: Dict[int, GlyphEntry] = {}
+        self.advances: Dict[int, int] = {}
+        offset = HEADER.size
+        for _ in range(count):
+            codepoint, *entry = GLYPH.unpack_from(self._map, offset)
+            self.glyphs[codepoint] = tuple(entry)
+            self.advances[codepoint] = entry[0]
+            offset += GLYPH.size
+
+        self._bitmap_start = offset
+        self._pixels: Dict[int, Tuple[int, List[Tuple[int, int]]]] = {}
+
+    def glyph_pixels(self, codepoint: int) -> Tuple[int, List[Tuple[int, int]]]:
+        """
+        Returns the advance of a glyph and the (x, y) offsets of its lit
+        pixels from the pen position on the baseline. Missing glyphs are
+        drawn as the replacement character like the matrix library does.
+
+        Args:
+            codepoint (int): Unicode codepoint
+
+        Returns:
+            Tuple[int, List[Tuple[int, int]]]: Advance and pixel offsets
+        """
+        pixels = self._pixels.get(codepoint)
+        if pixels is not None:
+            return pixels
+
+        glyph = self.glyphs.get(codepoint, self.glyphs.get(0xFFFD))
+        if glyph is None:
+            pixels = (0, [])
+        else:
+            advance, width, height, x_offset, y_offset, bitmap_offset = glyph
+            row_bytes = (width + 7) // 8
+            start = self._bitmap_start + bitmap_offset
+            top = -(height + y_offset)
+            points = []
+            for row in range(height):
+                bits = int.from_bytes(self._map[start:start + row_bytes], 'big')
+                start += row_bytes
+                for column in range(width):
+                    if bits & (1 << (row_bytes * 8 - 1 - column)):
+                        points.append((x_offset + column, top + row))
+            pixels = (advance, points)
+
+        self._pixels[codepoint] = pixels
+        return pixels
+
+    def text_pixels(self, x: int, y: int, text: str) -> Tuple[int, List[Tuple[int, int]]]:
+        """
+        Lays out text the same way the matrix library's DrawText does,
+        with x, y being the left end of the baseline.
+
+        Args:
+            x (int): X coordinate of the start of the text
+            y (int): Y coordinate of the baseline
+            text (str): Text to lay out
+
+        Returns:
+            Tuple[int, List[Tuple[int, int]]]: Width of the text and the
+                coordinates of its lit pixels
+        """
+        points = []
+        pen = x
+        for char in text:
+            advance, pixels = self.glyph_pixels(ord(char))
+            points.extend((pen + dx, y + dy) for dx, dy in pixels)
+            pen += advance
+        return pen - x, points
+
+
+def cache_path_for(path: str) -> str:
+    """
+    Returns where the compiled version of a BDF file is cached.
+
+    Args:
+        path (str): Path to the BDF file
+
+    Returns:
+        str: Path to the compiled file
+    """
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(FONTS_PATH))
+    if relative.startswith('..'):
+        relative = os.path.basename(path)
+    name = relative.replace(os.sep, '__').replace(' ', '_')
+    return os.path.join(CACHE_PATH, f'{os.path.splitext(name)[0]}.odfc')
+
+
+_fonts: Dict[str, CompiledFont] = {}
+
+def load_font(path: str) -> CompiledFont:
+    """
+    Returns the compiled version of a BDF file, compiling it first if
+    there is no valid cached version. Each font is only opened once.
+
+    Args:
+        path (str): Path to the BDF file
+
+    Returns:
+        CompiledFont: Memory mapped compiled font
+    """
+    path = os.path.abspath(path)
+    font = _fonts.get(path)
+    if font is not None:
+        return font
+
+    with _lock:
+        font = _fonts.get(path)
+        if font is None:
+            cache_path = cache_path_for(path)
+            if not _cache_is_valid(path, cache_path):
+                compile_font(path, cache_path)
+            font = CompiledFont(cache_path)
+            _fonts[path] = font
+    return font
+
+
+def compile_all():
+    """Compiles every BDF file in the fonts folder that is out of date."""
+    for directory, _, files in os.walk(FONTS_PATH):
+        for name in sorted(files):
+            if not name.endswith('.bdf'):
+                continue
+            path = os.path.join(directory, name)
+            cache_path = cache_path_for(path)
+            if _cache_is_valid(path, cache_path):
+                continue
+            compile_font(path, cache_path)
+            print(f'compiled {os.path.relpath(path, FONTS_PATH)}')
+
+
+if __name__ == '__main__':
+    compile_all()
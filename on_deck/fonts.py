@@ -1,112 +1,169 @@
+import functools
 import os
+import threading
+from typing import Dict
 
+from on_deck import font_cache
+from on_deck.font_cache import FONTS_PATH
 from on_deck.matrix_loader import graphics
 
-class Fonts:
+_load_lock = threading.Lock()
+
+
+class GlyphWidths:
     """
-    This class is used to store the fonts used in the scoreboard.
-    B = Bold
-    N = Normal
-    V = Not sure
+    Glyph advance table of a BDF font. Used to measure text so it can
+    be aligned without drawing it first.
     """
-    f6x10 = None
-    ter_u12b = None
-    ter_u12n = None
+    def __init__(self, advances: Dict[int, int], default: int):
+        self.advances = advances
+        self.default = default
 
-    ter_u14b = None
-    ter_u14n = None
-    ter_u14v = None
+    def width(self, text: str) -> int:
+        """
+        Returns the width of text in pixels.
 
-    ter_u16b = None
-    ter_u16n = None
-    ter_u16v = None
+        Args:
+            text (str): Text to measure
 
-    ter_u18b = None
-    ter_u18n = None
+        Returns:
+            int: Width in pixels
+        """
+        advances = self.advances
+        default = self.default
+        return sum(advances.get(ord(char), default) for char in text)
 
-    ter_u22b = None
-    ter_u22n = None
 
-    ter_u24b = None
-    ter_u24n = None
+@functools.lru_cache(maxsize=None)
+def read_glyph_widths(path: str) -> GlyphWidths:
+    """
+    Returns the glyph advances (DWIDTH) of every character in a BDF
+    file. They are read from the compiled font cache so the BDF text
+    only has to be parsed when the font changes.
 
-    ter_u28b = None
-    ter_u28n = None
+    Args:
+        path (str): Path to the BDF file
 
-    ter_u32b = None
-    ter_u32n = None
+    Returns:
+        GlyphWidths: Glyph advance table
+    """
+    font = font_cache.load_font(path)
+    return GlyphWidths(font.advances, font.default_advance)
 
-    symbols = None
 
-    # Class initialization block
-    @classmethod
-    def _initialize_fonts(cls):
-        if cls.ter_u32b is None:  # Load the fonts only if they are not already loaded
-            scoreboard_path = os.path.dirname(os.path.abspath(__file__))
-            fonts_path = os.path.join(scoreboard_path, '..', 'fonts')
-            rpi_rgb_path = os.path.join(fonts_path, 'rpi-rgb-led-matrix')
-            terminus_path = os.path.join(fonts_path, 'Terminus')
+class _LazyFont:
+    """
+    Class attribute of Fonts that parses its BDF file the first time it
+    is accessed and returns the same font object afterwards.
+    """
+    def __init__(self, *path: str):
+        self.path = os.path.join(FONTS_PATH, *path)
+        self.name: str = None
+        self.font: graphics.Font = None
 
-            cls.f6x10 = graphics.Font()
-            cls.f6x10.LoadFont(os.path.join(rpi_rgb_path, '6x10.bdf'))
-            # cls.test.LoadFont(os.path.join(terminus_path, 'ter-u12b.bdf'))
+    def __set_name__(self, owner, name: str):
+        self.name = name
 
-            cls.ter_u12b = graphics.Font()
-            cls.ter_u12b.LoadFont(os.path.join(terminus_path, 'ter-u12b.bdf'))
+    def __get__(self, instance, owner) -> graphics.Font:
+        if self.font is None:
+            with _load_lock:
+                if self.font is None:
+                    self.font = owner._load(self.path)
+        return self.font
 
-            cls.ter_u12n = graphics.Font()
-            cls.ter_u12n.LoadFont(os.path.join(terminus_path, 'ter-u12n.bdf'))
 
-            cls.ter_u14b = graphics.Font()
-            cls.ter_u14b.LoadFont(os.path.join(terminus_path, 'ter-u14b.bdf'))
+class Fonts:
+    """
+    This class is used to store the fonts used in the scoreboard.
+    Fonts are loaded the first time they are used. Use preload to load
+    them ahead of time when the first frame needs to be drawn quickly.
+    B = Bold
+    N = Normal
+    V = Not sure
+    """
+    f6x10 = _LazyFont('rpi-rgb-led-matrix', '6x10.bdf')
+    ter_u12b = _LazyFont('Terminus', 'ter-u12b.bdf')
+    ter_u12n = _LazyFont('Terminus', 'ter-u12n.bdf')
 
-            cls.ter_u14n = graphics.Font()
-            cls.ter_u14n.LoadFont(os.path.join(terminus_path, 'ter-u14n.bdf'))
+    ter_u14b = _LazyFont('Terminus', 'ter-u14b.bdf')
+    ter_u14n = _LazyFont('Terminus', 'ter-u14n.bdf')
+    ter_u14v = _LazyFont('Terminus', 'ter-u14v.bdf')
 
-            cls.ter_u14v = graphics.Font()
-            cls.ter_u14v.LoadFont(os.path.join(terminus_path, 'ter-u14v.bdf'))
+    ter_u16b = _LazyFont('Terminus', 'ter-u16b.bdf')
+    ter_u16n = _LazyFont('Terminus', 'ter-u16n.bdf')
+    ter_u16v = _LazyFont('Terminus', 'ter-u16v.bdf')
 
-            cls.ter_u16b = graphics.Font()
-            cls.ter_u16b.LoadFont(os.path.join(terminus_path, 'ter-u16b.bdf'))
+    ter_u18b = _LazyFont('Terminus', 'ter-u18b.bdf')
+    ter_u18n = _LazyFont('Terminus', 'ter-u18n.bdf')
 
-            cls.ter_u16n = graphics.Font()
-            cls.ter_u16n.LoadFont(os.path.join(terminus_path, 'ter-u16n.bdf'))
+    ter_u22b = _LazyFont('Terminus', 'ter-u22b.bdf')
+    ter_u22n = _LazyFont('Terminus', 'ter-u22n.bdf')
 
-            cls.ter_u16v = graphics.Font()
-            cls.ter_u16v.LoadFont(os.path.join(terminus_path, 'ter-u16v.bdf'))
+    ter_u24b = _LazyFont('Terminus', 'ter-u24b.bdf')
+    ter_u24n = _LazyFont('Terminus', 'ter-u24n.bdf')
 
-            cls.ter_u18b = graphics.Font()
-            cls.ter_u18b.LoadFont(os.path.join(terminus_path, 'ter-u18b.bdf'))
+    ter_u28b = _LazyFont('Terminus', 'ter-u28b.bdf')
+    ter_u28n = _LazyFont('Terminus', 'ter-u28n.bdf')
 
-            cls.ter_u18n = graphics.Font()
-            cls.ter_u18n.LoadFont(os.path.join(terminus_path, 'ter-u18n.bdf'))
+    ter_u32b = _LazyFont('Terminus', 'ter-u32b.bdf')
+    ter_u32n = _LazyFont('Terminus', 'ter-u32n.bdf')
 
-            cls.ter_u22b = graphics.Font()
-            cls.ter_u22b.LoadFont(os.path.join(terminus_path, 'ter-u22b.bdf'))
+    symbols = _LazyFont('symbols.bdf')
 
-            cls.ter_u22n = graphics.Font()
-            cls.ter_u22n.LoadFont(os.path.join(terminus_path, 'ter-u22n.bdf'))
+    _paths: Dict[graphics.Font, str] = {}
 
-            cls.ter_u24b = graphics.Font()
-            cls.ter_u24b.LoadFont(os.path.join(terminus_path, 'ter-u24b.bdf'))
+    @classmethod
+    def _load(cls, path: str) -> graphics.Font:
+        font = graphics.Font()
+        font.LoadFont(path)
+        cls._paths[font] = path
+        return font
 
-            cls.ter_u24n = graphics.Font()
-            cls.ter_u24n.LoadFont(os.path.join(terminus_path, 'ter-u24n.bdf'))
+    @classmethod
+    def glyph_widths(cls, font: graphics.Font) -> GlyphWidths:
+        """
+        Returns the glyph advance table of a loaded font.
 
-            cls.ter_u28b = graphics.Font()
-            cls.ter_u28b.LoadFont(os.path.join(terminus_path, 'ter-u28b.bdf'))
+        Args:
+            font (graphics.Font): One of the fonts in this class
 
-            cls.ter_u28n = graphics.Font()
-            cls.ter_u28n.LoadFont(os.path.join(terminus_path, 'ter-u28n.bdf'))
+        Returns:
+            GlyphWidths: Glyph advance table
+        """
+        return read_glyph_widths(cls._paths[font])
 
-            cls.ter_u32b = graphics.Font()
-            cls.ter_u32b.LoadFont(os.path.join(terminus_path, 'ter-u32b.bdf'))
+    @classmethod
+    def text_width(cls, font: graphics.Font, text: str) -> int:
+        """
+        Returns the width of text in pixels when drawn with font.
+
+        Args:
+            font (graphics.Font): One of the fonts in this class
+            text (str): Text to measure
+
+        Returns:
+            int: Width in pixels
+        """
+        return cls.glyph_widths(font).width(text)
 
-            cls.ter_u32n = graphics.Font()
-            cls.ter_u32n.LoadFont(os.path.join(terminus_path, 'ter-u32n.bdf'))
+    @classmethod
+    def names(cls) -> list:
+        """Returns the names of all the fonts in this class."""
+        return [name for name, value in vars(cls).items() if isinstance(value, _LazyFont)]
 
-            cls.symbols = graphics.Font()
-            cls.symbols.LoadFont(os.path.join(fonts_path, 'symbols.bdf'))
+    @classmethod
+    def loaded(cls) -> list:
+        """Returns the names of the fonts that have been loaded so far."""
+        return [name for name in cls.names() if vars(cls)[name].font is not None]
 
-# Automatically run the font initialization at the time of class definition
-Fonts._initialize_fonts()
+    @classmethod
+    def preload(cls, *names: str):
+        """
+        Loads fonts ahead of their first use.
+
+        Args:
+            names (str): Names of the fonts to load. Loads every font
+                if no names are given
+        """
+        for name in names or cls.names():
+            getattr(cls, name)
@@ -0,0 +1,307 @@
+"""
+Encodes the changes between two RGB framebuffers so frames can be sent
+or stored without the 294 KB of a raw 384x256 frame. There are two
+formats, with the same header:
+
+    HEADER  magic, version, flags, sequence number, width, height,
+            number of runs or ops
+
+Spans (magic b'ODFS', encode_spans) are for boards that only draw the
+frames. Within every row that changed, the span from the first to the
+last changed pixel is split into runs of the same color:
+
+    RUN     x, y, length, red, green, blue
+
+Runs never wrap to the next row, so a board can draw each one as a
+horizontal line.
+
+XOR deltas (magic b'ODFX', encode_xor) are for keeping a copy of the
+framebuffer, like the flight recorder does. The frame is XORed with the
+previous one, which leaves zeros wherever nothing changed. Every span
+of nonzero bytes becomes ops, a pixel repeated MIN_REPEAT or more times
+is one FILL:
+
+    OP      bytes skipped, length in pixels and kind, then the XORed
+            bytes of a COPY or the one XORed pixel of a FILL
+
+Applying an XOR delta twice undoes it, so the frame before can be got
+back from the frame after. A keyframe is the XOR with a black frame.
+"""
+
+import re
+import struct
+from typing import Iterator, NamedTuple, Tuple
+
+MAGIC = b'ODFS'
+XOR_MAGIC = b'ODFX'
+VERSION = 1
+
+FLAG_KEYFRAME = 1
+
+HEADER = struct.Struct('<4sBBIHHI')
+RUN = struct.Struct('<HHH3s')
+# Bytes skipped since the end of the op before, length in pixels with
+# FILL in the top bit
+OP = struct.Struct('<HB')
+
+FILL = 0x80
+MAX_OP_PIXELS = 0x7F
+MAX_SKIP = 0xFFFF
+
+# Pixels of the same color it takes for a FILL to be smaller than
+# copying them, counting the op after it
+MIN_REPEAT = 4
+
+# Nonzero bytes, with gaps of up to 8 zero bytes copied along. That is
+# a few bytes more than skipping them but far fewer ops to apply
+_SPAN = re.compile(rb'[^\x00](?:[^\x00]|\x00{1,8}(?=[^\x00]))*')
+_REPEAT = re.compile(rb'(...)\1{%d,}' % (MIN_REPEAT - 1), re.DOTALL)
+
+
+class FrameHeader(NamedTuple):
+    keyframe: bool
+    seq: int
+    width: int
+    height: int
+    runs: int
+
+
+def _common_prefix(a: memoryview, b: memoryview) -> int:
+    # Binary search with slice compares, which run as memcmp
+    lo, hi = 0, len(a)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: memoryview, b: memoryview) -> int:
+    length = len(a)
+    lo, hi = 0, length
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[length - mid:] == b[length - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _row_runs(out: bytearray, row: memoryview, y: int, first: int, last: int) -> int:
+    count = 0
+    x = first
+    while x <= last:
+        rgb = row[x * 3:x * 3 + 3]
+        end = x + 1
+        while (end <= last) and (row[end * 3:end * 3 + 3] == rgb):
+            end += 1
+        out += RUN.pack(x, y, end - x, rgb.tobytes())
+        count += 1
+        x = end
+    return count
+
+
+def encode_spans(previous: bytes, frame: bytes, width: int, height: int, seq: int) -> bytes:
+    """
+    Encodes a frame as the runs that turn previous into it.
+
+    Args:
+        previous (bytes): Frame the board shows, None for a keyframe
+        frame (bytes): Frame to encode, row by row as red, green, blue
+            bytes
+        width (int): Width in pixels
+        height (int): Height in pixels
+        seq (int): Sequence number of the frame
+
+    Returns:
+        bytes: Message
+    """
+    stride = width * 3
+    frame = memoryview(frame)
+    previous = memoryview(previous) if previous is not None else None
+    runs = bytearray()
+    count = 0
+
+    for y in range(height):
+        row = frame[y * stride:(y + 1) * stride]
+        if previous is None:
+            first, last = 0, width - 1
+        else:
+            old_row = previous[y * stride:(y + 1) * stride]
+            if row == old_row:
+                continue
+            first = _common_prefix(row, old_row) // 3
+            last = width - 1 - _common_suffix(row, old_row) // 3
+        count += _row_runs(runs, row, y, first, last)
+
+    flags = FLAG_KEYFRAME if previous is None else 0
+    return HEADER.pack(MAGIC, VERSION, flags, seq, width, height, count) + bytes(runs)
+
+
+def read_header(message: bytes, magic: bytes = MAGIC) -> FrameHeader:
+    """
+    Reads the header of a message.
+
+    Args:
+        message (bytes): Message from encode_spans or encode_xor
+        magic (bytes): MAGIC for spans, XOR_MAGIC for XOR deltas
+
+    Returns:
+        FrameHeader: Header
+    """
+    found, version, flags, seq, width, height, runs = HEADER.unpack_from(message)
+    if (found != magic) or (version != VERSION):
+        raise ValueError(f'Not a version {VERSION} {magic.decode()} frame message')
+    return FrameHeader(bool(flags & FLAG_KEYFRAME), seq, width, height, runs)
+
+
+def iter_runs(message: bytes) -> Iterator[Tuple[int, int, int, bytes]]:
+    """
+    Yields the runs of a message without copying it.
+
+    Args:
+        message (bytes): Message from encode_spans
+
+    Yields:
+        Tuple[int, int, int, bytes]: x, y, length and color of a run
+    """
+    return RUN.iter_unpack(memoryview(message)[HEADER.size:])
+
+
+def apply_spans(message: bytes, buffer: bytearray):
+    """
+    Draws the runs of a message into an RGB framebuffer.
+
+    Args:
+        message (bytes): Message from encode_spans
+        buffer (bytearray): Framebuffer of the frame before
+    """
+    width = read_header(message).width
+    for x, y, length, rgb in iter_runs(message):
+        i = (y * width + x) * 3
+        buffer[i:i + length * 3] = rgb * length
+
+
+class _OpWriter:
+    """Appends the ops of an XOR delta, each skipping from the last."""
+    def __init__(self, delta: bytes):
+        self.delta = delta
+        self.out = bytearray()
+        self.count = 0
+        self._end = 0
+
+    def _op(self, offset: int, control: int):
+        skip = offset - self._end
+        while skip > MAX_SKIP:
+            # Empty COPYs to get there
+            self.out += OP.pack(MAX_SKIP, 0)
+            self.count += 1
+            skip -= MAX_SKIP
+        self.out += OP.pack(skip, control)
+        self.count += 1
+
+    def copy(self, start: int, end: int):
+        step = MAX_OP_PIXELS * 3
+        for offset in range(start, end, step):
+            stop = min(offset + step, end)
+            self._op(offset, (stop - offset) // 3)
+            self.out += self.delta[offset:stop]
+            self._end = stop
+
+    def fill(self, offset: int, pixels: int):
+        pixel = self.delta[offset:offset + 3]
+        while pixels > 0:
+            length = min(pixels, MAX_OP_PIXELS)
+            self._op(offset, FILL | length)
+            self.out += pixel
+            offset += length * 3
+            self._end = offset
+            pixels -= length
+
+    def span(self, start: int, end: int):
+        position = start
+        for repeat in _REPEAT.finditer(self.delta, start, end):
+            # The match can start inside a pixel, the pixels in it
+            # repeat all the same
+            first = repeat.start() + (-repeat.start()) % 3
+            pixels = (repeat.end() - first) // 3
+            if pixels < MIN_REPEAT:
+                continue
+            self.copy(position, first)
+            if self.delta[first:first + 3] != b'\x00\x00\x00':
+                self.fill(first, pixels)
+            position = first + pixels * 3
+        self.copy(position, end)
+
+
+def encode_xor(previous: bytes, frame: bytes, width: int, height: int, seq: int) -> bytes:
+    """
+    Encodes a frame as the XOR delta that turns previous into it.
+
+    Args:
+        previous (bytes): Frame before, None for a keyframe
+        frame (bytes): Frame to encode, row by row as red, green, blue
+            bytes
+        width (int): Width in pixels
+        height (int): Height in pixels
+        seq (int): Sequence number of the frame
+
+    Returns:
+        bytes: Message
+    """
+    if previous is None:
+        delta = bytes(frame)
+    else:
+        # XOR of the whole frames as two big ints runs in C
+        delta = (int.from_bytes(frame, 'little') ^ int.from_bytes(previous, 'little')).to_bytes(
+            len(frame), 'little')
+
+    ops = _OpWriter(delta)
+    for span in _SPAN.finditer(delta):
+        ops.span(span.start() - span.start() % 3, span.end() + (-span.end()) % 3)
+
+    flags = FLAG_KEYFRAME if previous is None else 0
+    return HEADER.pack(XOR_MAGIC, VERSION, flags, seq, width, height, ops.count) + bytes(ops.out)
+
+
+def apply_xor(message: bytes, buffer: bytearray):
+    """
+    Applies an XOR delta to a framebuffer in place. The XORed bytes are
+    read straight out of the message, nothing the size of a frame is
+    copied.
+
+    Args:
+        message (bytes): Message from encode_xor
+        buffer (bytearray): Framebuffer of the frame before. Anything
+            for a keyframe
+    """
+    header = read_header(message, XOR_MAGIC)
+    view = memoryview(message)
+    target = memoryview(buffer)
+    if header.keyframe:
+        target[:] = bytes(len(target))
+
+    position = HEADER.size
+    offset = 0
+    for _ in range(header.runs):
+        skip, control = OP.unpack_from(view, position)
+        position += OP.size
+        offset += skip
+        length = (control & MAX_OP_PIXELS) * 3
+        if control & FILL:
+            data = view[position:position + 3].tobytes() * (length // 3)
+            position += 3
+        else:
+            data = view[position:position + length]
+            position += length
+
+        window = target[offset:offset + length]
+        if header.keyframe:
+            window[:] = data
+        else:
+            window[:] = (int.from_bytes(window, 'little') ^ int.from_bytes(data, 'little')).to_bytes(
+                length, 'little')
+        offset += length
@@ -0,0 +1,150 @@
+"""
+Keeps the display from redrawing and swapping once per message during
+bursts of updates. Deltas that arrive inside one coalescing window are
+merged before anything is drawn, and frame swaps are limited to the
+target frame rate. A swap that comes in too soon is held back and done
+by the next flush instead.
+"""
+
+import threading
+import time
+from typing import Callable, List
+
+
+class FrameGovernor:
+    """
+    Limits how often the display swaps frames and groups the deltas
+    that arrive close together so they can be rendered once.
+
+    Args:
+        target_fps (float): Maximum number of frame swaps per second
+        coalesce_window (float): Seconds to keep collecting deltas
+            after the first one arrives. Defaults to one frame
+        report_interval (float): Seconds between printed stats
+            reports. 0 turns the reports off
+    """
+    def __init__(self, target_fps: float = 30, coalesce_window: float = None,
+        report_interval: float = 0):
+        self.frame_budget = 1 / target_fps
+        self.coalesce_window = self.frame_budget if coalesce_window is None else coalesce_window
+        self.report_interval = report_interval
+
+        self._lock = threading.Lock()
+        self._last_swap = 0.0
+        self._pending = False
+        self._last_report = time.monotonic()
+
+        self.frames_rendered = 0
+        self.dropped_swaps = 0
+        self.renders = 0
+        self.deltas_merged = 0
+        self.max_deltas_per_render = 0
+
+    def coalesce(self, get_message: Callable) -> List[dict]:
+        """
+        Collects messages until the coalescing window closes. Call this
+        right after the first message of a burst is received.
+
+        Args:
+            get_message (Callable): Function that takes a timeout keyword
+                and returns the next message or None, like
+                redis PubSub.get_message
+
+        Returns:
+            List[dict]: Messages received inside the window
+        """
+        messages = []
+        deadline = time.monotonic() + self.coalesce_window
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = get_message(timeout=remaining)
+            if message is None:
+                break
+            messages.append(message)
+
+        return messages
+
+    def record_render(self, deltas: int):
+        """
+        Records that a batch of deltas was merged and rendered once.
+
+        Args:
+            deltas (int): Number of deltas merged into the render
+        """
+        with self._lock:
+            self.renders += 1
+            self.deltas_merged += deltas
+            self.max_deltas_per_render = max(self.max_deltas_per_render, deltas)
+
+    def request_swap(self, swap: Callable[[], None]) -> bool:
+        """
+        Swaps the frame if a full frame has passed since the last swap.
+        Otherwise the swap is dropped and left for flush.
+
+        Args:
+            swap (Callable[[], None]): Function that swaps the frame
+
+        Returns:
+            bool: True if the frame was swapped, False if it was dropped
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_swap < self.frame_budget:
+                self._pending = True
+                self.dropped_swaps += 1
+                return False
+            self._swap(swap, now)
+            return True
+
+    def flush(self, swap: Callable[[], None]) -> bool:
+        """
+        Does a held back swap once the frame budget allows it. Should be
+        called regularly from a loop.
+
+        Args:
+            swap (Callable[[], None]): Function that swaps the frame
+
+        Returns:
+            bool: True if the frame was swapped, False otherwise
+        """
+        with self._lock:
+            now = time.monotonic()
+            swapped = False
+            if self._pending and (now - self._last_swap >= self.frame_budget):
+                self._swap(swap, now)
+                swapped = True
+
+        if self.report_interval and (now - self._last_report >= self.report_interval):
+            self._last_report = now
+            print(f'frame governor: {self.stats()}')
+
+        return swapped
+
+    def _swap(self, swap: Callable[[], None], now: float):
+        swap()
+        self._last_swap = now
+        self._pending = False
+        self.frames_rendered += 1
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the governor.
+
+        Returns:
+            dict: frames_rendered, dropped_swaps, renders,
+                deltas_merged, deltas_per_render and
+                max_deltas_per_render
+        """
+        with self._lock:
+            deltas_per_render = self.deltas_merged / self.renders if self.renders else 0
+            return {
+                'frames_rendered': self.frames_rendered,
+                'dropped_swaps': self.dropped_swaps,
+                'renders': self.renders,
+                'deltas_merged': self.deltas_merged,
+                'deltas_per_render': round(deltas_per_render, 2),
+                'max_deltas_per_render': self.max_deltas_per_render,
+            }
@@ -0,0 +1,156 @@
+"""
+PNG previews of what the board shows, served by the server at
+/frame.png.
+
+The canvases of rgbmatrix and the emulator cannot be read back, so the
+display keeps a shadow framebuffer instead. DisplayManager records
+every draw call as a tuple, which is all the render threads pay, and
+hands the calls of a frame over when it is swapped. A background
+thread replays them onto a null_matrix canvas (pixel for pixel the
+same as the board) every SNAPSHOT_INTERVAL seconds. If the frame
+changed, it encodes it as a PNG and saves it to Redis.
+
+Set ON_DECK_SNAPSHOT_INTERVAL=0 to turn previews off.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+from on_deck import null_matrix
+
+FRAME_KEY = 'frame_png'
+FRAME_ETAG_KEY = 'frame_etag'
+
+# Seconds between previews, 0 turns them off
+SNAPSHOT_INTERVAL = float(os.environ.get('ON_DECK_SNAPSHOT_INTERVAL', 1))
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    chunk = kind + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk))
+
+
+def encode_png(buffer: bytes, width: int, height: int, level: int = 6) -> bytes:
+    """
+    Encodes an RGB framebuffer as a PNG.
+
+    Args:
+        buffer (bytes): Pixels row by row as red, green, blue bytes
+        width (int): Width in pixels
+        height (int): Height in pixels
+        level (int): zlib compression level
+
+    Returns:
+        bytes: PNG file
+    """
+    stride = width * 3
+    # Every row starts with filter type 0, the rows are stored as is
+    rows = b''.join(b'\x00' + buffer[y * stride:(y + 1) * stride] for y in range(height))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+        + _png_chunk(b'IDAT', zlib.compress(rows, level)) + _png_chunk(b'IEND', b''))
+
+
+class FrameSnapshot:
+    """
+    Shadow framebuffer of the display that is saved to Redis as a PNG.
+
+    Args:
+        width (int): Width of the matrix in pixels
+        height (int): Height of the matrix in pixels
+        redis_client (redis.Redis): Redis client
+        font_paths (Dict): BDF path of every font that is drawn with
+        interval (float): Seconds between previews
+    """
+    def __init__(self, width: int, height: int, redis_client, font_paths: Dict,
+            interval: float = SNAPSHOT_INTERVAL):
+        self.redis = redis_client
+        self.font_paths = font_paths
+        self.interval = interval
+        self.canvas = null_matrix.FrameCanvas(width, height)
+        # Draw calls of the frame being drawn and of the swapped frames
+        # the thread has not replayed yet
+        self.ops: List[tuple] = []
+        self._swapped: List[Tuple[float, List[tuple]]] = []
+        # Called with the shadow framebuffer and the swap time of every
+        # replayed frame, see DisplayManager.enable_flight_recorder
+        self.on_frame: Callable[[bytearray, float], None] = None
+        self._fonts: Dict[str, null_matrix.graphics.Font] = {}
+        self._last_frame: bytes = None
+
+        self._thread = threading.Thread(target=self._run, name='frame snapshot', daemon=True)
+        self._thread.start()
+
+    def swapped(self):
+        """Hands the draw calls of the swapped frame to the thread."""
+        ops, self.ops = self.ops, []
+        self._swapped.append((time.time(), ops))
+
+    def _font(self, font) -> null_matrix.graphics.Font:
+        path = self.font_paths[font]
+        shadow = self._fonts.get(path)
+        if shadow is None:
+            shadow = self._fonts[path] = null_matrix.graphics.Font()
+            shadow.LoadFont(path)
+        return shadow
+
+    def replay(self):
+        """Draws the swapped frames onto the shadow canvas."""
+        swapped, self._swapped = self._swapped, []
+        canvas = self.canvas
+        graphics = null_matrix.graphics
+        color = graphics.Color()
+        for when, ops in swapped:
+            for op in ops:
+                kind = op[0]
+                if kind == 'line':
+                    _, x1, y1, x2, y2, rgb = op
+                    color.SetColor(*rgb)
+                    graphics.DrawLine(canvas, x1, y1, x2, y2, color)
+                elif kind == 'pixel':
+                    _, x, y, rgb = op
+                    canvas.SetPixel(x, y, *rgb)
+                elif kind == 'pixels':
+                    _, x, y, offsets, rgb = op
+                    for dx, dy in offsets:
+                        canvas.SetPixel(x + dx, y + dy, *rgb)
+                elif kind == 'text':
+                    _, font, x, y, rgb, text = op
+                    color.SetColor(*rgb)
+                    graphics.DrawText(canvas, self._font(font), x, y, color, text)
+                elif kind == 'fill':
+                    canvas.Fill(*op[1])
+            if self.on_frame is not None:
+                self.on_frame(canvas.buffer, when)
+
+    def publish(self) -> bool:
+        """
+        Replays the swapped frames and saves the frame to Redis if it
+        changed since it was last saved.
+
+        Returns:
+            bool: If a new frame was saved
+        """
+        self.replay()
+        frame = bytes(self.canvas.buffer)
+        if frame == self._last_frame:
+            return False
+        self._last_frame = frame
+
+        png = encode_png(frame, self.canvas.width, self.canvas.height)
+        etag = hashlib.sha1(png).hexdigest()[:20]
+        self.redis.mset({FRAME_KEY: png, FRAME_ETAG_KEY: etag})
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f'Could not save frame snapshot: {e}')
@@ -0,0 +1,128 @@
+"""
+Server side rendering. The renderer runs the scoreboard on the server
+box with the null matrix backend and publishes every frame it swaps as
+runs of changed pixels (see on_deck.frame_codec) on FRAME_CHANNEL. The
+boards run on_deck.thin_client, which only draws the runs, so their
+CPU is left for refreshing the matrix. Any number of boards can share
+one renderer.
+
+    python -m on_deck.frame_stream          renderer, on the server box
+    python -m on_deck.thin_client           on every Pi
+
+Frames are diffed and encoded on a background thread. Boards that
+start or miss a frame ask for a keyframe on REQUEST_CHANNEL, and one
+is also sent every KEYFRAME_INTERVAL seconds.
+"""
+
+import os
+import threading
+import time
+
+from on_deck.frame_codec import encode_spans
+from on_deck.metrics import registry
+
+FRAME_CHANNEL = 'frames'
+REQUEST_CHANNEL = 'frame_request'
+
+# Seconds between keyframes nobody asked for
+KEYFRAME_INTERVAL = float(os.environ.get('ON_DECK_KEYFRAME_INTERVAL', 30))
+
+FRAMES_STREAMED = registry.counter('frames_streamed', 'Frames published to thin clients')
+STREAMED_BYTES = registry.counter('streamed_bytes', 'Bytes of frames published to thin clients')
+
+
+class FrameStreamer:
+    """
+    Publishes the frames of a DisplayManager on the null matrix backend.
+
+    Args:
+        redis_client (redis.Redis): Redis client
+        width (int): Width of the matrix in pixels
+        height (int): Height of the matrix in pixels
+        keyframe_interval (float): Seconds between keyframes
+    """
+    def __init__(self, redis_client, width: int, height: int,
+            keyframe_interval: float = KEYFRAME_INTERVAL):
+        self.redis = redis_client
+        self.width = width
+        self.height = height
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self._previous: bytes = None
+        self._latest: bytes = None
+        self._last_keyframe = 0.0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+        pubsub = self.redis.pubsub()
+        pubsub.subscribe(REQUEST_CHANNEL)
+        threading.Thread(target=self._run, args=(pubsub,), name='frame stream',
+            daemon=True).start()
+
+    def swapped(self, buffer: bytearray):
+        """
+        Hands a swapped frame to the encoding thread. Frames that come
+        in faster than they are encoded are merged into the next one.
+
+        Args:
+            buffer (bytearray): Framebuffer of the swapped canvas
+        """
+        frame = bytes(buffer)
+        with self._lock:
+            self._latest = frame
+            self._ready.set()
+
+    def _publish(self, message: bytes, kind: str):
+        self.redis.publish(FRAME_CHANNEL, message)
+        FRAMES_STREAMED.inc(kind=kind)
+        STREAMED_BYTES.inc(len(message), kind=kind)
+
+    def _run(self, pubsub):
+        while True:
+            self._ready.wait(timeout=1)
+            requested = False
+            while True:
+                message = pubsub.get_message(timeout=0)
+                if message is None:
+                    break
+                requested = requested or (message['type'] == 'message')
+
+            with self._lock:
+                frame, self._latest = self._latest, None
+                self._ready.clear()
+
+            if frame is None:
+                if requested and (self._previous is not None):
+                    # Nothing new to send, so the frame the boards
+                    # should be showing is resent whole
+                    self._publish(encode_spans(None, self._previous, self.width, self.height,
+                        self.seq), 'keyframe')
+                continue
+
+            keyframe = (requested or (self._previous is None)
+                or (time.monotonic() - self._last_keyframe >= self.keyframe_interval))
+            if (not keyframe) and (frame == self._previous):
+                continue
+
+            self.seq += 1
+            previous = None if keyframe else self._previous
+            message = encode_spans(previous, frame, self.width, self.height, self.seq)
+            self._publish(message, 'keyframe' if keyframe else 'delta')
+            if keyframe:
+                self._last_keyframe = time.monotonic()
+            self._previous = frame
+
+
+def main():
+    # The renderer draws into memory, the matrix backend is picked when
+    # the display modules are imported
+    os.environ['ON_DECK_MATRIX'] = 'null'
+    from on_deck.on_deck_display import Scoreboard
+
+    scoreboard = Scoreboard()
+    scoreboard.display_manager.stream_frames(scoreboard.gamecast_handler.redis)
+    scoreboard.start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+"""
+Typed game state for the overview and gamecast displays. The fetcher
+publishes games as nested JSON dicts. The display builds these slotted
+records from the full game once and patches them in place with every
+delta, so the renderers read attributes (game.away.abv) instead of
+looking up string keys in nested dicts.
+
+Keys that a record does not know are kept in its extra dict, so
+to_dict gives back everything that was received.
+
+Patches follow the same rules as merge_patch.GAME_PATCH and can collect
+the paths they touched the same way.
+"""
+
+from typing import Dict, List
+
+from on_deck.merge_patch import add_paths, merge
+
+
+def _touch(touched: List[tuple], prefix: tuple, key: str, value):
+    if isinstance(value, dict) and value:
+        add_paths(value, prefix + (key,), touched)
+    else:
+        touched.append(prefix + (key,))
+
+
+def _to_plain(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _to_plain(item) for key, item in value.items()}
+    return value
+
+
+class ListOf:
+    """
+    A list field whose items are records. Lists are always replaced by
+    a patch, never merged.
+
+    Args:
+        kind (type): Record class of the items
+    """
+    def __init__(self, kind: type):
+        self.kind = kind
+
+    def build(self, value: list) -> list:
+        build = self.kind.build
+        return [build(item) for item in value]
+
+    def merge(self, existing, value: dict, touched: List[tuple] = None, prefix: tuple = ()):
+        # A dict patch replaces the list, the same as it does in a dict
+        if touched is not None:
+            add_paths(value, prefix, touched)
+        return merge(None, value)
+
+
+class MapOf:
+    """
+    A dict field whose values are records, like the pitch counts that
+    are keyed by pitch type.
+
+    Args:
+        kind (type): Record class of the values
+        delete_none (bool): A None value in a patch removes the key
+            instead of storing None
+    """
+    def __init__(self, kind: type, delete_none: bool = False):
+        self.kind = kind
+        self.delete_none = delete_none
+
+    def build(self, value: dict) -> dict:
+        build = self.kind.build
+        return {
+            key: build(item) for key, item in value.items()
+            if (item is not None) or (not self.delete_none)
+        }
+
+    def merge(self, existing: dict, value: dict, touched: List[tuple] = None,
+        prefix: tuple = ()) -> dict:
+        if not isinstance(existing, dict):
+            existing = {}
+        merge_item = self.kind.merge
+        for key, item in value.items():
+            if item is None and self.delete_none:
+                existing.pop(key, None)
+                if touched is not None:
+                    touched.append(prefix + (key,))
+            elif touched is None:
+                existing[key] = merge_item(existing.get(key), item)
+            else:
+                existing[key] = merge_item(existing.get(key), item, touched, prefix + (key,))
+        return existing
+
+
+class Record:
+    """
+    Base class of the game records. Subclasses list their fields in
+    __slots__ and the fields that hold other records in _nested. Fields
+    that were never received are None.
+    """
+    __slots__ = ('extra',)
+
+    _fields: tuple = ()
+    _field_set: frozenset = frozenset()
+    _nested: dict = {}
+    _plain_fields: tuple = ()
+    _nested_fields: tuple = ()
+
+    def __init_subclass__(cls):
+        super().__init_subclass__()
+        fields = []
+        nested = {}
+        for klass in reversed(cls.__mro__):
+            fields += [field for field in klass.__dict__.get('__slots__', ()) if field != 'extra']
+            nested.update(klass.__dict__.get('_nested', {}))
+        cls._fields = tuple(fields)
+        cls._field_set = frozenset(fields)
+        cls._nested = nested
+        # Split once so from_dict does not look up the kind of every field
+        cls._plain_fields = tuple(field for field in fields if field not in nested)
+        cls._nested_fields = tuple(
+            (field, nested[field].build) for field in fields if field in nested)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'Record':
+        """
+        Builds a record from its wire format dict.
+
+        Args:
+            d (dict): Game dict as published by the fetcher
+
+        Returns:
+            Record: New record
+        """
+        record = cls.__new__(cls)
+        get = d.get
+        for field in cls._plain_fields:
+            setattr(record, field, get(field))
+        for field, build in cls._nested_fields:
+            value = get(field)
+            if isinstance(value, (dict, list)):
+                value = build(value)
+            setattr(record, field, value)
+
+        if cls._field_set.issuperset(d):
+            record.extra = None
+        else:
+            record.extra = {key: value for key, value in d.items() if key not in cls._field_set}
+        return record
+
+    @classmethod
+    def build(cls, value):
+        if isinstance(value, dict):
+            return cls.from_dict(value)
+        return value
+
+    @classmethod
+    def merge(cls, existing, value, touched: List[tuple] = None, prefix: tuple = ()):
+        """
+        Applies a delta to a record that may not exist yet.
+
+        Args:
+            existing: Current value, a record or None
+            value: Nested dictionary patch, or a value that replaces
+                the record
+            touched (List[tuple]): If given, the path of every leaf the
+                delta set or deleted is added to it
+            prefix (tuple): Path of the record within the full game
+
+        Returns:
+            The patched record or the new value
+        """
+        if not isinstance(value, dict):
+            if touched is not None:
+                touched.append(prefix)
+            return value
+        if isinstance(existing, cls):
+            return existing.patch(value, touched, prefix)
+        # Patching a field that is not a record yet starts from nothing,
+        # the same as merging into a missing sub dict does
+        record = cls.from_dict({})
+        return record.patch(value, touched, prefix)
+
+    def patch(self, u: dict, touched: List[tuple] = None, prefix: tuple = ()) -> 'Record':
+        """
+        Applies a delta in place. Gives the same result as
+        merge_patch.GAME_PATCH on the dict version of the record.
+
+        Args:
+            u (dict): Nested dictionary patch
+            touched (List[tuple]): If given, the path of every leaf the
+                delta set or deleted is added to it
+            prefix (tuple): Path of the record within the full game
+
+        Returns:
+            Record: self
+        """
+        nested = self._nested
+        field_set = self._field_set
+        for key, value in u.items():
+            if key not in field_set:
+                extra = self.extra if self.extra is not None else {}
+                extra[key] = merge(extra.get(key), value) if isinstance(value, dict) else value
+                self.extra = extra
+                if touched is not None:
+                    _touch(touched, prefix, key, value)
+                continue
+
+            kind = nested.get(key)
+            if (kind is not None) and isinstance(value, dict) and value:
+                if touched is None:
+                    setattr(self, key, kind.merge(getattr(self, key), value))
+                else:
+                    setattr(self, key, kind.merge(getattr(self, key), value, touched,
+                        prefix + (key,)))
+                continue
+
+            if (kind is not None) and isinstance(value, dict):
+                # An empty patch keeps the record but still makes sure
+                # there is one, like an empty dict patch does
+                setattr(self, key, kind.merge(getattr(self, key), value))
+            elif (kind is not None) and isinstance(value, list):
+                setattr(self, key, kind.build(value))
+            elif isinstance(value, dict):
+                setattr(self, key, merge(getattr(self, key), value))
+            else:
+                setattr(self, key, value)
+            if touched is not None:
+                _touch(touched, prefix, key, value)
+        return self
+
+    def to_dict(self) -> dict:
+        """
+        Returns the record in its wire format.
+
+        Returns:
+            dict: Nested game dict
+        """
+        d = {field: _to_plain(getattr(self, field)) for field in self._fields}
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    def __getitem__(self, key: str):
+        # Lets code that still indexes the dict version keep working
+        if key in self._field_set:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{field}={getattr(self, field)!r}' for field in self._fields)
+        return f'{type(self).__name__}({fields})'
+
+
+class Team(Record):
+    __slots__ = ('abv', 'name', 'runs', 'hits', 'errors', 'left_on_base', 'xba', 'xslg',
+        'abs_challenges', 'challenges')
+    abv: str
+    name: str
+    runs: int
+    hits: int
+    errors: int
+    left_on_base: int
+    xba: float
+    xslg: float
+    abs_challenges: int
+    challenges: int
+
+
+class Count(Record):
+    __slots__ = ('balls', 'strikes', 'outs')
+    balls: int
+    strikes: int
+    outs: int
+
+
+class Flags(Record):
+    __slots__ = ('no_hitter', 'perfect_game')
+    no_hitter: bool
+    perfect_game: bool
+
+
+class Umpire(Record):
+    __slots__ = ('num_missed', 'total_calls', 'home_favor', 'home_wpa')
+    num_missed: int
+    total_calls: int
+    home_favor: float
+    home_wpa: float
+
+
+class RunExpectancy(Record):
+    __slots__ = ('average_runs', 'to_score')
+    average_runs: float
+    to_score: float
+
+
+class WinProbability(Record):
+    __slots__ = ('away', 'home')
+    away: float
+    home: float
+
+
+class PitchDetails(Record):
+    __slots__ = ('type', 'at_bat_pitch_count', 'speed', 'pitch_hand', 'break_horizontal',
+        'break_vertical_induced', 'zone', 'umpire_missed_call')
+    type: str
+    at_bat_pitch_count: int
+    speed: float
+    pitch_hand: str
+    break_horizontal: float
+    break_vertical_induced: float
+    zone: int
+    umpire_missed_call: bool
+
+
+class HitDetails(Record):
+    __slots__ = ('exit_velo', 'launch_angle', 'xba', 'xslg', 'distance')
+    exit_velo: float
+    launch_angle: float
+    xba: float
+    xslg: float
+    distance: float
+
+
+class Batter(Record):
+    __slots__ = ('last_name', 'position', 'slg', 'ops', 'scorebook')
+    last_name: str
+    position: str
+    slg: str
+    ops: str
+    scorebook: str
+
+
+class BattingOrder(Record):
+    __slots__ = ('at_bat_index', 'batting_order')
+    _nested = {'batting_order': ListOf(Batter)}
+    at_bat_index: int
+    batting_order: List[Batter]
+
+
+class Pitcher(Record):
+    __slots__ = ('name', 'era', 'innings_pitched', 'hits_allowed', 'runs_allowed',
+        'strike_outs', 'walks', 'pitches', 'strikes')
+    name: str
+    era: str
+    innings_pitched: str
+    hits_allowed: int
+    runs_allowed: int
+    strike_outs: int
+    walks: int
+    pitches: int
+    strikes: int
+
+
+class Matchup(Record):
+    __slots__ = ('pitcher',)
+    _nested = {'pitcher': Pitcher}
+    pitcher: Pitcher
+
+
+class PitchCount(Record):
+    __slots__ = ('total', 'strikes', 'avg_speed')
+    total: int
+    strikes: int
+    avg_speed: float
+
+
+class OverviewGame(Record):
+    """State of one game in the overview grid."""
+    __slots__ = ('gamepk', 'game_state', 'start_time', 'inning', 'inning_state', 'runners',
+        'away', 'home', 'count', 'flags')
+    _nested = {'away': Team, 'home': Team, 'count': Count, 'flags': Flags}
+    gamepk: int
+    game_state: str
+    start_time: str
+    inning: int
+    inning_state: str
+    runners: int
+    away: Team
+    home: Team
+    count: Count
+    flags: Flags
+
+
+class GamecastGame(OverviewGame):
+    """State of the game shown in the gamecast."""
+    __slots__ = ('umpire', 'run_expectancy', 'win_probability', 'pitch_details',
+        'hit_details', 'batting_order', 'matchup', 'pitch_counts')
+    _nested = {
+        'umpire': Umpire,
+        'run_expectancy': RunExpectancy,
+        'win_probability': WinProbability,
+        'pitch_details': PitchDetails,
+        'hit_details': HitDetails,
+        'batting_order': BattingOrder,
+        'matchup': Matchup,
+        # Within pitch_counts, None means the pitch type disappeared
+        # from the current pitcher's repertoire
+        'pitch_counts': MapOf(PitchCount, delete_none=True),
+    }
+    umpire: Umpire
+    run_expectancy: RunExpectancy
+    win_probability: WinProbability
+    pitch_details: PitchDetails
+    hit_details: HitDetails
+    batting_order: BattingOrder
+    matchup: Matchup
+    pitch_counts: Dict[str, PitchCount]
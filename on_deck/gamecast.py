@@ -6,8 +6,13 @@ of baseball game statistics and information.
 from on_deck.colors import Colors
 from on_deck.fonts import Fonts
 from on_deck.display_manager import DisplayManager
+from on_deck.game_model import (BattingOrder, Count, GamecastGame, HitDetails, Matchup,
+    PitchCount, PitchDetails, RunExpectancy, Team, Umpire, WinProbability)
+from on_deck.layout import Layout, load_layout, draw_elements, draw_labels
+from on_deck.widgets import Widget, WidgetTree
 
 import math
+from typing import Dict
 
 PITCH_COLORS = {
     # Fastballs
@@ -37,6 +42,40 @@ PITCH_COLORS = {
     'Unknown': Colors.white,
 }
 
+# Gamecast panels in draw order. Each entry is the panel name and the
+# game dict paths the panel reads. A changed path matches a dependency
+# when one is a prefix of the other, so replacing a whole sub dict (or a
+# single leaf inside it) both count as a change. The bounds of each
+# panel come from the layout file.
+PANELS = (
+    ('team_names', (('away', 'abv'), ('home', 'abv'))),
+    ('abs_challenges', (
+        ('away', 'abs_challenges'), ('away', 'challenges'),
+        ('home', 'abs_challenges'), ('home', 'challenges'))),
+    ('linescores', (
+        ('away', 'runs'), ('away', 'hits'), ('away', 'errors'),
+        ('away', 'left_on_base'), ('away', 'xba'), ('away', 'xslg'),
+        ('home', 'runs'), ('home', 'hits'), ('home', 'errors'),
+        ('home', 'left_on_base'), ('home', 'xba'), ('home', 'xslg'))),
+    ('inning', (('inning',), ('inning_state',))),
+    ('bases', (('runners',),)),
+    ('count', (('count',),)),
+    ('umpire', (
+        ('umpire',), ('away', 'abv'), ('home', 'abv'),
+        ('pitch_details', 'umpire_missed_call'))),
+    ('run_expectancy', (('run_expectancy',),)),
+    ('win_probability', (('win_probability',), ('away', 'abv'), ('home', 'abv'))),
+    ('pitch_details', (('pitch_details',),)),
+    ('batting_order', (('batting_order',),)),
+    ('pitcher', (('matchup',),)),
+    ('hit_details', (('hit_details',),)),
+    ('pitch_type_counts', (('pitch_counts',),)),
+)
+
+def _path_matches(path: tuple, dependency: tuple) -> bool:
+    n = min(len(path), len(dependency))
+    return path[:n] == dependency[:n]
+
 def is_barrel(exit_velocity: float, launch_angle: float) -> bool:
     if exit_velocity is None or launch_angle is None:
         return False
@@ -52,301 +91,202 @@ class Gamecast:
     """
     A class to handle the gamecast display for a baseball game.
     """
-    def __init__(self, display_manager: DisplayManager):
+    def __init__(self, display_manager: DisplayManager, layout: Layout = None):
         self.display_manager = display_manager
-        self.game: dict = None
-
-        self._ddo = 4 # double digit offset
-
+        self.layout = layout.gamecast if layout is not None else load_layout('main').gamecast
+        self.game: GamecastGame = None
+
+        self._time: tuple = None
+
+        panels = {
+            'team_names': lambda: self._print_team_names(self.game.away, self.game.home),
+            'abs_challenges': lambda: self._print_abs_challenges(self.game.away,
+                self.game.home),
+            'linescores': lambda: self._print_linescores(self.game.away, self.game.home),
+            'inning': lambda: self._print_inning(self.game.inning, self.game.inning_state),
+            'bases': lambda: self._print_bases(self.game.runners),
+            'count': lambda: self._print_count(self.game.count),
+            'umpire': lambda: self._print_umpire(self.game.umpire, self.game.away,
+                self.game.home, self.game.pitch_details),
+            'run_expectancy': lambda: self._print_run_expectancy(self.game.run_expectancy),
+            'win_probability': lambda: self._print_win_probability(
+                self.game.win_probability, self.game.away, self.game.home),
+            'pitch_details': lambda: self._print_pitch_details(self.game.pitch_details),
+            'batting_order': lambda: self._print_batting_order(self.game.batting_order),
+            'pitcher': lambda: self._print_pitcher(self.game.matchup),
+            'hit_details': lambda: self._print_hit_details(self.game.hit_details),
+            'pitch_type_counts': lambda: self._print_pitch_type_counts(self.game.pitch_counts),
+        }
+
+        root = Widget('gamecast', self.layout.bounds)
+        for name, _ in PANELS:
+            root.add(Widget(name, self.layout.panels[name], self._skip_without_game(panels[name])))
+        root.add(Widget('clock', self.layout.panels['clock'], self._print_clock))
+        self.widgets = WidgetTree(self.display_manager, root)
+
+
+    def _skip_without_game(self, draw):
+        def draw_panel():
+            if self.game is not None:
+                draw()
+        return draw_panel
+
+
+    def panels_to_redraw(self, changed_paths) -> list:
+        """
+        Returns the names of the panels that read any of the given game
+        dict paths, in draw order.
 
-    def _print_team_names(self, away: dict, home: dict):
-        color = Colors.white
+        Args:
+            changed_paths: Iterable of paths (tuples of keys) that
+                changed in the game dict
 
-        self.display_manager.clear_section(129, 0, 155, 28)
-        # self.display_manager.draw_box(129, 0, 155, 28, Colors.white, False)
-        self.display_manager.draw_text(Fonts.ter_u16b, 129, 12, color, away['abv'])
-        self.display_manager.draw_text(Fonts.ter_u16b, 129, 24, color, home['abv'])
+        Returns:
+            list: Panel names in draw order
+        """
+        redraw = set()
+        for path in changed_paths:
+            for name, dependencies in PANELS:
+                if name in redraw:
+                    continue
+                for dependency in dependencies:
+                    if _path_matches(path, dependency):
+                        redraw.add(name)
+                        break
 
+        return [name for name, _ in PANELS if name in redraw]
 
-    def _print_linescore(self, home: bool, runs: int, hits: int, errors: int,
-        lob: int, xba: float, xslg: float):
-        color = Colors.white
-        row_offset = 24 if home else 12
-
-        run_column_offset = 168
-        hit_column_offset = 188
-        error_column_offset = 204
-        lob_column_offset = 220
-        xba_column_offset = 238
-        xslg_column_offset = 268
-
-        if runs is None:
-            runs = 0
-        if hits is None:
-            hits = 0
-        if errors is None:
-            errors = 0
-        if lob is None:
-            lob = 0
-        if xba is None:
-            xba = 0
-        if xslg is None:
-            xslg = 0
-
-        run_column_offset -= self._ddo if runs >= 10 else 0
-        hit_column_offset -= self._ddo if hits >= 10 else 0
-        lob_column_offset -= self._ddo if lob >= 10 else 0
-
-        if runs >= 10:
-            self.display_manager.draw_text(Fonts.ter_u16b, run_column_offset,
-                row_offset, Colors.yellow, f'{runs}')
-        else:
-            self.display_manager.draw_text(Fonts.ter_u16b, run_column_offset,
-                row_offset, Colors.yellow, f'{runs}')
 
-        if hits >= 10:
-            self.display_manager.draw_text(Fonts.ter_u16b, hit_column_offset,
-                row_offset, color, f'{hits}')
-        else:
-            self.display_manager.draw_text(Fonts.ter_u16b, + hit_column_offset,
-                row_offset, color, f'{hits}')
+    def _print_team_names(self, away: Team, home: Team):
+        draw_elements(self.display_manager, self.layout.elements['team_names'],
+            {'away': away.abv, 'home': home.abv})
 
-        self.display_manager.draw_text(Fonts.ter_u16b, error_column_offset,
-            row_offset, color, f'{errors}')
 
-        if lob >= 10:
-            self.display_manager.draw_text(Fonts.ter_u16b, lob_column_offset,
-                row_offset, color, f'{lob}')
-        else:
-            self.display_manager.draw_text(Fonts.ter_u16b, lob_column_offset,
-                row_offset, color, f'{lob}')
+    def _linescore_texts(self, side: str, team: Team) -> Dict[str, str]:
+        runs = team.runs if team.runs is not None else 0
+        hits = team.hits if team.hits is not None else 0
+        errors = team.errors if team.errors is not None else 0
+        lob = team.left_on_base if team.left_on_base is not None else 0
+        xba = team.xba if team.xba is not None else 0
+        xslg = team.xslg if team.xslg is not None else 0
 
         xba = f'{xba:.2f}'
         xba = f'{xba[1:]}' if xba[0] == '0' else f'{xba[0:3]}'
-        self.display_manager.draw_text(Fonts.ter_u16b, xba_column_offset,
-            row_offset, Colors.yellow, xba)
 
         xslg = f'{xslg:.2f}'
         xslg = f'{xslg[1:]}' if xslg[0] == '0' else f'{xslg[0:3]}'
-        self.display_manager.draw_text(Fonts.ter_u16b, xslg_column_offset,
-            row_offset, Colors.yellow, xslg)
 
+        return {
+            f'{side}_runs': f'{runs}',
+            f'{side}_hits': f'{hits}',
+            f'{side}_errors': f'{errors}',
+            f'{side}_lob': f'{lob}',
+            f'{side}_xba': xba,
+            f'{side}_xslg': xslg,
+        }
 
-    def _print_linescores(self, away: dict, home: dict):
-        self.display_manager.clear_section(156, 0, 295, 28)
-        # self.display_manager.draw_box(156, 0, 295, 28, Colors.white, False)
 
-        runs = away['runs']
-        hits = away['hits']
-        errors = away['errors']
-        lob = away['left_on_base']
-        xba = away['xba']
-        xslg = away['xslg']
-        self._print_linescore(False, runs, hits, errors, lob, xba, xslg)
+    def _print_linescores(self, away: Team, home: Team):
+        # self.display_manager.draw_box(156, 0, 294, 28, Colors.white, False)
 
-        runs = home['runs']
-        hits = home['hits']
-        errors = home['errors']
-        lob = home['left_on_base']
-        xba = home['xba']
-        xslg = home['xslg']
-        self._print_linescore(True, runs, hits, errors, lob, xba, xslg)
+        texts = self._linescore_texts('away', away)
+        texts.update(self._linescore_texts('home', home))
+        draw_elements(self.display_manager, self.layout.elements['linescores'], texts)
 
 
     def _print_inning(self, inning: int, inning_state: str):
-        self.display_manager.clear_section(295, 0, 315, 24)
-        # self.display_manager.draw_box(295, 0, 315, 24, Colors.white, False)
+        # self.display_manager.draw_box(295, 0, 314, 24, Colors.white, False)
 
-        column_offset = 302
-        row_offset = 18
-        arrow_size = 5
+        draw_elements(self.display_manager, self.layout.elements['inning'],
+            {'inning': f'{inning}'})
 
-        color = Colors.white
+        for mark in self.layout.marks['inning']:
+            if (mark.name == 'top') and (inning_state == 'T'):
+                self.display_manager.draw_inning_arrow(mark.x, mark.y, mark.size, True,
+                    mark.color)
+            elif (mark.name == 'bottom') and (inning_state == 'B'):
+                self.display_manager.draw_inning_arrow(mark.x, mark.y, mark.size, False,
+                    mark.color)
 
-        if inning >= 10:
-            self.display_manager.draw_text(Fonts.ter_u16b, column_offset - self._ddo,
-                row_offset, color, f'{inning}')
-        else:
-            self.display_manager.draw_text(Fonts.ter_u16b, column_offset,
-                row_offset, color, f'{inning}')
 
-        if inning_state == 'T':
-            self.display_manager.draw_inning_arrow(column_offset+3, row_offset-12,
-                arrow_size, True, color)
-        elif inning_state == 'B':
-            self.display_manager.draw_inning_arrow(column_offset+3, row_offset+1,
-                arrow_size, False, color)
+    def _print_bases(self, runners: int):
+        # self.display_manager.draw_box(315, 0, 349, 24, Colors.white, False)
 
+        bases = {
+            'first': bool(runners & 1),
+            'second': bool(runners & 2),
+            'third': bool(runners & 4),
+        }
 
-    def _print_bases(self, runners: int):
-        self.display_manager.clear_section(315, 0, 350, 24)
-        # self.display_manager.draw_box(315, 0, 350, 24, Colors.white, False)
-
-        second_base_column_offset = 333
-        second_base_row_offset = 8
-
-        base_length = 6
-        base_gap = 2
-        base_offset = base_length + base_gap
-
-        thickness = 2
-
-        bases = [False, False, False]
-
-        if runners & 1:
-            bases[0] = True
-        if runners & 2:
-            bases[1] = True
-        if runners & 4:
-            bases[2] = True
-
-        self.display_manager.draw_diamond(second_base_column_offset - base_offset,
-            second_base_row_offset + base_offset, base_length, thickness, bases[2], Colors.white)
-        self.display_manager.draw_diamond(second_base_column_offset,
-            second_base_row_offset, base_length, thickness, bases[1], Colors.white)
-        self.display_manager.draw_diamond(second_base_column_offset + base_offset,
-            second_base_row_offset + base_offset, base_length, thickness, bases[0], Colors.white)
-
-
-    def _print_count(self, count: dict):
-        self.display_manager.clear_section(350, 0, 384, 24)
-        # self.display_manager.draw_box(350, 0, 384, 24, Colors.white, False)
-
-        circle_column_offset = 355
-        ball_row_offset = 4
-        strike_row_offset = 12
-        out_row_offset = 20
-
-        radius = 3
-        gap = 1
-        thickness = 1
-        delta = 2*radius + gap + 1
-
-        balls_int = count.get('balls', None)
-        if balls_int is not None:
-            balls = [False, False, False, False]
-            if balls_int >= 1:
-                balls[0] = True
-            if balls_int >= 2:
-                balls[1] = True
-            if balls_int >= 3:
-                balls[2] = True
-            if balls_int >= 4:
-                balls[3] = True
-
-            self.display_manager.draw_circle(circle_column_offset + 0*delta,
-                ball_row_offset, radius, thickness, balls[0], Colors.green)
-            self.display_manager.draw_circle(circle_column_offset + 1*delta,
-                ball_row_offset, radius, thickness, balls[1], Colors.green)
-            self.display_manager.draw_circle(circle_column_offset + 2*delta,
-                ball_row_offset, radius, thickness, balls[2], Colors.green)
-            self.display_manager.draw_circle(circle_column_offset + 3*delta,
-                ball_row_offset, radius, thickness, balls[3], Colors.green)
-
-
-        strikes_int = count.get('strikes', None)
-        if strikes_int is not None:
-            strikes = [False, False, False]
-            if strikes_int >= 1:
-                strikes[0] = True
-            if strikes_int >= 2:
-                strikes[1] = True
-            if strikes_int >= 3:
-                strikes[2] = True
-
-            self.display_manager.draw_circle(circle_column_offset + 0*delta,
-                strike_row_offset, radius, thickness, strikes[0], Colors.red)
-            self.display_manager.draw_circle(circle_column_offset + 1*delta,
-                strike_row_offset, radius, thickness, strikes[1], Colors.red)
-            self.display_manager.draw_circle(circle_column_offset + 2*delta,
-                strike_row_offset, radius, thickness, strikes[2], Colors.red)
-
-
-        outs_int = count.get('outs', None)
-        if outs_int is not None:
-            outs = [False, False, False]
-            if outs_int >= 1:
-                outs[0] = True
-            if outs_int >= 2:
-                outs[1] = True
-            if outs_int >= 3:
-                outs[2] = True
-
-            self.display_manager.draw_circle(circle_column_offset + 0*delta,
-                out_row_offset, radius, thickness, outs[0], Colors.white)
-            self.display_manager.draw_circle(circle_column_offset + 1*delta,
-                out_row_offset, radius, thickness, outs[1], Colors.white)
-            self.display_manager.draw_circle(circle_column_offset + 2*delta,
-                out_row_offset, radius, thickness, outs[2], Colors.white)
-
-
-    def _print_umpire(self, umpire: dict, away: dict, home: dict, pitch_details: dict):
-        self.display_manager.clear_section(129, 36, 240, 72)
+        for mark in self.layout.marks['bases']:
+            self.display_manager.draw_diamond(mark.x, mark.y, mark.size, mark.thickness,
+                bases[mark.name], mark.color)
 
-        column_offset = 129
-        row_offset = 48
 
-        umpire_missed_call = pitch_details['umpire_missed_call']
+    def _print_count(self, count: Count):
+        # self.display_manager.draw_box(350, 0, 383, 24, Colors.white, False)
+
+        # One mark per row of circles, named after the count field. The
+        # first n circles of a row are filled
+        for mark in self.layout.marks['count']:
+            n = getattr(count, mark.name)
+            if n is None:
+                continue
+
+            for j in range(mark.count):
+                self.display_manager.draw_circle(mark.x + j*mark.dx, mark.y + j*mark.dy,
+                    mark.size, mark.thickness, n > j, mark.color)
+
+
+    def _print_umpire(self, umpire: Umpire, away: Team, home: Team, pitch_details: PitchDetails):
+
+        umpire_missed_call = pitch_details.umpire_missed_call
         color = Colors.yellow if umpire_missed_call is True else Colors.white
 
-        num_missed = umpire['num_missed']
-        total_calls = umpire['total_calls']
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, f'# Miss:{num_missed:2d}/{total_calls}')
+        num_missed = umpire.num_missed
+        total_calls = umpire.total_calls
 
-        row_offset += 12
-        favor = umpire['home_favor']
-        abv = home['abv']
+        favor = umpire.home_favor
+        favor_abv = home.abv
         if favor == 0:
-            abv = ''
+            favor_abv = ''
         if favor < 0:
-            abv = away['abv']
+            favor_abv = away.abv
             favor *= -1
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, f'FV: {favor:.2f} {abv}')
 
-        row_offset += 12
-        wpa = umpire['home_wpa']
-        abv = home['abv']
+        wpa = umpire.home_wpa
+        wpa_abv = home.abv
         if wpa == 0:
-            abv = ''
+            wpa_abv = ''
         if wpa < 0:
-            abv = away['abv']
+            wpa_abv = away.abv
             wpa *= -1
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, f'WP: {wpa:.1%} {abv}')
-
 
-    def _print_run_expectancy(self, run_expectancy: dict):
-        self.display_manager.clear_section(129, 82, 240, 108)
+        draw_elements(self.display_manager, self.layout.elements['umpire'], {
+            'missed': f'# Miss:{num_missed:2d}/{total_calls}',
+            'favor': f'FV: {favor:.2f} {favor_abv}',
+            'wpa': f'WP: {wpa:.1%} {wpa_abv}',
+        }, color=color)
 
-        column_offset = 129
-        row_offset = 96
 
-        color = Colors.white
+    def _print_run_expectancy(self, run_expectancy: RunExpectancy):
 
-        re_avg = run_expectancy['average_runs']
-        re_ts = run_expectancy['to_score']
+        re_avg = run_expectancy.average_runs
+        re_ts = run_expectancy.to_score
 
         if (re_avg is None) or (re_ts is None):
             return
 
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, f'AVG:{re_avg:4.2f}')
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset+12,
-            color, f'1+:{re_ts:5.1%}')
-
+        draw_elements(self.display_manager, self.layout.elements['run_expectancy'], {
+            'average_runs': f'AVG:{re_avg:4.2f}',
+            'to_score': f'1+:{re_ts:5.1%}',
+        })
 
-    def _print_win_probability(self, win_probability: dict, away: dict, home: dict):
-        self.display_manager.clear_section(129, 108, 240, 120)
-
-        column_offset = 129
-        row_offset = 120
 
-        color = Colors.white
+    def _print_win_probability(self, win_probability: WinProbability, away: Team, home: Team):
 
-        wp_away = win_probability['away']
-        wp_home = win_probability['home']
+        wp_away = win_probability.away
+        wp_home = win_probability.home
 
         if (wp_away is None) or (wp_home is None):
             return
@@ -355,106 +295,78 @@ class Gamecast:
             team = ''
             wp = wp_away
         elif wp_away > wp_home:
-            team = away['abv']
+            team = away.abv
             wp = wp_away
         else:
-            team = home['abv']
+            team = home.abv
             wp = wp_home
 
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, f'WP:{wp:5.1%} {team}')
-
+        draw_elements(self.display_manager, self.layout.elements['win_probability'],
+            {'win_probability': f'WP:{wp:5.1%} {team}'})
 
-    def _print_pitch_details(self, pitch_details: dict):
-        self.display_manager.clear_section(129, 132, 240+24, 180)
 
-        column_offset = 129
-        row_offset = 144
-
-        color = Colors.white
+    def _print_pitch_details(self, pitch_details: PitchDetails):
 
-        pitch_type = pitch_details['type']
+        pitch_type = pitch_details.type
         if pitch_type is None:
             return
         if pitch_type == 'Four-Seam Fastball':
             pitch_type = '4-Seam'
 
-
         pitch_color = PITCH_COLORS.get(pitch_type, Colors.white)
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            pitch_color, f'{pitch_type}')
 
-        count = pitch_details['at_bat_pitch_count']
-        if count is 'null' or count is None:
+        count = pitch_details.at_bat_pitch_count
+        if count == 'null' or count is None:
             count = ''
-        dx = 0 if count < 10 else -8
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset+96+dx, row_offset, Colors.white, str(count))
 
-        pitch_speed = pitch_details['speed']
+        texts = {'type': f'{pitch_type}', 'count': str(count)}
+        colors = {'type': pitch_color, 'speed': pitch_color, 'mph': pitch_color}
+
+        pitch_speed = pitch_details.speed
         if pitch_speed is None:
+            draw_elements(self.display_manager, self.layout.elements['pitch_details'],
+                texts, colors)
             return
-        row_offset += 12
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            pitch_color, f'{pitch_speed:.1f}')
-        aditional_offset = 0
-        if pitch_speed > 100:
-            aditional_offset += 8
-        self.display_manager.draw_text(Fonts.ter_u12b, column_offset+38+aditional_offset,
-            row_offset, pitch_color, 'MPH')
-
-        pitch_hand = pitch_details['pitch_hand']
-        is_rhp = True if pitch_hand == 'R' else False
-        break_horizontal = pitch_details['break_horizontal']
-        break_direction = 'A' if (is_rhp ^ (break_horizontal < 0)) else 'G'
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset+64, row_offset,
-            color, f'{abs(break_horizontal):5.1f}')
-        self.display_manager.draw_text(Fonts.ter_u12b, column_offset+104, row_offset,
-            color, break_direction)
 
+        pitch_hand = pitch_details.pitch_hand
+        is_rhp = True if pitch_hand == 'R' else False
+        break_horizontal = pitch_details.break_horizontal
+        texts['speed'] = f'{pitch_speed:.1f}'
+        texts['mph'] = 'MPH'
+        texts['horizontal'] = f'{abs(break_horizontal):5.1f}'
+        texts['horizontal_direction'] = 'A' if (is_rhp ^ (break_horizontal < 0)) else 'G'
 
-        row_offset += 12
-        pitch_zone = pitch_details['zone']
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, 'Zone:')
-        color = Colors.red
+        pitch_zone = pitch_details.zone
         if pitch_zone is not None:
-            if pitch_zone > 9:
-                color = Colors.green
-            self.display_manager.draw_text(Fonts.ter_u16b, column_offset+40, row_offset,
-                color, f'{pitch_zone:2d}')
+            texts['zone'] = f'{pitch_zone:2d}'
+            colors['zone'] = Colors.green if pitch_zone > 9 else Colors.red
 
-        color = Colors.white
-        break_vertical_induced = pitch_details['break_vertical_induced']
-        break_direction = 'U' if break_vertical_induced > 0 else 'D'
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset+64, row_offset,
-            color, f'{abs(break_vertical_induced):5.1f}')
-        self.display_manager.draw_text(Fonts.ter_u12b, column_offset+104, row_offset,
-            color, break_direction)
+        break_vertical_induced = pitch_details.break_vertical_induced
+        texts['vertical'] = f'{abs(break_vertical_induced):5.1f}'
+        texts['vertical_direction'] = 'U' if break_vertical_induced > 0 else 'D'
+
+        draw_labels(self.display_manager, self.layout.labels['pitch_details'])
+        draw_elements(self.display_manager, self.layout.elements['pitch_details'],
+            texts, colors)
 
 
-    def _print_pitch_type_counts(self, pitch_counts: dict=None):
-        self.display_manager.draw_box(240, 194, 384, 256, Colors.black, True)
+    def _print_pitch_type_counts(self, pitch_counts: Dict[str, PitchCount] = None):
 
         if len(pitch_counts) == 0:
             return False
 
+        rows = self.layout.rows['pitch_type_counts']
         pitch_counts = sorted(
             (
                 (pitch, count)
                 for pitch, count in pitch_counts.items()
                 if pitch and count is not None
             ),
-            key=lambda item: item[1]['total'],
+            key=lambda item: item[1].total,
             reverse=True,
-            )[:6]
-
-        row_offset = 204
-        column_offset = 240
-
-        for pitch, count in pitch_counts:
-            if count is None:
-                continue
+            )[:len(rows)]
 
+        for row, (pitch, count) in zip(rows, pitch_counts):
             if pitch == 'Four-Seam Fastball':
                 pitch = '4-Seam'
             if pitch == 'Curveball':
@@ -468,205 +380,187 @@ class Gamecast:
 
             color = PITCH_COLORS.get(pitch, Colors.white)
 
-            total = count['total']
-            strikes = count['strikes']
-            speed = count['avg_speed']
-
-            self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset, color, pitch[0:8])
-
-            x = f'{strikes:d}/{total:>2d}'
-            dx = 8*(18-len(x))
-            self.display_manager.draw_text(Fonts.ter_u16b, column_offset+dx, row_offset, color, x)
-
-            x = f'{speed:.1f}'
-            dx = 8*(12-len(x))
-            self.display_manager.draw_text(Fonts.ter_u16b, column_offset+dx, row_offset, color, x)
-
-            row_offset += 12
+            draw_elements(self.display_manager, row, {
+                'pitch': pitch[0:8],
+                'pitches': f'{count.strikes:d}/{count.total:>2d}',
+                'speed': f'{count.avg_speed:.1f}',
+            }, color=color)
 
         return True
 
 
-    def _print_hit_details(self, hit_details: dict):
-        # self.display_manager.clear_section(129, 180, 231, 256)
-        self.display_manager.draw_box(129, 180, 231, 220, Colors.black, True)
-
-        column_offset = 129
-        row_offset = 192
+    def _print_hit_details(self, hit_details: HitDetails):
 
         color = Colors.white
-        exit_velo = hit_details['exit_velo']
-        launch_angle = hit_details['launch_angle']
-        xba = hit_details['xba']
-        xslg = hit_details['xslg']
+        exit_velo = hit_details.exit_velo
+        launch_angle = hit_details.launch_angle
+        xba = hit_details.xba
+        xslg = hit_details.xslg
         if is_barrel(exit_velo, launch_angle):
             color = Colors.red
 
-        if hit_details['distance'] is None:
-            self.display_manager.clear_section(column_offset, row_offset,
-                column_offset+128, row_offset+24)
+        if hit_details.distance is None:
             return False
 
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, f'{exit_velo:5.1f} MPH')
-
         bases = f'{xslg/xba:.1f}' if xba != 0 else '0.0'
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset+(8*10), row_offset,
-            color, bases)
 
         xslg = f'{xslg:.3f}'
         xslg = f' {xslg[1:]}' if xslg[0] == '0' else xslg
-        row_offset += 12
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, f'{launch_angle:5.1f}°  {xslg}')
 
-        distance = hit_details['distance']
+        distance = hit_details.distance
         xba = f'{xba:.3f}'
         xba = f' {xba[1:]}' if xba[0] == '0' else xba
-        row_offset += 12
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            color, f'{distance:5.1f} ft{xba}')
 
-        # row_offset += 12
-        # self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-        #     color, f'{xba} {xslg}')
+        draw_elements(self.display_manager, self.layout.elements['hit_details'], {
+            'exit_velo': f'{exit_velo:5.1f} MPH',
+            'bases': bases,
+            'launch_angle': f'{launch_angle:5.1f}°  {xslg}',
+            'distance': f'{distance:5.1f} ft{xba}',
+        }, color=color)
 
         return True
 
 
-    def _print_batting_order(self, batting_order: dict):
-        row_offset = 36
-        column_offset = 240
+    def _print_batting_order(self, batting_order: BattingOrder):
+        # self.display_manager.draw_box(240, 36, 383, 147, Colors.white)
 
-        # self.display_manager.draw_box(240, 36, 386, 146, Colors.white)
-        self.display_manager.clear_section(240, 36, 386, 146)
-
-        at_bat_index = batting_order['at_bat_index']
-        batting_order = batting_order['batting_order']
+        at_bat_index = batting_order.at_bat_index
+        batting_order = batting_order.batting_order
 
         if batting_order is None:
             return
 
-        for i, batter in enumerate(batting_order):
+        for i, (row, batter) in enumerate(zip(self.layout.rows['batting_order'], batting_order)):
             color = Colors.white
             if at_bat_index == i+1:
                 color = Colors.yellow
 
-            row_offset += 12
-            name = batter['last_name']
-            slg = batter['slg']
-            ops = batter['ops']
-            position = batter['position']
-            scorebook = batter['scorebook']
+            name = batter.last_name
+            ops = batter.ops
+            position = batter.position
+            scorebook = batter.scorebook
 
             x = scorebook if scorebook is not None else ops
 
-            self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-                color, rf'{position:>2s} {name[:10]:10s}{x:>5s}')
-
+            draw_elements(self.display_manager, row,
+                {'batter': rf'{position:>2s} {name[:10]:10s}{x:>5s}'}, color=color)
 
-    def _print_pitcher(self, matchup: dict):
-        row_offset = 168
-        column_offset = 240
 
-        # self.display_manager.draw_box(240, 156, 384, 204, Colors.white)
-        self.display_manager.clear_section(240, 156, 384, 204)
+    def _print_pitcher(self, matchup: Matchup):
+        # self.display_manager.draw_box(240, 156, 383, 193, Colors.white)
 
-        pitcher = matchup['pitcher']
+        pitcher = matchup.pitcher
 
         if pitcher is None:
             return
 
-        if (pitcher.get('name', None) is None) or (pitcher.get('hits_allowed', None) is None):
+        if (pitcher.name is None) or (pitcher.hits_allowed is None):
             return
 
-        pitcher_name = f' P {pitcher["name"][:10]:10s}{pitcher["era"]:>5s}'
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            Colors.white, pitcher_name)
-
-        row_offset += 12
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            Colors.white, ' IP H R K BB  S/P')
-
-        row_offset += 12
-
-        pitch_count = pitcher['pitches']
-        pitches = f'{pitcher["pitches"]:2d}'[1:3] if pitcher['pitches'] >= 100 else f'{pitcher["pitches"]:>2d}'
-        pitch_count = f'{pitcher["strikes"]:2d}/{pitches}'
-        innings_pitched = pitcher['innings_pitched']
-        hits = pitcher['hits_allowed']
-        runs = pitcher['runs_allowed']
-        strike_outs = pitcher['strike_outs']
-        walks = pitcher['walks']
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset,
-            Colors.white, f'{innings_pitched}{hits:>2d}{runs:>2d} {strike_outs:<2d}{walks:>2d} {pitch_count}')
-
+        pitcher_name = f' P {pitcher.name[:10]:10s}{pitcher.era:>5s}'
 
-    def _print_abs_challenges(self, away: dict, home: dict):
-        y1 = 3
-        y2 = 6
-        y3 = 9
+        draw_labels(self.display_manager, self.layout.labels['pitcher'])
 
-        if away['abs_challenges'] >= 2:
-            self.display_manager.draw_pixel(155, y1, Colors.white)
+        pitches = f'{pitcher.pitches:2d}'[1:3] if pitcher.pitches >= 100 else f'{pitcher.pitches:>2d}'
+        pitch_count = f'{pitcher.strikes:2d}/{pitches}'
+        innings_pitched = pitcher.innings_pitched
+        hits = pitcher.hits_allowed
+        runs = pitcher.runs_allowed
+        strike_outs = pitcher.strike_outs
+        walks = pitcher.walks
 
-        if away['abs_challenges'] >= 1:
-            self.display_manager.draw_pixel(155, y2, Colors.white)
+        draw_elements(self.display_manager, self.layout.elements['pitcher'], {
+            'name': pitcher_name,
+            'line': f'{innings_pitched}{hits:>2d}{runs:>2d} {strike_outs:<2d}{walks:>2d} {pitch_count}',
+        })
 
-        if away['challenges'] >= 1:
-            self.display_manager.draw_line(155, y3, 155, y3+1, Colors.white)
 
-        if home['abs_challenges'] >= 2:
-            self.display_manager.draw_pixel(155, y1+12, Colors.white)
+    def _print_abs_challenges(self, away: Team, home: Team):
+        teams = {'away': away, 'home': home}
 
-        if home['abs_challenges'] >= 1:
-            self.display_manager.draw_pixel(155, y2+12, Colors.white)
+        # Marks are named <team>_<field>. The first n ticks of a mark
+        # are drawn, ticks are size pixels tall
+        for mark in self.layout.marks['abs_challenges']:
+            side, field = mark.name.split('_', 1)
+            n = getattr(teams[side], field)
 
-        if home['challenges'] >= 1:
-            self.display_manager.draw_line(155, y3+12, 155, y3+13, Colors.white)
+            for j in range(min(n, mark.count)):
+                x = mark.x + j*mark.dx
+                y = mark.y + j*mark.dy
+                if mark.size == 1:
+                    self.display_manager.draw_pixel(x, y, mark.color)
+                else:
+                    self.display_manager.draw_line(x, y, x, y + mark.size - 1, mark.color)
 
 
-    def print_game(self, game: dict):
+    def print_game(self, game: GamecastGame, changed_paths=None):
         """
         Print the game information to the screen.
-        This function is called when the gamecast is updated.
+        This function is called when the gamecast is updated. When
+        changed_paths is given only the panel widgets that depend on
+        those paths are marked dirty and redrawn. Leave it as None to force a full
+        redraw (used when the gamecast is reset or the mode changes).
 
         Args:
-            game (dict): The game information to print.
-                The game information is a dictionary with the following keys:
-                - away: The away team information (dict)
-                - home: The home team information (dict)
+            game (GamecastGame): The game information to print.
+                The game information has the following fields:
+                - away: The away team information (Team)
+                - home: The home team information (Team)
                 - inning: The current inning (int)
                 - inning_state: The current inning state (str)
                 - runners: The runners on base (int)
-                - count: The current count (dict)
-                - umpire: The umpire information (dict)
-                - run_expectancy: The run expectancy information (dict)
-                - win_probability: The win probability information (dict)
-                - pitch_details: The pitch details information (dict)
-                - hit_details: The hit details information (dict)
-                - batting_order: The batting order information (dict)
-                - matchup: The matchup information (dict)
+                - count: The current count (Count)
+                - umpire: The umpire information (Umpire)
+                - run_expectancy: The run expectancy information (RunExpectancy)
+                - win_probability: The win probability information (WinProbability)
+                - pitch_details: The pitch details information (PitchDetails)
+                - hit_details: The hit details information (HitDetails)
+                - batting_order: The batting order information (BattingOrder)
+                - matchup: The matchup information (Matchup)
+            changed_paths: Iterable of paths (tuples of keys) that
+                changed since the last print. None redraws everything.
+
+        Returns:
+            bool: True if anything was redrawn, False otherwise
         """
-        self._print_team_names(game['away'], game['home'])
-        self._print_linescores(game['away'], game['home'])
-        self._print_abs_challenges(game['away'], game['home'])
-        self._print_inning(game['inning'], game['inning_state'])
-        self._print_bases(game['runners'])
-        self._print_count(game['count'])
-        self._print_umpire(game['umpire'], game['away'], game['home'], game['pitch_details'])
-        self._print_run_expectancy(game['run_expectancy'])
-        self._print_win_probability(game['win_probability'], game['away'], game['home'])
-        self._print_pitch_details(game['pitch_details'])
-        self._print_batting_order(game['batting_order'])
-        self._print_pitcher(game['matchup'])
-        self._print_hit_details(game['hit_details'])
-        self._print_pitch_type_counts(game['pitch_counts'])
+        self.game = game
+
+        if changed_paths is None:
+            panels = [name for name, _ in PANELS]
+        else:
+            panels = self.panels_to_redraw(changed_paths)
+
+        if not panels:
+            return False
+
+        self.widgets.mark_dirty(*panels)
+        if not self.widgets.render():
+            return False
         self.display_manager.swap_frame()
+        return True
 
 
     def print_time(self, delay_date: str, delay_time: str, delay: int):
-        self.display_manager.draw_box(129, 220, 231, 256, Colors.black, True)
+        """
+        Prints the delay and the delayed date and time in the bottom
+        left of the gamecast.
+
+        Args:
+            delay_date (str): Delayed date in ISO format
+            delay_time (str): Delayed time
+            delay (int): Delay in seconds
+        """
+        self._time = (delay_date, delay_time, delay)
+        self.widgets.mark_dirty('clock')
+        self.widgets.render()
+        self.display_manager.swap_frame()
+
+
+    def _print_clock(self):
+        if self._time is None:
+            return
+
+        delay_date, delay_time, delay = self._time
         column_offset = 129
         row_offset = 204+12*3
 
@@ -681,7 +575,6 @@ class Gamecast:
         row_offset += 12
         combined2 = f'{delay_time}'
         self.display_manager.draw_text(Fonts.ter_u16b, column_offset, row_offset, Colors.green, combined2)
-        self.display_manager.swap_frame()
 
 if __name__ == '__main__':
     print('wrong module dummy')
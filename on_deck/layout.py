@@ -0,0 +1,306 @@
+"""
+Loads the board layouts from the layouts folder. A layout is a JSON
+file that describes one board geometry: the matrix options for the real
+hardware and for the emulator, the overview game grid, the bounds of
+every widget, the static labels drawn inside them and the position,
+font and alignment of every text and shape the panels draw. Each layout
+is compiled once into flat draw lists so rendering only has to fill in
+the text and look values up.
+"""
+
+import functools
+import json
+import os
+from typing import Dict, List, NamedTuple, Tuple
+
+from on_deck.colors import Colors
+from on_deck.display_manager import DisplayManager
+from on_deck.fonts import Fonts
+from on_deck.matrix_loader import RGBMatrixOptions, graphics
+
+Bounds = Tuple[int, int, int, int]
+
+LAYOUTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'layouts')
+
+
+class DrawOp(NamedTuple):
+    """A single precomputed text draw. x is already aligned."""
+    font: graphics.Font
+    x: int
+    y: int
+    color: graphics.Color
+    text: str
+
+
+class TextElement(NamedTuple):
+    """
+    A text whose value is only known when drawn. The text is aligned on
+    x, or on the end of the follows element plus x when follows is set.
+    """
+    name: str
+    font: graphics.Font
+    x: int
+    y: int
+    align: str
+    color: graphics.Color
+    follows: str
+
+
+class Mark(NamedTuple):
+    """
+    A shape drawn count times, copy i at (x + i*dx, y + i*dy). What
+    shape it is and what size means is up to the panel drawing it.
+    """
+    name: str
+    x: int
+    y: int
+    size: int
+    thickness: int
+    count: int
+    dx: int
+    dy: int
+    color: graphics.Color
+
+
+def _aligned_x(font: graphics.Font, x: int, align: str, text: str) -> int:
+    if align == 'left':
+        return x
+    if align == 'right':
+        return x - Fonts.text_width(font, text)
+    if align == 'center':
+        return x - Fonts.text_width(font, text) // 2
+    if align == 'decimal':
+        return x - Fonts.text_width(font, text.split('.', 1)[0])
+    raise ValueError(f'Alignment {align} not recognized')
+
+
+def _compile_labels(labels: List[dict]) -> Tuple[DrawOp, ...]:
+    ops = []
+    for label in labels:
+        font = getattr(Fonts, label['font'])
+        color = getattr(Colors, label.get('color', 'white'))
+        text = label['text']
+        x = _aligned_x(font, label['x'], label.get('align', 'left'), text)
+        ops.append(DrawOp(font, x, label['y'], color, text))
+    return tuple(ops)
+
+
+def _compile_elements(elements: List[dict], dx: int = 0, dy: int = 0) -> Tuple[TextElement, ...]:
+    return tuple(
+        TextElement(
+            element['name'],
+            getattr(Fonts, element['font']),
+            element['x'] + (0 if 'follows' in element else dx),
+            element['y'] + dy,
+            element.get('align', 'left'),
+            getattr(Colors, element.get('color', 'white')),
+            element.get('follows'),
+        )
+        for element in elements
+    )
+
+
+def _compile_marks(marks: List[dict], dx: int = 0, dy: int = 0) -> Tuple[Mark, ...]:
+    return tuple(
+        Mark(
+            mark['name'],
+            mark['x'] + dx,
+            mark['y'] + dy,
+            mark.get('size', 1),
+            mark.get('thickness', 1),
+            mark.get('count', 1),
+            mark.get('dx', 0),
+            mark.get('dy', 0),
+            getattr(Colors, mark.get('color', 'white')),
+        )
+        for mark in marks
+    )
+
+
+class Section:
+    """
+    Compiled layout of one area of the board (overview, gamecast or
+    desk). Holds the widget bounds, the static label draw lists and the
+    text element and mark draw lists of every panel.
+
+    A panel listed in rows is drawn as count copies of its elements,
+    each step pixels below the last, in rows[name]. Panels that share
+    a panel_template get its elements and marks moved to the top left
+    corner of their bounds.
+    """
+    def __init__(self, description: dict):
+        self.bounds: Bounds = tuple(description['bounds'])
+        self.panels: Dict[str, Bounds] = {
+            name: tuple(bounds) for name, bounds in description.get('panels', {}).items()
+        }
+        self.labels: Dict[str, Tuple[DrawOp, ...]] = {
+            name: _compile_labels(labels)
+            for name, labels in description.get('labels', {}).items()
+        }
+        self.elements: Dict[str, Tuple[TextElement, ...]] = {
+            name: _compile_elements(elements)
+            for name, elements in description.get('elements', {}).items()
+        }
+        self.marks: Dict[str, Tuple[Mark, ...]] = {
+            name: _compile_marks(marks)
+            for name, marks in description.get('marks', {}).items()
+        }
+        self.rows: Dict[str, Tuple[Tuple[TextElement, ...], ...]] = {
+            name: tuple(
+                _compile_elements(description['elements'][name], 0, i * rows['step'])
+                for i in range(rows['count'])
+            )
+            for name, rows in description.get('rows', {}).items()
+        }
+
+        template = description.get('panel_template')
+        if template is not None:
+            for name in template['panels']:
+                x, y = self.panels[name][:2]
+                self.elements[name] = _compile_elements(template.get('elements', []), x, y)
+                self.marks[name] = _compile_marks(template.get('marks', []), x, y)
+
+
+class OverviewGrid(Section):
+    """
+    Compiled overview grid. slot_origins[i] is the column offset and
+    the baseline row of the away team for game slot i, slot_bounds[i]
+    is the widget bounds of the slot. The slot elements and marks are
+    given relative to the slot origin and compiled once per slot into
+    slot_elements[i] and slot_marks[i].
+    """
+    def __init__(self, description: dict):
+        super().__init__(description)
+        x0, y0 = self.bounds[0], self.bounds[1]
+        self.columns: int = description['columns']
+        self.games_per_column: int = description['games_per_column']
+        slot_width = description['slot_width']
+        slot_height = description['slot_height']
+        baseline = description['baseline']
+
+        self.slot_origins: List[Tuple[int, int]] = []
+        self.slot_bounds: List[Bounds] = []
+        for i in range(self.columns * self.games_per_column):
+            column = i // self.games_per_column
+            row = i % self.games_per_column
+            x = x0 + column * slot_width
+            y = y0 + row * slot_height
+            self.slot_origins.append((x, y + baseline))
+            self.slot_bounds.append((x, y, x + slot_width - 1, y + slot_height - 1))
+
+        slot = description.get('slot', {})
+        self.slot_elements: List[Tuple[TextElement, ...]] = [
+            _compile_elements(slot.get('elements', []), x, y) for x, y in self.slot_origins
+        ]
+        self.slot_marks: List[Tuple[Mark, ...]] = [
+            _compile_marks(slot.get('marks', []), x, y) for x, y in self.slot_origins
+        ]
+
+
+class Layout:
+    """
+    Compiled board layout. Sections that the layout file does not
+    describe are None.
+    """
+    def __init__(self, description: dict):
+        self.name: str = description['name']
+        self.width: int = description['width']
+        self.height: int = description['height']
+        self._matrix: dict = description['matrix']
+
+        self.overview: OverviewGrid = None
+        self.gamecast: Section = None
+        self.desk: Section = None
+
+        if 'overview' in description:
+            self.overview = OverviewGrid(description['overview'])
+        if 'gamecast' in description:
+            self.gamecast = Section(description['gamecast'])
+        if 'desk' in description:
+            self.desk = Section(description['desk'])
+
+    def matrix_options(self, emulator: bool) -> RGBMatrixOptions:
+        """
+        Returns the RGBMatrixOptions object for this board.
+
+        Args:
+            emulator (bool): True to get the emulator options, False to
+                get the options for the real hardware
+
+        Returns:
+            RGBMatrixOptions: RGBMatrixOptions object
+        """
+        options = RGBMatrixOptions()
+        settings = self._matrix['emulator' if emulator else 'hardware']
+        for key, value in settings.items():
+            setattr(options, key, value)
+        return options
+
+
+@functools.lru_cache(maxsize=None)
+def load_layout(name: str) -> Layout:
+    """
+    Loads and compiles a layout. Layouts are only compiled once, later
+    calls return the same Layout object.
+
+    Args:
+        name (str): Name of a layout in the layouts folder (without
+            .json) or a path to a layout file
+
+    Returns:
+        Layout: Compiled layout
+    """
+    path = name
+    if not os.path.exists(path):
+        path = os.path.join(LAYOUTS_PATH, f'{name}.json')
+
+    with open(path, encoding='utf-8') as f:
+        description = json.load(f)
+
+    return Layout(description)
+
+
+def draw_labels(display_manager: DisplayManager, ops: Tuple[DrawOp, ...]):
+    """
+    Draws a compiled label draw list.
+
+    Args:
+        display_manager (DisplayManager): Display to draw on
+        ops (Tuple[DrawOp, ...]): Compiled draw list
+    """
+    for op in ops:
+        display_manager.draw_text(op.font, op.x, op.y, op.color, op.text)
+
+
+def draw_elements(display_manager: DisplayManager, elements: Tuple[TextElement, ...],
+    texts: Dict[str, str], colors: Dict[str, graphics.Color] = None,
+    color: graphics.Color = None):
+    """
+    Draws the elements of a compiled draw list that were given a text,
+    in draw list order. Elements without a text are skipped.
+
+    Args:
+        display_manager (DisplayManager): Display to draw on
+        elements (Tuple[TextElement, ...]): Compiled draw list
+        texts (Dict[str, str]): Text of each element to draw, by name
+        colors (Dict[str, graphics.Color]): Colors that replace the
+            layout color of an element, by name
+        color (graphics.Color): Color that replaces the layout color
+            of every element without an entry in colors
+    """
+    ends = {}
+    for element in elements:
+        text = texts.get(element.name)
+        if text is None:
+            continue
+
+        element_color = color if color is not None else element.color
+        if (colors is not None) and (element.name in colors):
+            element_color = colors[element.name]
+
+        x = element.x
+        if element.follows is not None:
+            x += ends[element.follows]
+        x = _aligned_x(element.font, x, element.align, text)
+        display_manager.draw_text(element.font, x, element.y, element_color, text)
+        ends[element.name] = x + Fonts.text_width(element.font, text)
@@ -0,0 +1,278 @@
+"""
+In-process stand-in for the parts of redis-py the scoreboard uses:
+get, set, mget, publish and pubsub with subscribe, psubscribe and
+get_message. It lets the display handlers run against a replayed
+recording without a Redis server. AsyncLocalRedis wraps it with the
+redis.asyncio method names for the asyncio server.
+
+Values are stored and returned as bytes like redis-py returns them.
+"""
+
+import asyncio
+import fnmatch
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Union
+
+Value = Union[bytes, str, int, float]
+
+
+def _encode(value: Value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value).encode('utf-8')
+    raise TypeError(f'Invalid input of type {type(value).__name__}')
+
+
+class LocalPubSub:
+    """
+    Subscription to a LocalRedis bus. Messages are queued until they
+    are read with get_message.
+    """
+    def __init__(self, bus: 'LocalRedis'):
+        self._bus = bus
+        self._channels = set()
+        self._patterns = set()
+        self._messages = deque()
+        self._ready = threading.Condition()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self._channels or self._patterns)
+
+    def subscribe(self, *channels: Value):
+        for channel in channels:
+            channel = _encode(channel)
+            self._channels.add(channel)
+            self._put({'type': 'subscribe', 'pattern': None, 'channel': channel,
+                'data': len(self._channels) + len(self._patterns)})
+        self._bus._register(self)
+
+    def psubscribe(self, *patterns: Value):
+        for pattern in patterns:
+            pattern = _encode(pattern)
+            self._patterns.add(pattern)
+            self._put({'type': 'psubscribe', 'pattern': None, 'channel': pattern,
+                'data': len(self._channels) + len(self._patterns)})
+        self._bus._register(self)
+
+    def unsubscribe(self, *channels: Value):
+        for channel in channels or list(self._channels):
+            self._channels.discard(_encode(channel))
+
+    def punsubscribe(self, *patterns: Value):
+        for pattern in patterns or list(self._patterns):
+            self._patterns.discard(_encode(pattern))
+
+    def _deliver(self, channel: bytes, data: bytes) -> int:
+        delivered = 0
+        if channel in self._channels:
+            self._put({'type': 'message', 'pattern': None, 'channel': channel, 'data': data})
+            delivered += 1
+        for pattern in self._patterns:
+            if fnmatch.fnmatchcase(channel.decode('utf-8', 'replace'), pattern.decode('utf-8')):
+                self._put({'type': 'pmessage', 'pattern': pattern, 'channel': channel,
+                    'data': data})
+                delivered += 1
+        return delivered
+
+    def _put(self, message: dict):
+        with self._ready:
+            self._messages.append(message)
+            self._ready.notify()
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> dict:
+        """
+        Returns the next message, waiting up to timeout seconds for one.
+
+        Args:
+            ignore_subscribe_messages (bool): Skip subscribe confirmations
+            timeout (float): Seconds to wait. None waits forever
+
+        Returns:
+            dict: Message in the redis-py format or None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while True:
+                while self._messages:
+                    message = self._messages.popleft()
+                    if ignore_subscribe_messages and message['type'] not in ('message', 'pmessage'):
+                        continue
+                    return message
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if (remaining is not None) and (remaining <= 0):
+                    return None
+                self._ready.wait(remaining)
+
+    def listen(self):
+        """Yields messages forever."""
+        while True:
+            yield self.get_message(timeout=None)
+
+    def close(self):
+        self.unsubscribe()
+        self.punsubscribe()
+        self._bus._unregister(self)
+
+
+class LocalRedis:
+    """
+    Thread safe in-process key value store and pub/sub bus with the
+    redis-py method names.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[bytes, bytes] = {}
+        self._subscribers: List[LocalPubSub] = []
+
+    def get(self, key: Value) -> bytes:
+        with self._lock:
+            return self._values.get(_encode(key))
+
+    def set(self, key: Value, value: Value) -> bool:
+        with self._lock:
+            self._values[_encode(key)] = _encode(value)
+        return True
+
+    def mset(self, mapping: Dict[Value, Value]) -> bool:
+        with self._lock:
+            for key, value in mapping.items():
+                self._values[_encode(key)] = _encode(value)
+        return True
+
+    def incr(self, key: Value, amount: int = 1) -> int:
+        key = _encode(key)
+        with self._lock:
+            value = int(self._values.get(key, b'0')) + amount
+            self._values[key] = _encode(value)
+        return value
+
+    def mget(self, keys, *args) -> List[bytes]:
+        if isinstance(keys, (str, bytes, int)):
+            keys = [keys]
+        keys = list(keys) + list(args)
+        with self._lock:
+            return [self._values.get(_encode(key)) for key in keys]
+
+    def delete(self, *keys: Value) -> int:
+        with self._lock:
+            return sum(self._values.pop(_encode(key), None) is not None for key in keys)
+
+    def keys(self, pattern: Value = '*') -> List[bytes]:
+        pattern = _encode(pattern).decode('utf-8')
+        with self._lock:
+            return [key for key in self._values
+                if fnmatch.fnmatchcase(key.decode('utf-8', 'replace'), pattern)]
+
+    def publish(self, channel: Value, message: Value) -> int:
+        channel = _encode(channel)
+        data = _encode(message)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return sum(subscriber._deliver(channel, data) for subscriber in subscribers)
+
+    def pubsub(self) -> LocalPubSub:
+        return LocalPubSub(self)
+
+    def ping(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+    def _register(self, subscriber: LocalPubSub):
+        with self._lock:
+            if subscriber not in self._subscribers:
+                self._subscribers.append(subscriber)
+
+    def _unregister(self, subscriber: LocalPubSub):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+
+class AsyncLocalPubSub:
+    """
+    LocalPubSub with coroutine methods. get_message polls the
+    subscription every POLL_INTERVAL seconds rather than blocking a
+    thread of the event loop.
+    """
+    POLL_INTERVAL = 0.002
+
+    def __init__(self, pubsub: LocalPubSub):
+        self._pubsub = pubsub
+
+    async def subscribe(self, *channels: Value):
+        self._pubsub.subscribe(*channels)
+
+    async def psubscribe(self, *patterns: Value):
+        self._pubsub.psubscribe(*patterns)
+
+    async def unsubscribe(self, *channels: Value):
+        self._pubsub.unsubscribe(*channels)
+
+    async def punsubscribe(self, *patterns: Value):
+        self._pubsub.punsubscribe(*patterns)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False,
+            timeout: float = 0.0) -> dict:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            message = self._pubsub.get_message(ignore_subscribe_messages)
+            if message is not None:
+                return message
+            if (deadline is not None) and (time.monotonic() >= deadline):
+                return None
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    async def aclose(self):
+        self._pubsub.close()
+
+
+class AsyncLocalRedis:
+    """
+    LocalRedis with coroutine methods like redis.asyncio.Redis.
+
+    Args:
+        bus (LocalRedis): Store to wrap, a new one by default
+    """
+    def __init__(self, bus: LocalRedis = None):
+        self.bus = bus if bus is not None else LocalRedis()
+
+    async def get(self, key: Value) -> bytes:
+        return self.bus.get(key)
+
+    async def set(self, key: Value, value: Value) -> bool:
+        return self.bus.set(key, value)
+
+    async def mset(self, mapping: Dict[Value, Value]) -> bool:
+        return self.bus.mset(mapping)
+
+    async def incr(self, key: Value, amount: int = 1) -> int:
+        return self.bus.incr(key, amount)
+
+    async def mget(self, keys, *args) -> List[bytes]:
+        return self.bus.mget(keys, *args)
+
+    async def delete(self, *keys: Value) -> int:
+        return self.bus.delete(*keys)
+
+    async def keys(self, pattern: Value = '*') -> List[bytes]:
+        return self.bus.keys(pattern)
+
+    async def publish(self, channel: Value, message: Value) -> int:
+        return self.bus.publish(channel, message)
+
+    def pubsub(self) -> AsyncLocalPubSub:
+        return AsyncLocalPubSub(self.bus.pubsub())
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self):
+        pass
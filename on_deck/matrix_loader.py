@@ -1,6 +1,14 @@
+import os
+
 from on_deck.emulator_checker import is_emulator
 
-if is_emulator() is True:
+# 'null' draws into memory without showing anything, for profiling and
+# benchmarks. Otherwise USE_EMULATOR picks the emulator or the hardware
+MATRIX_BACKEND = os.environ.get('ON_DECK_MATRIX', '').lower()
+
+if MATRIX_BACKEND == 'null':
+    from on_deck.null_matrix import RGBMatrix, RGBMatrixOptions, graphics
+elif is_emulator() is True:
     from RGBMatrixEmulator import RGBMatrix, RGBMatrixOptions, graphics
 else:
     from rgbmatrix import RGBMatrix, RGBMatrixOptions, graphics
@@ -0,0 +1,181 @@
+"""
+Applies the nested dict deltas the fetcher publishes. A delta is merged
+key by key into the game: dict values are merged into the sub dict that
+is already there, anything else replaces the old value.
+
+The special cases of a schema, like pitch types that disappear from
+pitch_counts being sent as None, are compiled once into a rule tree
+that is walked alongside the delta, so applying a delta does not build
+or compare key paths. Paths are only built when the caller asks for the
+paths the delta touched.
+"""
+
+from typing import Dict, Iterable, List
+
+# Matches any key at its level of a rule path
+WILDCARD = '*'
+
+
+class _Rule:
+    """Merge rules for one level of the game dict."""
+    __slots__ = ('children', 'wildcard', 'delete_none')
+
+    def __init__(self):
+        self.children: Dict[str, '_Rule'] = {}
+        self.wildcard: '_Rule' = None
+        self.delete_none: bool = False
+
+    def child(self, key: str) -> '_Rule':
+        if key == WILDCARD:
+            if self.wildcard is None:
+                self.wildcard = _Rule()
+            return self.wildcard
+        return self.children.setdefault(key, _Rule())
+
+
+def compile_rules(delete_none: Iterable[tuple] = ()) -> _Rule:
+    """
+    Compiles rule paths into a rule tree.
+
+    Args:
+        delete_none (Iterable[tuple]): Paths of the dicts in which a None
+            value deletes the key instead of storing None. WILDCARD
+            matches any key
+
+    Returns:
+        _Rule: Root of the rule tree
+    """
+    root = _Rule()
+    for path in delete_none:
+        rule = root
+        for key in path:
+            rule = rule.child(key)
+        rule.delete_none = True
+    return root
+
+
+def merge(d: dict, u: dict) -> dict:
+    """
+    Merges a delta into a dict without any special cases.
+
+    Args:
+        d (dict): Dict to update. Anything that is not a dict is
+            replaced by a new dict
+        u (dict): Nested dictionary patch
+
+    Returns:
+        dict: The updated dict
+    """
+    if not isinstance(d, dict):
+        d = {}
+    for key, value in u.items():
+        if isinstance(value, dict):
+            d[key] = merge(d.get(key), value)
+        else:
+            d[key] = value
+    return d
+
+
+def add_paths(u: dict, prefix: tuple, touched: List[tuple]):
+    """
+    Adds the paths of all the leaves in a delta to touched. Empty dicts
+    count as leaves.
+
+    Args:
+        u (dict): Nested dictionary patch
+        prefix (tuple): Path of u within the full dict
+        touched (List[tuple]): List to add the paths to
+    """
+    for key, value in u.items():
+        if isinstance(value, dict) and value:
+            add_paths(value, prefix + (key,), touched)
+        else:
+            touched.append(prefix + (key,))
+
+
+def _apply(d: dict, u: dict, rule: _Rule, touched: List[tuple], prefix: tuple) -> dict:
+    if rule is None:
+        # No special cases below this level
+        if touched is not None:
+            add_paths(u, prefix, touched)
+        return merge(d, u)
+
+    if not isinstance(d, dict):
+        d = {}
+
+    children = rule.children
+    wildcard = rule.wildcard
+    delete_none = rule.delete_none
+
+    for key, value in u.items():
+        if isinstance(value, dict):
+            if touched is None:
+                d[key] = _apply(d.get(key), value, children.get(key, wildcard), None, prefix)
+            elif value:
+                d[key] = _apply(d.get(key), value, children.get(key, wildcard), touched,
+                    prefix + (key,))
+            else:
+                d[key] = merge(d.get(key), value)
+                touched.append(prefix + (key,))
+            continue
+
+        if (value is None) and delete_none:
+            d.pop(key, None)
+        else:
+            d[key] = value
+        if touched is not None:
+            touched.append(prefix + (key,))
+
+    return d
+
+
+class MergePatch:
+    """
+    A merge patch engine for one dict schema.
+
+    Args:
+        delete_none (Iterable[tuple]): Paths of the dicts in which a None
+            value deletes the key instead of storing None
+    """
+    def __init__(self, delete_none: Iterable[tuple] = ()):
+        self.rules = compile_rules(delete_none)
+
+    def rule(self, path: tuple) -> _Rule:
+        """
+        Returns the compiled rules for the dict at path, or None if
+        nothing below it is special cased.
+
+        Args:
+            path (tuple): Path of a dict within the full dict
+
+        Returns:
+            _Rule: Rules of the dict at path
+        """
+        rule = self.rules
+        for key in path:
+            if rule is None:
+                return None
+            rule = rule.children.get(key, rule.wildcard)
+        return rule
+
+    def apply(self, d: dict, u: dict, touched: List[tuple] = None, path: tuple = ()) -> dict:
+        """
+        Applies a delta in place.
+
+        Args:
+            d (dict): Dict to update
+            u (dict): Nested dictionary patch
+            touched (List[tuple]): If given, the path of every leaf the
+                delta set or deleted is added to it
+            path (tuple): Path of d within the full dict
+
+        Returns:
+            dict: The updated dict (a new dict if d was not a dict)
+        """
+        rules = self.rules if not path else self.rule(path)
+        return _apply(d, u, rules, touched, path)
+
+
+# Within pitch_counts, None means the pitch type disappeared from the
+# current pitcher's repertoire
+GAME_PATCH = MergePatch(delete_none=[('pitch_counts',)])
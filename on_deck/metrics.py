@@ -0,0 +1,236 @@
+"""
+Counters, gauges and histograms the fetcher and display processes keep
+about their own performance. Each process saves a snapshot of its
+registry to Redis every few seconds under metrics:<process> from a
+background thread, so recording a metric is only a dict update. The
+server renders every snapshot as a Prometheus text page at /metrics.
+
+    from on_deck.metrics import registry
+
+    FRAMES = registry.counter('frames', 'Frames swapped')
+    FRAMES.inc()
+
+Metric names get the 'on_deck_' prefix and counters the '_total'
+suffix when they are rendered.
+"""
+
+import json
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from on_deck.tracing import BUCKETS, Histogram
+
+KEY_PREFIX = 'metrics:'
+NAME_PREFIX = 'on_deck_'
+
+# Seconds between saving the registry to Redis
+SAVE_INTERVAL = 5
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class _Metric:
+    kind: str = None
+
+    def __init__(self, registry: 'Registry', name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = registry._lock
+        self._values: Dict[LabelKey, object] = {}
+
+    def _samples(self) -> list:
+        return [{'labels': dict(key), 'value': value} for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    """Value that only goes up."""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that is set to the latest reading."""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class HistogramMetric(_Metric):
+    """Distribution of observed values, usually durations in seconds."""
+    kind = 'histogram'
+
+    def __init__(self, registry: 'Registry', name: str, help_text: str):
+        super().__init__(registry, name, help_text)
+        self.bounds = BUCKETS
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = Histogram(self.bounds)
+            histogram.observe(value)
+
+    def _samples(self) -> list:
+        return [
+            {'labels': dict(key), 'bounds': list(histogram.bounds), 'counts': list(histogram.counts),
+                'sum': histogram.sum, 'count': histogram.count}
+            for key, histogram in self._values.items()
+        ]
+
+
+class Registry:
+    """
+    Holds the metrics of one process. Metrics with the same name are
+    only created once.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self.process: str = None
+        self._thread: threading.Thread = None
+
+    def _get(self, cls, name: str, help_text: str) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help_text)
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """Returns the counter called name, creating it if needed."""
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        """Returns the gauge called name, creating it if needed."""
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str) -> HistogramMetric:
+        """Returns the histogram called name, creating it if needed."""
+        return self._get(HistogramMetric, name, help_text)
+
+    def snapshot(self) -> dict:
+        """
+        Returns every metric and its current values.
+
+        Returns:
+            dict: process, time and metrics
+        """
+        with self._lock:
+            metrics = [
+                {'name': metric.name, 'type': metric.kind, 'help': metric.help,
+                    'samples': metric._samples()}
+                for metric in self._metrics.values()
+            ]
+        return {'process': self.process, 'time': time.time(), 'metrics': metrics}
+
+    def connect(self, redis_client, process: str):
+        """
+        Starts saving the registry to Redis every SAVE_INTERVAL seconds.
+
+        Args:
+            redis_client (redis.Redis): Redis client
+            process (str): Name of this process, for example 'display'
+        """
+        self.process = process
+        if self._thread is not None:
+            return
+
+        def save():
+            while True:
+                time.sleep(SAVE_INTERVAL)
+                try:
+                    redis_client.set(f'{KEY_PREFIX}{process}', json.dumps(self.snapshot()))
+                except Exception as e:
+                    print(f'Could not save metrics: {e}')
+
+        self._thread = threading.Thread(target=save, daemon=True)
+        self._thread.start()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshots: List[dict]) -> str:
+    """
+    Renders registry snapshots of one or more processes in the
+    Prometheus text format. Every sample gets a process label.
+
+    Args:
+        snapshots (List[dict]): Snapshots from Registry.snapshot
+
+    Returns:
+        str: Prometheus text page
+    """
+    families: Dict[str, dict] = {}
+    lines_by_name: Dict[str, List[str]] = {}
+
+    for snapshot in snapshots:
+        process = snapshot.get('process') or 'unknown'
+        families.setdefault('metrics_age_seconds', {
+            'type': 'gauge', 'help': 'Seconds since the process saved its metrics'})
+        lines_by_name.setdefault('metrics_age_seconds', []).append(
+            f'{NAME_PREFIX}metrics_age_seconds{_format_labels({"process": process})} '
+            f'{_format_value(round(time.time() - snapshot["time"], 3))}')
+
+        for metric in snapshot['metrics']:
+            name = metric['name']
+            families.setdefault(name, metric)
+            lines = lines_by_name.setdefault(name, [])
+            full_name = NAME_PREFIX + name
+
+            for sample in metric['samples']:
+                labels = {'process': process, **sample['labels']}
+                if metric['type'] == 'counter':
+                    lines.append(f'{full_name}_total{_format_labels(labels)} '
+                        f'{_format_value(sample["value"])}')
+                elif metric['type'] == 'gauge':
+                    lines.append(f'{full_name}{_format_labels(labels)} '
+                        f'{_format_value(sample["value"])}')
+                else:
+                    cumulative = 0
+                    for bound, count in zip(sample['bounds'] + [float('inf')], sample['counts']):
+                        cumulative += count
+                        bucket_labels = {**labels, 'le': _format_value(float(bound))}
+                        lines.append(f'{full_name}_bucket{_format_labels(bucket_labels)} '
+                            f'{cumulative}')
+                    lines.append(f'{full_name}_sum{_format_labels(labels)} '
+                        f'{_format_value(sample["sum"])}')
+                    lines.append(f'{full_name}_count{_format_labels(labels)} {sample["count"]}')
+
+    page = []
+    for name, family in families.items():
+        full_name = NAME_PREFIX + name
+        if family['type'] == 'counter':
+            full_name += '_total'
+        page.append(f'# HELP {full_name} {family["help"]}')
+        page.append(f'# TYPE {full_name} {family["type"]}')
+        page.extend(lines_by_name[name])
+    return '\n'.join(page) + '\n'
+
+
+registry = Registry()
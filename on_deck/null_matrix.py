@@ -0,0 +1,233 @@
+"""
+Headless matrix backend with the RGBMatrix and graphics surface that
+DisplayManager uses. Pixels go into an RGB bytearray per canvas and
+nothing is shown anywhere, so a profile of the display only shows
+on_deck's own work instead of the emulator's rendering.
+
+Select it with the ON_DECK_MATRIX environment variable:
+    ON_DECK_MATRIX=null python -m cProfile -s cumtime -m on_deck.on_deck_display
+
+Text is drawn with the compiled fonts from on_deck.font_cache and lines
+and circles with the same integer math as rgbmatrix. The scoreboard's
+frames come out pixel for pixel the same as with rgbmatrix or the
+emulator (the emulator steps some sloped lines differently, none of
+which the scoreboard draws). Set record_frames on the options to keep
+copies of the last swapped frames in RGBMatrix.frames.
+"""
+
+from collections import deque
+
+from on_deck import font_cache
+
+
+class RGBMatrixOptions:
+    """Options with the defaults of the matrix library."""
+    def __init__(self):
+        self.rows = 32
+        self.cols = 32
+        self.chain_length = 1
+        self.parallel = 1
+        self.pixel_mapper_config = ''
+        self.brightness = 100
+        # Number of swapped frames RGBMatrix.frames keeps, 0 keeps none
+        self.record_frames = 0
+
+
+def _size(options: RGBMatrixOptions):
+    width = options.cols * options.chain_length
+    height = options.rows * options.parallel
+    for mapper in (options.pixel_mapper_config or '').split(';'):
+        name, _, parameter = mapper.strip().partition(':')
+        if name in ('U-mapper', 'V-mapper'):
+            if name == 'U-mapper':
+                width, height = width // 2, height * 2
+            else:
+                width = options.cols * options.parallel
+                height = options.rows * options.chain_length
+        elif (name == 'Rotate') and (int(parameter or 0) % 180 == 90):
+            width, height = height, width
+    return width, height
+
+
+class FrameCanvas:
+    """
+    Canvas whose pixels are stored row by row as red, green, blue bytes
+    in buffer.
+    """
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.buffer = bytearray(width * height * 3)
+
+    def SetPixel(self, x: int, y: int, red: int, green: int, blue: int):
+        if (0 <= x < self.width) and (0 <= y < self.height):
+            buffer = self.buffer
+            i = (y * self.width + x) * 3
+            buffer[i] = red
+            buffer[i + 1] = green
+            buffer[i + 2] = blue
+
+    def Clear(self):
+        self.buffer[:] = bytes(len(self.buffer))
+
+    def Fill(self, red: int, green: int, blue: int):
+        self.buffer[:] = bytes((red, green, blue)) * (self.width * self.height)
+
+
+class RGBMatrix:
+    """
+    Matrix that keeps the swapped canvas instead of showing it.
+
+    Args:
+        options (RGBMatrixOptions): Size of the matrix and how many
+            frames to record
+    """
+    def __init__(self, options: RGBMatrixOptions = None):
+        options = options if options is not None else RGBMatrixOptions()
+        self.width, self.height = _size(options)
+        self.brightness = getattr(options, 'brightness', 100)
+        self.frames = deque(maxlen=getattr(options, 'record_frames', 0) or 0)
+        self.swaps = 0
+        self._canvas = FrameCanvas(self.width, self.height)
+
+    def CreateFrameCanvas(self) -> FrameCanvas:
+        return FrameCanvas(self.width, self.height)
+
+    def SwapOnVSync(self, canvas: FrameCanvas, framerate_fraction: int = 1) -> FrameCanvas:
+        self.swaps += 1
+        if self.frames.maxlen:
+            self.frames.append(bytes(canvas.buffer))
+        self._canvas, canvas = canvas, self._canvas
+        return canvas
+
+    def SetPixel(self, x: int, y: int, red: int, green: int, blue: int):
+        self._canvas.SetPixel(x, y, red, green, blue)
+
+    def Fill(self, red: int, green: int, blue: int):
+        self._canvas.Fill(red, green, blue)
+
+    def Clear(self):
+        self._canvas.Clear()
+
+
+class _Graphics:
+    """The matrix library's graphics module."""
+
+    class Color:
+        def __init__(self, red: int = 0, green: int = 0, blue: int = 0):
+            self.red = red
+            self.green = green
+            self.blue = blue
+
+        def SetColor(self, red: int, green: int, blue: int):
+            self.red = red
+            self.green = green
+            self.blue = blue
+
+    class Font:
+        def __init__(self):
+            self._font: font_cache.CompiledFont = None
+
+        def LoadFont(self, path: str):
+            self._font = font_cache.load_font(path)
+
+        @property
+        def height(self) -> int:
+            return self._font.height
+
+        @property
+        def baseline(self) -> int:
+            return self._font.ascent
+
+        def CharacterWidth(self, char: int) -> int:
+            return self._font.advances.get(char, self._font.default_advance)
+
+    @staticmethod
+    def DrawText(canvas: FrameCanvas, font: 'Font', x: int, y: int, color: 'Color',
+            text: str) -> int:
+        compiled = font._font
+        buffer = canvas.buffer
+        width = canvas.width
+        height = canvas.height
+        rgb = bytes((color.red, color.green, color.blue))
+        pen = x
+        for char in text:
+            advance, pixels = compiled.glyph_pixels(ord(char))
+            for dx, dy in pixels:
+                px = pen + dx
+                py = y + dy
+                if (0 <= px < width) and (0 <= py < height):
+                    i = (py * width + px) * 3
+                    buffer[i:i + 3] = rgb
+            pen += advance
+        return pen - x
+
+    @staticmethod
+    def DrawLine(canvas: FrameCanvas, x0: int, y0: int, x1: int, y1: int, color: 'Color'):
+        rgb = bytes((color.red, color.green, color.blue))
+        width = canvas.width
+        height = canvas.height
+        buffer = canvas.buffer
+
+        if y0 == y1:
+            # Horizontal lines are most of what is drawn, clear_section
+            # and filled shapes, so they are copied in one slice
+            if not 0 <= y0 < height:
+                return
+            start = max(min(x0, x1), 0)
+            stop = min(max(x0, x1), width - 1)
+            if start > stop:
+                return
+            i = (y0 * width + start) * 3
+            buffer[i:i + (stop - start + 1) * 3] = rgb * (stop - start + 1)
+            return
+
+        # Fixed point stepping like the matrix library's DrawLine
+        def trunc_div(a: int, b: int) -> int:
+            q = abs(a) // abs(b)
+            return q if (a < 0) == (b < 0) else -q
+
+        dy = y1 - y0
+        dx = x1 - x0
+        shift = 16
+        if abs(dx) > abs(dy):
+            if x1 < x0:
+                x0, x1, y0, y1 = x1, x0, y1, y0
+            gradient = trunc_div(dy << shift, dx)
+            fy = 0x8000 + (y0 << shift)
+            for px in range(x0, x1 + 1):
+                py = fy >> shift
+                if (0 <= px < width) and (0 <= py < height):
+                    i = (py * width + px) * 3
+                    buffer[i:i + 3] = rgb
+                fy += gradient
+        else:
+            if y1 < y0:
+                x0, x1, y0, y1 = x1, x0, y1, y0
+            gradient = trunc_div(dx << shift, dy)
+            fx = 0x8000 + (x0 << shift)
+            for py in range(y0, y1 + 1):
+                px = fx >> shift
+                if (0 <= px < width) and (0 <= py < height):
+                    i = (py * width + px) * 3
+                    buffer[i:i + 3] = rgb
+                fx += gradient
+
+    @staticmethod
+    def DrawCircle(canvas: FrameCanvas, x0: int, y0: int, radius: int, color: 'Color'):
+        x = radius
+        y = 0
+        error = 1 - x
+        while y <= x:
+            for px, py in ((x, y), (y, x), (-x, y), (-y, x), (-x, -y), (-y, -x), (x, -y),
+                    (y, -x)):
+                canvas.SetPixel(x0 + px, y0 + py, color.red, color.green, color.blue)
+            y += 1
+            if error < 0:
+                error += 2 * y + 1
+            else:
+                x -= 1
+                error += 2 * (y - x + 1)
+
+
+graphics = _Graphics
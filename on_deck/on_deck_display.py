@@ -20,76 +20,51 @@ import os
 import datetime
 
 from on_deck.display_manager import DisplayManager
+from on_deck.frame_governor import FrameGovernor
 from on_deck.overview import Overview
 from on_deck.gamecast import Gamecast
-from on_deck.matrix_loader import RGBMatrixOptions
-from on_deck.emulator_checker import is_emulator
+from on_deck.game_model import GamecastGame, OverviewGame
+from on_deck.layout import load_layout
+from on_deck.merge_patch import GAME_PATCH, add_paths
+from on_deck.board import LAYOUT, brightness_dict, get_options, get_redis
 from on_deck.colors import Colors
-
-brightness_dict_2pwm = {0: 0, 1: 60, 2: 80, 3: 90}
-brightness_dict_3pwm = {0: 0, 1: 42, 2: 58, 3: 68, 4: 77, 5: 84, 6: 90, 7: 95}
-# brightness_dict = {i: i for i in range(256)}
-brightness_dict = brightness_dict_3pwm
-
-REDIS_IP = os.environ.get('REDIS_HOST')
-REDIS_IP = '10.0.1.10'
-
-def get_options() -> RGBMatrixOptions:
-    """
-    Returns the RGBMatrixOptions object based on the platform.
-
-    Returns:
-        RGBMatrixOptions: RGBMatrixOptions object
-    """
-    options = RGBMatrixOptions()
-
-    if is_emulator() is True:
-        options.cols = int(384)
-        options.rows = int(256)
-    else:
-        options.cols = 128
-        options.rows = 64
-        options.pixel_mapper_config = 'V-mapper'
-        options.chain_length = 4
-        options.parallel = 3
-        options.disable_hardware_pulsing = True
-        options.pwm_bits = 3 # Can run 2 with sudo, 1 without
-        options.gpio_slowdown = 4
-        options.pwm_dither_bits = 2 # decreaes brightness a little (i think)
-
-    return options
-
+from on_deck.fonts import Fonts
+from on_deck.startup import timer
+from on_deck.tracing import TRACE_FIELD, tracer
+from on_deck.metrics import registry
+from on_deck import profiler
+
+# Frame swaps per second and how long to keep merging deltas after the
+# first one of a burst arrives before rendering them together
+TARGET_FPS = float(os.environ.get('ON_DECK_TARGET_FPS', 30))
+COALESCE_WINDOW = float(os.environ.get('ON_DECK_COALESCE_WINDOW', 1 / TARGET_FPS))
+# Seconds between printed frame governor stats, 0 to turn them off
+GOVERNOR_REPORT_INTERVAL = float(os.environ.get('ON_DECK_GOVERNOR_REPORT', 0))
+
+MESSAGES_RECEIVED = registry.counter('messages_received', 'Pubsub messages received')
+RECEIVED_BYTES = registry.counter('received_bytes', 'Bytes of the received deltas')
+PUBSUB_BACKLOG = registry.gauge('pubsub_backlog',
+    'Messages handled in the last wakeup of a handler, more than 1 means they queued up')
 
 def recursive_update(d: dict, u: dict, path: tuple = ()) -> dict:
     """Apply a nested dictionary patch to an existing dictionary."""
+    return GAME_PATCH.apply(d, u, path=path)
 
-    if not isinstance(d, dict):
-        d = {}
-
-    for key, value in u.items():
-        current_path = path + (key,)
-
-        # Within pitch_counts, None means the pitch type disappeared
-        # from the current pitcher's repertoire.
-        if path == ("pitch_counts",) and value is None:
-            d.pop(key, None)
-            continue
-
-        if isinstance(value, dict):
-            existing = d.get(key)
-
-            if not isinstance(existing, dict):
-                existing = {}
+def get_changed_paths(u: dict, path: tuple = ()) -> set:
+    """
+    Returns the paths of all the leaves in a nested dictionary patch.
+    These are the parts of the game dict that the patch changes.
 
-            d[key] = recursive_update(
-                existing,
-                value,
-                current_path,
-            )
-        else:
-            d[key] = value
+    Args:
+        u (dict): Nested dictionary patch
+        path (tuple): Path of u within the full dictionary
 
-    return d
+    Returns:
+        set: Set of paths (tuples of keys)
+    """
+    paths = []
+    add_paths(u, path, paths)
+    return set(paths)
 
 def time_delta_strftime(delay: int) -> str:
     """
@@ -120,12 +95,13 @@ class TimeHandler:
     messages from the redis server and update the time based on the
     message received.
     """
-    def __init__(self, display_manager: DisplayManager, overview: Overview, gamecast: Gamecast):
+    def __init__(self, display_manager: DisplayManager, overview: Overview, gamecast: Gamecast,
+        redis_client: redis.Redis = None):
         self.display_manager = display_manager
         self.overview = overview
         self.gamecast = gamecast
 
-        self.redis = redis.Redis(REDIS_IP, port=6379, db=0)
+        self.redis = redis_client if redis_client is not None else get_redis()
 
     def start(self):
         """
@@ -136,6 +112,7 @@ class TimeHandler:
 
         previous_time = None
         while True:
+            self.display_manager.flush_frame()
             mode = self.redis.get('mode')
             current_time = int(time.time())
             if current_time != previous_time:
@@ -172,11 +149,12 @@ class GamecastHandler:
     current game. This class will listen for messages from the redis
     server and update the gamecast data based on the message received.
     """
-    def __init__(self, display_manager: DisplayManager, gamecast: Gamecast):
+    def __init__(self, display_manager: DisplayManager, gamecast: Gamecast,
+        redis_client: redis.Redis = None):
         self.display_manager = display_manager
         self.game: dict = None
 
-        self.redis = redis.Redis(REDIS_IP, port=6379, db=0)
+        self.redis = redis_client if redis_client is not None else get_redis()
         self.pubsub = self.redis.pubsub()
         self.pubsub.subscribe('gamecast')
         self.pubsub.subscribe('brightness')
@@ -194,18 +172,23 @@ class GamecastHandler:
         self.display_manager.set_brightness(brightness_dict[brightness])
 
         self.gamecast: Gamecast = gamecast
-        self.gamecast_game: dict = None
+        self.gamecast_game: GamecastGame = None
 
-    def load_gamecast(self) -> dict:
+        # Traces and number of the deltas merged since the last print
+        self._traces: List[dict] = []
+        self._deltas = 0
+
+    def load_gamecast(self) -> GamecastGame:
         """
         Loads the gamecast data from the redis server.
 
         Returns:
-            dict: The gamecast game data
+            GamecastGame: The gamecast game data
         """
         game = self.redis.get('gamecast')
-        game = json.loads(game)
+        game = GamecastGame.from_dict(json.loads(game))
         self.gamecast_game = game
+        timer.mark('first snapshot')
         return game
 
     def change_settings(self, message: dict):
@@ -226,7 +209,7 @@ class GamecastHandler:
         time.sleep(1) # delay to let fetcher update gamecast
         new_data = self.redis.get('gamecast')
         new_data = json.loads(new_data)
-        self.gamecast_game = new_data
+        self.gamecast_game = GamecastGame.from_dict(new_data)
 
         if channel == b'brightness':
             brightness = int(message['data'])
@@ -241,40 +224,70 @@ class GamecastHandler:
             self.gamecast.print_game(self.gamecast_game)
             print('gamecast reloaded')
 
-    def update_gamecast(self) -> Union[bool, dict]:
+    def update_gamecast(self) -> Union[bool, set]:
         """
-        Updates the gamecast data based on the message received from the
-        pubsub listener. This function will only update the gamecast data
-        if the message is a gamecast message. If the message is not a
-        gamecast message, the function will return False.
+        Updates the gamecast data based on the messages received from
+        the pubsub listener. After the first gamecast message every
+        delta that arrives inside the coalescing window is merged too,
+        so a burst is rendered once. Settings messages are handled in
+        the order they arrive.
 
         Returns:
-            Union[bool, dict]: The new data received from the pubsub
-                or False if the message is not a gamecast message
+            Union[bool, set]: The paths changed by the merged deltas
+                or False if no gamecast delta was received
         """
         message = self.pubsub.get_message(timeout=5)
 
         if not message:
             return False
 
-        if message['type'] != 'message':
-            return False
+        messages = [message]
+        governor = self.display_manager.governor
+        if governor is not None:
+            messages += governor.coalesce(self.pubsub.get_message)
+        MESSAGES_RECEIVED.inc(len(messages), handler='gamecast')
+        PUBSUB_BACKLOG.set(len(messages), handler='gamecast')
 
         settings_channels = (b'gamecast_id', b'brightness', b'mode', b'delay',
             b'gamecast_reset', b'init')
 
-        if message['channel'] in settings_channels:
-            print('changing settings')
-            self.change_settings(message)
+        changed_paths = set()
+        deltas = 0
+
+        for message in messages:
+            if message['type'] != 'message':
+                continue
+
+            if message['channel'] in settings_channels:
+                print('changing settings')
+                self.change_settings(message)
+                # change_settings reloads and redraws the full game
+                changed_paths = set()
+                deltas = 0
+                continue
+
+            received = time.time()
+            RECEIVED_BYTES.inc(len(message['data']), handler='gamecast')
+            new_data = json.loads(message['data'])
+            # print(f'{new_data=}\n')
+            trace = new_data.pop(TRACE_FIELD, None)
+            if new_data == {}:
+                continue
+            if trace is not None:
+                trace['received'] = received
+                self._traces.append(trace)
+
+            touched = []
+            self.gamecast_game = GamecastGame.merge(self.gamecast_game, new_data, touched)
+            changed_paths.update(touched)
+            deltas += 1
+
+        if deltas == 0:
             return False
 
-        new_data = json.loads(message['data'])
-        # print(f'{new_data=}\n')
-        if new_data == {}:
-            return False
-
-        self.gamecast_game = recursive_update(self.gamecast_game, new_data)
-        return new_data
+        # Recorded with the governor once the deltas are rendered
+        self._deltas = deltas
+        return changed_paths
 
     def print_gamecast_game(self) -> bool:
         """
@@ -284,16 +297,25 @@ class GamecastHandler:
         Returns:
             bool: True if the game was printed, False otherwise
         """
-        new_data = self.update_gamecast()
+        changed_paths = self.update_gamecast()
 
-        if new_data is False:
+        if changed_paths is False:
             return False
 
+        traces, self._traces = self._traces, []
+
         mode = self.redis.get('mode')
         if mode != b'gamecast':
             return False
 
-        self.gamecast.print_game(self.gamecast_game)
+        tracer.rendering(traces)
+        if not self.gamecast.print_game(self.gamecast_game, changed_paths):
+            tracer.discard()
+            return True
+
+        governor = self.display_manager.governor
+        if governor is not None:
+            governor.record_render(self._deltas)
         return True
 
     def start(self):
@@ -320,17 +342,18 @@ class OverviewHandler:
     overview data is the small display that just shows scores, inning,
     bases, and outs.
     """
-    def __init__(self, display_manager: DisplayManager, overview: Overview):
+    def __init__(self, display_manager: DisplayManager, overview: Overview,
+        redis_client: redis.Redis = None):
         self.display_manager = display_manager
         self.overview = overview
 
-        self.redis = redis.Redis(REDIS_IP, port=6379, db=0)
+        self.redis = redis_client if redis_client is not None else get_redis()
         self.pubsub = self.redis.pubsub()
         self.pubsub.subscribe('brightness')
         self.pubsub.subscribe('mode')
         self.pubsub.subscribe('init')
 
-        self.games: List[dict] = []
+        self.games: List[OverviewGame] = []
 
         self._page: int = None
 
@@ -345,9 +368,11 @@ class OverviewHandler:
         for i in range(num_games):
             self.pubsub.subscribe(f'{i}')
             game = self.redis.get(f'{i}')
-            game = json.loads(game)
+            game = OverviewGame.from_dict(json.loads(game))
             self.games.append(game)
 
+        timer.mark('first snapshot')
+
 
     def print_overview(self):
         """
@@ -440,34 +465,73 @@ class OverviewHandler:
     def pubsub_listener(self):
         """
         Listens for messages from the pubsub and updates the games
-        based on the message received.
+        based on the messages received. Deltas that arrive inside the
+        coalescing window are merged first and each updated game is
+        printed once.
         """
         message = self.pubsub.get_message(timeout=5)
 
         if not message:
             return
 
-        if message['type'] != 'message':
-            return
-
-        if message['channel'] in (b'mode', b'brightness', b'init'):
-            self.change_settings(message)
+        messages = [message]
+        governor = self.display_manager.governor
+        if governor is not None:
+            messages += governor.coalesce(self.pubsub.get_message)
+        MESSAGES_RECEIVED.inc(len(messages), handler='overview')
+        PUBSUB_BACKLOG.set(len(messages), handler='overview')
+
+        # Games updated in this window, each one is printed once
+        updated = set()
+        deltas = 0
+        traces = []
+
+        for message in messages:
+            if message['type'] != 'message':
+                continue
+
+            if message['channel'] in (b'mode', b'brightness', b'init'):
+                self.change_settings(message)
+                # change_settings prints every game again
+                updated = set()
+                deltas = 0
+                continue
+
+            # print(f'{message=}\n')
+
+            game_id = int(message['channel'])
+            received = time.time()
+            RECEIVED_BYTES.inc(len(message['data']), handler='overview')
+            new_data = message['data'].decode('utf-8')
+            new_data = json.loads(new_data)
+            trace = new_data.pop(TRACE_FIELD, None)
+            if trace is not None:
+                trace['received'] = received
+                traces.append(trace)
+            self.games[game_id] = OverviewGame.merge(self.games[game_id], new_data)
+            updated.add(game_id)
+            deltas += 1
+
+        if not updated:
             return
 
-        # print(f'{message=}\n')
-
-        game_id = int(message['channel'])
-        new_data = message['data'].decode('utf-8')
-        new_data = json.loads(new_data)
-        self.games[game_id] = recursive_update(self.games[game_id], new_data)
-
         mode = self.redis.get('mode')
-        if mode == b'overview':
-            self.overview.print_game(self.games[game_id], game_id)
-        elif mode == b'gamecast':
-            page = math.floor(game_id / 6)
-            if page == self._page:
-                self.overview.print_game(self.games[game_id], game_id % 6)
+        tracer.rendering(traces)
+        printed = False
+        for game_id in sorted(updated):
+            if mode == b'overview':
+                self.overview.print_game(self.games[game_id], game_id)
+                printed = True
+            elif mode == b'gamecast':
+                page = math.floor(game_id / 6)
+                if page == self._page:
+                    self.overview.print_game(self.games[game_id], game_id % 6)
+                    printed = True
+
+        if printed and (governor is not None):
+            governor.record_render(deltas)
+        # Overview does not swap, the games show with the next swap
+        tracer.frame_ready()
 
 
     def pubsub_thread(self):
@@ -500,16 +564,37 @@ class OverviewHandler:
 class Scoreboard:
     """
     Main class that connects all the aspects of the scoreboard together.
-    """
-    def __init__(self):
-        self.display_manager = DisplayManager(get_options())
-
-        self.overview = Overview(self.display_manager)
-        self.gamecast = Gamecast(self.display_manager)
 
-        self.time_handler = TimeHandler(self.display_manager, self.overview, self.gamecast)
-        self.overview_handler = OverviewHandler(self.display_manager, self.overview)
-        self.gamecast_handler = GamecastHandler(self.display_manager, self.gamecast)
+    Args:
+        redis_client (redis.Redis): Client the handlers use, for example
+            a LocalRedis a recording is replayed into. Defaults to the
+            Redis server at REDIS_IP
+    """
+    def __init__(self, redis_client: redis.Redis = None):
+        # Load the fonts Overview and Gamecast draw with before the
+        # first frame instead of on the first message
+        Fonts.preload('ter_u28b', 'ter_u16b', 'ter_u12b')
+        timer.mark('fonts')
+
+        governor = FrameGovernor(TARGET_FPS, COALESCE_WINDOW, GOVERNOR_REPORT_INTERVAL)
+        self.display_manager = DisplayManager(get_options(), governor)
+        timer.mark('matrix init')
+
+        layout = load_layout(LAYOUT)
+        self.overview = Overview(self.display_manager, layout)
+        self.gamecast = Gamecast(self.display_manager, layout)
+        timer.mark('layout')
+
+        self.time_handler = TimeHandler(self.display_manager, self.overview, self.gamecast,
+            redis_client)
+        self.overview_handler = OverviewHandler(self.display_manager, self.overview, redis_client)
+        self.gamecast_handler = GamecastHandler(self.display_manager, self.gamecast, redis_client)
+        tracer.connect(self.gamecast_handler.redis)
+        registry.connect(self.gamecast_handler.redis, 'display')
+        profiler.listen(self.gamecast_handler.redis, 'display')
+        self.display_manager.enable_snapshots(self.gamecast_handler.redis)
+        self.display_manager.enable_flight_recorder(self.gamecast_handler.redis)
+        timer.mark('redis connect')
 
 
     def start(self):
@@ -525,5 +610,7 @@ class Scoreboard:
 
 
 if __name__ == '__main__':
+    timer.mark('imports')
+    timer.finish_after('first frame')
     scoreboard = Scoreboard()
     scoreboard.start()
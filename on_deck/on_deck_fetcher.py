@@ -10,15 +10,25 @@ import json
 import threading
 from datetime import datetime, timedelta, timezone
 import hashlib
-import pytz
 import redis
 
 from at_bat import statsapi_plus as ssp
 from at_bat.scoreboard_data import ScoreboardData
 
+from on_deck.startup import timer
+from on_deck.statsapi_standin import install_from_env
+from on_deck import tracing
+from on_deck.metrics import registry
+from on_deck import profiler
+
 # REDIS_IP = os.environ.get('REDIS_HOST')
 REDIS_IP = '10.0.1.10'
 
+FETCH_SECONDS = registry.histogram('fetch_seconds', 'Time to fetch and diff a game')
+DELTAS_PUBLISHED = registry.counter('deltas_published', 'Deltas published')
+PUBLISHED_BYTES = registry.counter('published_bytes', 'Bytes of the published deltas')
+STORED_BYTES = registry.counter('stored_bytes', 'Bytes of the full games set in Redis')
+
 def seconds_since_iso8601(iso_timestamp: str) -> int:
     """
     Calculate the number of seconds since a given ISO 8601 timestamp.
@@ -29,6 +39,9 @@ def seconds_since_iso8601(iso_timestamp: str) -> int:
     Returns:
         int: The number of seconds since the given timestamp.
     """
+    # Only needed here, so it is not imported at startup
+    import pytz
+
     # Parse the ISO 8601 string into a datetime object
     target_time = datetime.fromisoformat(iso_timestamp)
 
@@ -93,6 +106,7 @@ class GamecastFetcher:
         self.game: ScoreboardData = None
 
         self.displayed_games = set()
+        self._last_fetch: float = None
 
 
     def initialize_gamecast(self):
@@ -118,6 +132,7 @@ class GamecastFetcher:
         gamepk = int(game_dict['gamepk'])
 
         self.game = ScoreboardData(gamepk, delay)
+        self._last_fetch = None
         self.redis.set('gamecast', json.dumps(self.game.to_dict()))
 
         print('Gamecast initialized')
@@ -135,7 +150,11 @@ class GamecastFetcher:
         """
         delay = int(self.redis.get('delay'))
 
+        trace = tracing.start_trace(self._last_fetch) if tracing.ENABLED else None
+        self._last_fetch = time.time()
         new_data = self.game.update_return_difference(delay)
+        FETCH_SECONDS.observe(time.time() - self._last_fetch, game='gamecast')
+        tracing.stamp(trace, 'fetched')
         full_dict = self.game.to_dict()
         full_hash = self.sha256_hash(full_dict)
         if full_hash in self.displayed_games:
@@ -144,10 +163,16 @@ class GamecastFetcher:
         if new_data:
             # Update gamecast and cooresponding overview game
             gamecast_dict = json.dumps(full_dict)
+            if trace is not None:
+                new_data = {**new_data, tracing.TRACE_FIELD: trace}
+                tracing.stamp(trace, 'published')
             new_data = json.dumps(new_data)
 
             self.redis.set('gamecast', gamecast_dict)
             self.redis.publish('gamecast', new_data)
+            DELTAS_PUBLISHED.inc(channel='gamecast')
+            PUBLISHED_BYTES.inc(len(new_data), channel='gamecast')
+            STORED_BYTES.inc(len(gamecast_dict), channel='gamecast')
 
 
     def update_settings(self):
@@ -192,12 +217,17 @@ class Fetcher:
     def __init__(self):
         self.gamepks: List[int] = []
         self.games: List[ScoreboardData] = []
+        # When each game was last fetched, for tracing
+        self.last_fetches: List[float] = []
 
         self.redis = redis.Redis(host=REDIS_IP, port=6379, db=0)
         self.pubsub = self.redis.pubsub()
         self.pubsub.subscribe('delay') # do i need this?
 
         self.gamecast_fetcher = GamecastFetcher()
+        registry.connect(self.redis, 'fetcher')
+        profiler.listen(self.redis, 'fetcher')
+        timer.mark('redis connect')
 
         self.last_check = time.time()
 
@@ -213,19 +243,28 @@ class Fetcher:
         key = f'{key}'
         full_game = json.dumps(full_game)
         self.redis.set(key, full_game)
+        # Tells the server its cached home page is out of date
+        self.redis.incr('games_version')
+        STORED_BYTES.inc(len(full_game), channel='overview')
 
 
-    def redis_publish_game(self, key: Union[str, int], new_data: dict):
+    def redis_publish_game(self, key: Union[str, int], new_data: dict, trace: dict = None):
         """asdfchannel in
         the Redis database.
 
         Args:
             key (Union[str, int]): key to publish to
             new_data (dict): updated game data
+            trace (dict): Trace to send with the data, if tracing
         """
         key = f'{key}'
+        if trace is not None:
+            new_data = {**new_data, tracing.TRACE_FIELD: trace}
+            tracing.stamp(trace, 'published')
         new_data = json.dumps(new_data)
         self.redis.publish(key, new_data)
+        DELTAS_PUBLISHED.inc(channel='overview')
+        PUBLISHED_BYTES.inc(len(new_data), channel='overview')
 
 
     def initialize_games(self):
@@ -243,6 +282,7 @@ class Fetcher:
 
         self.gamepks = get_daily_gamepks(delay)
         self.games: List[ScoreboardData] = []
+        self.last_fetches = [None] * len(self.gamepks)
 
 
         for i, gamepk in enumerate(self.gamepks):
@@ -252,8 +292,12 @@ class Fetcher:
 
         print(f'{delay=}')
         print('Overview initialized')
+        timer.mark('first snapshot')
         num_games = len(self.games)
         self.redis.set('num_games', num_games)
+        # Lets the server serve tracked games from Redis
+        self.redis.set('gamepks', json.dumps(self.gamepks))
+        self.redis.incr('games_version')
         self.redis.publish('init', 'init')
         self.redis.set('mode', 'overview')
         self.redis.publish('mode', 'overview')
@@ -268,10 +312,14 @@ class Fetcher:
         """
         delay = int(self.redis.get('delay'))
         for i, game in enumerate(self.games):
+            trace = tracing.start_trace(self.last_fetches[i]) if tracing.ENABLED else None
+            self.last_fetches[i] = time.time()
             new_data = game.update_return_difference(delay)
+            FETCH_SECONDS.observe(time.time() - self.last_fetches[i], game=i)
+            tracing.stamp(trace, 'fetched')
             if new_data:
                 self.redis_set_game(i, game.to_dict())
-                self.redis_publish_game(i, new_data)
+                self.redis_publish_game(i, new_data, trace)
             time.sleep(1)
 
         if (time.time() - self.last_check) > 60:
@@ -300,5 +348,8 @@ class Fetcher:
 
 
 if __name__ == '__main__':
+    timer.mark('imports')
+    timer.finish_after('first snapshot')
+    install_from_env()
     fetcher = Fetcher()
     fetcher.start()
@@ -4,15 +4,24 @@ communicate with the scoreboard and the redis database. It is
 used to fetch the current games, change the settings of the
 scoreboard, and reboot the Raspberry Pi.
 """
-from typing import List
+from typing import Tuple
 import os
 import sys
+import time
 import json
+import threading
 import redis
 from flask import Flask, request, Response
 import os
 
-from at_bat.scoreboard_data import ScoreboardData
+from on_deck.startup import timer
+from on_deck.statsapi_standin import install_from_env
+from on_deck.tracing import TRACE_KEY
+from on_deck.metrics import KEY_PREFIX, render_prometheus
+from on_deck import profiler
+from on_deck.stream_hub import StreamHub
+from on_deck.frame_snapshot import FRAME_ETAG_KEY, FRAME_KEY
+from on_deck.server_cache import SingleFlightCache, build_game, encode_json, is_set
 
 # REDIS_IP = os.environ.get('REDIS_HOST')
 REDIS_IP = '10.0.1.10'
@@ -23,9 +32,23 @@ class Server:
     communicate with the scoreboard and the redis database. It is
     used to fetch the current games, change the settings of the
     scoreboard, and reboot the Raspberry Pi.
+
+    Args:
+        redis_client (redis.Redis): Client to use, for example a
+            LocalRedis. Defaults to the scoreboard's Redis server
     """
-    def __init__(self):
-        self.redis = redis.Redis(host=REDIS_IP, port=6379, db=0)
+    def __init__(self, redis_client: redis.Redis = None):
+        if redis_client is None:
+            redis_client = redis.Redis(host=REDIS_IP, port=6379, db=0)
+        self.redis = redis_client
+        # Games of the home page and their encoded bodies, for the
+        # games_version the fetcher last bumped
+        self._home_cache: dict = None
+        self._home_lock = threading.Lock()
+        self._games = SingleFlightCache(build_game)
+        self.stream_hub = StreamHub(self.redis)
+        # ETag and PNG of the last frame served at /frame.png
+        self._frame: Tuple[str, bytes] = None
 
         self.app = Flask(__name__)
         self.app.add_url_rule('/', 'home', self.home, methods=['GET'])
@@ -34,6 +57,42 @@ class Server:
         self.app.add_url_rule('/s', 's', self.settings, methods=['GET'])
         self.app.add_url_rule('/<int:gamepk>', 'gamepk', self.gamepk, methods=['GET'])
         self.app.add_url_rule('/gamecast', 'gamecast', self.gamecast, methods=['GET'])
+        self.app.add_url_rule('/stream', 'stream', self.stream, methods=['GET'])
+        self.app.add_url_rule('/frame.png', 'frame', self.frame, methods=['GET'])
+        self.app.add_url_rule('/trace', 'trace', self.trace, methods=['GET'])
+        self.app.add_url_rule('/metrics', 'metrics', self.metrics, methods=['GET'])
+        self.app.add_url_rule('/profile', 'profile', self.profile, methods=['GET'])
+
+
+    def _home_games(self) -> dict:
+        version, num_games = self.redis.mget('games_version', 'num_games')
+        with self._home_lock:
+            cache = self._home_cache
+        if (version is not None) and (cache is not None) and (cache['version'] == version):
+            return cache
+
+        if num_games is None:
+            games = {}
+        else:
+            keys = [str(i) for i in range(int(num_games))]
+            values = self.redis.mget(keys) if keys else []
+            games = [json.loads(game) for game in values if game is not None]
+
+        cache = {'version': version, 'games': games, 'bodies': {}}
+        # Without a version there is no way to tell when the games
+        # change, so nothing is cached
+        if version is not None:
+            with self._home_lock:
+                self._home_cache = cache
+        return cache
+
+
+    def _home_body(self, cache: dict, compact: bool, gzipped: bool) -> Tuple[bytes, str]:
+        body = cache['bodies'].get((compact, gzipped))
+        if body is None:
+            body = cache['bodies'][(compact, gzipped)] = encode_json(cache['games'], compact,
+                gzipped)
+        return body
 
 
     def home(self):
@@ -42,21 +101,26 @@ class Server:
         is running correctly. It returns the current games in the redis
         database.
 
+        The page is built once per games_version, which the fetcher
+        bumps whenever it stores a game, and served with an ETag so
+        clients that send If-None-Match get a 304 until a game changes.
+        compact=1 leaves out the indentation and clients that accept
+        gzip get the page compressed.
+
         Returns:
-            Response: HTML Response
+            Response: JSON Response
         """
-        num_games = self.redis.get('num_games')
-        games: List[dict] = []
-
-        if (num_games == 0) or (num_games is None):
-            return Response(json.dumps({}, indent=4), status=200, mimetype='application/json')
+        compact = is_set(request.args.get('compact'))
+        gzipped = request.accept_encodings['gzip'] > 0
 
-        for i in range(int(num_games)):
-            game = self.redis.get(str(i))
-            game = json.loads(game)
-            games.append(game)
+        body, etag = self._home_body(self._home_games(), compact, gzipped)
 
-        return Response(json.dumps(games, indent=4), status=200, mimetype='application/json')
+        response = Response(body, status=200, mimetype='application/json')
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response.make_conditional(request)
 
 
     def reboot(self):
@@ -126,6 +190,13 @@ class Server:
         return
 
 
+    def _parse_profile(self, seconds: str, process: str = None) -> int:
+        if seconds is None:
+            return None
+        request_data = {'seconds': float(seconds), 'process': process}
+        return self.redis.publish(profiler.PROFILE_CHANNEL, json.dumps(request_data))
+
+
     def settings(self):
         """
         Fetches settings from the flask server. Allows the user to
@@ -141,12 +212,13 @@ class Server:
         brightness_short = request.args.get('b', default=None)
         gamecast_id = request.args.get('gamecast_id', default=None)
         gamecast_id_short = request.args.get('id', default=None)
+        profile = request.args.get('profile', default=None)
 
         if delay_short is not None and delay is None:
             delay = delay_short
 
         if brightness_short is not None and brightness is None:
-            brightness_short = brightness
+            brightness = brightness_short
 
         if gamecast_id_short is not None and gamecast_id is None:
             gamecast_id = gamecast_id_short
@@ -155,6 +227,7 @@ class Server:
         self._parse_delay(delay)
         self._parse_brightness(brightness)
         self._parse_gamecast_id(gamecast_id)
+        self._parse_profile(profile)
 
         mode = self.redis.get('mode')
         if mode is not None:
@@ -187,22 +260,40 @@ class Server:
         return Response(json.dumps(return_dict, indent=4), status=200, mimetype='text/plain')
 
 
+    def _tracked_game(self, gamepk: int) -> str:
+        gamepks = self.redis.get('gamepks')
+        if gamepks is None:
+            return None
+        gamepks = json.loads(gamepks)
+        if gamepk not in gamepks:
+            return None
+        game = self.redis.get(str(gamepks.index(gamepk)))
+        if game is None:
+            return None
+        return json.dumps(json.loads(game), indent=4)
+
+
     def gamepk(self, gamepk: int):
         """
         Allows a user to fetch scoreboard data for a specific game.
         This game does not have to be one that is currently in the
         daily gamepks list
 
+        Games the fetcher tracks are served from Redis. Others are
+        built from the Stats API and cached for GAME_CACHE_TTL seconds,
+        requests for a game that is being built wait for that build.
+
         Args:
             gamepk (int): Gamepk of the game
 
         Returns:
             Response: HTML Response
         """
-        game = ScoreboardData(gamepk, 0)
-        game = game.to_dict()
+        game = self._tracked_game(gamepk)
+        if game is None:
+            game = self._games.get(gamepk)
 
-        return Response(json.dumps(game, indent=4), status=200, mimetype='text/plain')
+        return Response(game, status=200, mimetype='text/plain')
 
 
     def gamecast(self):
@@ -211,19 +302,149 @@ class Server:
         This game does not have to be one that is currently in the
         daily gamepks list
         This is used to fetch gamecast data for the current game.
+        With reset=1 the display also reloads the gamecast.
 
         Returns:
             Response: HTML Response
         """
         gamecast_game = self.redis.get('gamecast')
         gamecast_game = json.loads(gamecast_game)
-        self.redis.publish('gamecast_reset', 'gamecast_reset')
+        if is_set(request.args.get('reset')):
+            self.redis.publish('gamecast_reset', 'gamecast_reset')
 
         return Response(json.dumps(gamecast_game, indent=4), status=200, mimetype='text/plain')
 
 
+    def _stream_snapshot(self) -> bytes:
+        gamecast_game = self.redis.get('gamecast')
+        snapshot = {
+            'games': self._home_games()['games'],
+            'gamecast': json.loads(gamecast_game) if gamecast_game is not None else None,
+        }
+        return json.dumps(snapshot, separators=(',', ':')).encode('utf-8')
+
+
+    def stream(self):
+        """
+        Streams the games as Server-Sent Events, a snapshot followed by
+        the deltas the fetcher publishes. See on_deck.stream_hub.
+
+        Returns:
+            Response: text/event-stream Response
+        """
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        return Response(self.stream_hub.events(self._stream_snapshot), status=200,
+            mimetype='text/event-stream', headers=headers)
+
+
+
+    def frame(self):
+        """
+        Serves a PNG of what the display shows, at most a second or so
+        old. The PNG is only loaded from Redis when the display saved a
+        new one.
+
+        Returns:
+            Response: PNG Response, 404 before the display saved one
+        """
+        etag = self.redis.get(FRAME_ETAG_KEY)
+        if etag is None:
+            return Response('No frame yet', status=404, mimetype='text/plain')
+
+        frame = self._frame
+        if (frame is None) or (frame[0] != etag.decode('utf-8')):
+            etag, png = self.redis.mget(FRAME_ETAG_KEY, FRAME_KEY)
+            frame = self._frame = (etag.decode('utf-8'), png)
+
+        response = Response(frame[1], status=200, mimetype='image/png')
+        response.set_etag(frame[0])
+        response.cache_control.max_age = 1
+        return response.make_conditional(request)
+
+
+    def trace(self):
+        """
+        Returns the latency histograms of every stage between a fetch
+        and the frame swap that shows it, as saved by the display. Only
+        filled while the fetcher runs with ON_DECK_TRACE=1.
+
+        Returns:
+            Response: JSON Response
+        """
+        stats = self.redis.get(TRACE_KEY)
+        if stats is None:
+            return Response(json.dumps({}, indent=4), status=200, mimetype='application/json')
+
+        stats = json.loads(stats)
+        stats['age'] = round(time.time() - stats['time'], 1)
+        return Response(json.dumps(stats, indent=4), status=200, mimetype='application/json')
+
+
+    def metrics(self):
+        """
+        Serves the metrics the fetcher and display save to Redis as a
+        Prometheus text page.
+
+        Returns:
+            Response: Prometheus text Response
+        """
+        keys = sorted(self.redis.keys(f'{KEY_PREFIX}*'))
+        snapshots = [json.loads(value) for value in self.redis.mget(keys) if value is not None] \
+            if keys else []
+
+        return Response(render_prometheus(snapshots), status=200,
+            content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+    def profile(self):
+        """
+        Starts a profile of the display or fetcher, or serves the last
+        one they saved. With seconds the processes are told to sample
+        themselves for that long. Without it the saved profiles are
+        returned, limited to the top functions, or as collapsed stacks
+        with format=collapsed for flamegraph.pl or speedscope.
+
+        Returns:
+            Response: JSON Response, or text for collapsed stacks
+        """
+        seconds = request.args.get('seconds', default=None)
+        process = request.args.get('process', default=None)
+        output_format = request.args.get('format', default='json')
+        top = int(request.args.get('top', default=30))
+
+        if seconds is not None:
+            listeners = self._parse_profile(seconds, process)
+            return_dict = {
+                'seconds': min(float(seconds), profiler.MAX_SECONDS),
+                'process': process,
+                'listeners': listeners,
+            }
+            return Response(json.dumps(return_dict, indent=4), status=200,
+                mimetype='application/json')
+
+        if process is not None:
+            keys = [f'{profiler.RESULT_PREFIX}{process}']
+        else:
+            keys = sorted(self.redis.keys(f'{profiler.RESULT_PREFIX}*'))
+        results = [json.loads(value) for value in self.redis.mget(keys) if value is not None] \
+            if keys else []
+
+        if output_format == 'collapsed':
+            text = ''.join(profiler.collapsed(result) for result in results)
+            return Response(text, status=200, mimetype='text/plain')
+
+        for result in results:
+            result['age'] = round(time.time() - result['time'], 1)
+            result['functions'] = result['functions'][:top]
+            del result['stacks']
+        return Response(json.dumps(results, indent=4), status=200, mimetype='application/json')
+
+timer.mark('imports')
+install_from_env()
 server = Server()
 app = server.app
+timer.mark('app init')
+timer.report()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8889)
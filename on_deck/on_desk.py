@@ -17,7 +17,11 @@ from at_bat.scoreboard_data import ScoreboardData, ScoreboardStandings
 from on_deck.colors import Colors
 from on_deck.fonts import Fonts
 from on_deck.display_manager import DisplayManager
+from on_deck.layout import draw_elements, load_layout
 from on_deck.matrix_loader import RGBMatrixOptions
+from on_deck.startup import timer
+from on_deck.statsapi_standin import install_from_env
+from on_deck.widgets import Widget, WidgetTree
 
 ABV_A = 'CLE'
 ABV_B = 'TEX'
@@ -29,25 +33,13 @@ TEAMS = [ABV_A, ABV_B]
 
 def get_options() -> RGBMatrixOptions:
     """
-    Returns the RGBMatrixOptions object based on the platform.
+    Returns the RGBMatrixOptions object based on the platform. The
+    options come from the desk layout file.
 
     Returns:
         RGBMatrixOptions: RGBMatrixOptions object
     """
-    options = RGBMatrixOptions()
-
-    if platform.system() == 'Windows':
-        options.rows = int(64)
-        options.cols = int(128)
-    else:
-        options.cols = 64
-        options.rows = 64
-        options.chain_length = 2
-        options.disable_hardware_pulsing = True
-        options.gpio_slowdown = 4
-        options.pwm_bits = 2
-
-    return options
+    return load_layout('desk').matrix_options(platform.system() == 'Windows')
 
 
 def get_daily_gamepks():
@@ -140,6 +132,7 @@ class GameHandler:
                 self.games[1] = game
 
         ready = True
+        timer.mark('first snapshot')
         self.update_standings()
         self.loop()
 
@@ -201,10 +194,27 @@ class Scoreboard:
     def __init__(self, games: List[ScoreboardData], standings: List[ScoreboardStandings]):
         self.display_manager = DisplayManager(get_options())
         self.display_manager.swap_frame()
+        timer.mark('matrix init')
 
         self.games = games
         self.standings = standings
 
+        self.layout = load_layout('desk').desk
+        root = Widget('desk', self.layout.bounds)
+        for i in range(len(TEAMS)):
+            root.add(Widget(f'row_{i}', self.layout.panels[f'row_{i}'], self._row_drawer(i)))
+        self.widgets = WidgetTree(self.display_manager, root)
+
+
+    def _row_drawer(self, i):
+        def draw_row():
+            game = self.games[i]
+            if game is not None:
+                self.print_game(i, game)
+            else:
+                self.print_off_day(i)
+        return draw_row
+
 
     def start(self):
         """
@@ -250,13 +260,8 @@ class Scoreboard:
             self.display_manager.swap_frame()
             return
 
-        for i, game in enumerate(self.games):
-            self.display_manager.clear_section(0, 32*i, 128, 32*(i+1))
-
-            if game is not None:
-                self.print_game(i, game)
-            else:
-                self.print_off_day(i)
+        self.widgets.mark_dirty()
+        self.widgets.render()
         self.display_manager.swap_frame()
         time.sleep(60)
 
@@ -265,10 +270,7 @@ class Scoreboard:
         """
         Prints the off day
         """
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
-        self.display_manager.draw_text(Fonts.ter_u22b, 0, 15 + offset, color, TEAMS[i])
+        self._draw(i, {'away': TEAMS[i]})
         self._print_off_day_standings(i)
 
 
@@ -276,9 +278,6 @@ class Scoreboard:
         """
         Prints the page
         """
-
-        self.display_manager.clear_section(0, i*32, 128, 32+32*i)
-
         if game.game_state == 'P':
             self._print_teams(i, game)
             self._print_start_time(i, game)
@@ -305,24 +304,16 @@ class Scoreboard:
         return Colors.middle_blue
 
 
-    def _get_offset(self, i):
-        if i == 0:
-            return 0
-        return 32
+    def _draw(self, i, texts):
+        draw_elements(self.display_manager, self.layout.elements[f'row_{i}'], texts,
+            color=self._get_color(i))
 
 
     def _print_teams(self, i, game):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
-        self.display_manager.draw_text(Fonts.ter_u22b, 0, 15 + offset, color, game.away.abv)
-        self.display_manager.draw_text(Fonts.ter_u22b, 0, 31 + offset, color, game.home.abv)
+        self._draw(i, {'away': game.away.abv, 'home': game.home.abv})
 
 
     def _print_start_time(self, i, game):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
         start_time = game.start_time
 
         if len(start_time) < 5:
@@ -331,79 +322,41 @@ class Scoreboard:
         hour = start_time[:2]
         minute = start_time[3:]
 
-        # eliminates some of the wasted space in : since using
-        # monospaced font
-        self.display_manager.draw_text(Fonts.ter_u18b, 35, 22 + offset, color, hour)
-        self.display_manager.draw_text(Fonts.ter_u18b, 53, 22 + offset, color, ':')
-        self.display_manager.draw_text(Fonts.ter_u18b, 60, 22 + offset, color, minute)
+        # Separate elements eliminate some of the wasted space in :
+        # since using monospaced font
+        self._draw(i, {'hour': hour, 'colon': ':', 'minute': minute})
 
 
     def _print_runners(self, i, game):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
         runners = game.runners
 
-        second_base_column_offset = 95
-        second_base_row_offset = 15 + offset
-        base_length = 5
-        base_gap = 2
-        base_offset = base_length + base_gap
-
-        bases_list = ['c', 'c', 'c']
-        if runners & 1:
-            bases_list[0] = 'C'
-        if runners & 2:
-            bases_list[1] = 'C'
-        if runners & 4:
-            bases_list[2] = 'C'
-
-        x0 = second_base_column_offset + base_offset
-        y0 = second_base_row_offset + base_offset
-        self.display_manager.draw_text(Fonts.symbols, x0, y0, color, bases_list[0])
-
-        x1 = second_base_column_offset
-        y1 = second_base_row_offset
-        self.display_manager.draw_text(Fonts.symbols, x1, y1, color, bases_list[1])
-
-        x2 = second_base_column_offset - base_offset
-        y2 = second_base_row_offset + base_offset
-        self.display_manager.draw_text(Fonts.symbols, x2, y2, color, bases_list[2])
+        self._draw(i, {
+            'first': 'C' if runners & 1 else 'c',
+            'second': 'C' if runners & 2 else 'c',
+            'third': 'C' if runners & 4 else 'c',
+        })
 
 
     def _print_outs(self, i, game):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
         outs = game.count.outs
 
-        outs_list = ['p', 'p', 'p']
-
         if outs is None:
-            pass
-        else:
-            if outs > 0:
-                outs_list[0] = 'P'
-            if outs > 1:
-                outs_list[1] = 'P'
-            if outs > 2:
-                outs_list[2] = 'P'
+            outs = 0
 
-        self.display_manager.draw_text(Fonts.symbols,  91, 29 + offset, color, outs_list[0])
-        self.display_manager.draw_text(Fonts.symbols,  98, 29 + offset, color, outs_list[1])
-        self.display_manager.draw_text(Fonts.symbols, 105, 29 + offset, color, outs_list[2])
+        self._draw(i, {
+            'out_1': 'P' if outs > 0 else 'p',
+            'out_2': 'P' if outs > 1 else 'p',
+            'out_3': 'P' if outs > 2 else 'p',
+        })
 
 
     def _print_inning_arrows(self, i, game):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
         inning_state = game.inning_state
 
         if inning_state == 'T':
-            self.display_manager.draw_text(Fonts.symbols, 63,  8 + offset, color, '_')
+            self._draw(i, {'top': '_'})
         elif inning_state == 'B':
-            self.display_manager.draw_text(Fonts.symbols, 63, 29 + offset, color, 'w')
+            self._draw(i, {'bottom': 'w'})
 
 
     def _print_standings(self, i, game):
@@ -423,10 +376,7 @@ class Scoreboard:
 
 
     def _print_off_day_standings(self, i):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
-        self.display_manager.draw_text(Fonts.ter_u22b, 0, 15 + offset, color, TEAMS[i])
+        self._draw(i, {'away': TEAMS[i]})
 
         if self.standings is None:
             self._print_standing(i, False, 0,0,'W0',0,0)
@@ -442,11 +392,7 @@ class Scoreboard:
 
 
     def _print_standing(self, i, is_home: bool, wins, losses, streak, division_rank, games_back):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
-        if is_home is True:
-            offset += 16
+        side = 'home' if is_home is True else 'away'
 
         if games_back == 0:
             games_back = '  0.0'
@@ -467,41 +413,27 @@ class Scoreboard:
         record = f'{wins:02d}-{losses:02d} {streak}'
         gb = f'P{division_rank} {games_back}'
 
-        self.display_manager.draw_text(Fonts.f6x10, 80, 8 + offset, color, record)
-        self.display_manager.draw_text(Fonts.f6x10, 80, 16 + offset, color, gb)
+        self._draw(i, {f'{side}_record': record, f'{side}_games_back': gb})
 
 
     def _print_score(self, i, game):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
         away = str(game.away.runs)
         home = str(game.home.runs)
 
-        if len(away) > 1:
-            self.display_manager.draw_text(Fonts.ter_u22b, 35, 15 + offset, color, away)
-        else:
-            self.display_manager.draw_text(Fonts.ter_u22b, 40, 15 + offset, color, away)
-
-        if len(home) > 1:
-            self.display_manager.draw_text(Fonts.ter_u22b, 35, 31 + offset, color, home)
-        else:
-            self.display_manager.draw_text(Fonts.ter_u22b, 40, 31 + offset, color, home)
+        # Double digits start further left
+        self._draw(i, {
+            'away_score_wide' if len(away) > 1 else 'away_score': away,
+            'home_score_wide' if len(home) > 1 else 'home_score': home,
+        })
 
 
     def _print_inning(self, i, game):
-        color = self._get_color(i)
-        offset = self._get_offset(i)
-
         inning = str(game.inning)
 
         if game.game_state == 'F':
             inning = 'F'
 
-        if len(inning) > 1:
-            self.display_manager.draw_text(Fonts.ter_u22b, 57, 23 + offset, color, inning)
-        else:
-            self.display_manager.draw_text(Fonts.ter_u22b, 62, 23 + offset, color, inning)
+        self._draw(i, {'inning_wide' if len(inning) > 1 else 'inning': inning})
 
 
 def start_game_handler(game_handler: GameHandler):
@@ -541,4 +473,7 @@ if __name__ == '__main__':
     on_time = datetime.time(7, 30)
     off_time = datetime.time(17, 30)
 
+    timer.mark('imports')
+    timer.finish_after('first frame')
+    install_from_env()
     main()
@@ -5,7 +5,9 @@ import math
 
 from on_deck.display_manager import DisplayManager
 from on_deck.colors import Colors
-from on_deck.fonts import Fonts
+from on_deck.game_model import OverviewGame
+from on_deck.layout import Layout, draw_elements, load_layout
+from on_deck.widgets import Widget, WidgetTree
 
 class Overview:
     """
@@ -13,12 +15,32 @@ class Overview:
     It handles the drawing of game scores, inning information, bases,
     outs, and other relevant information on the display.
     """
-    def __init__(self, display_manager: DisplayManager):
+    def __init__(self, display_manager: DisplayManager, layout: Layout = None):
         self.display_manager = display_manager
+        self.layout = layout.overview if layout is not None else load_layout('main').overview
 
-        # Double digit offset for ter_u28b font
-        self._ddo = 7 # double digit offset
-        self._games_per_column = 6
+        self._games_per_column = self.layout.games_per_column
+
+        # What each game slot shows. Either ('game', game) or
+        # ('time', delay_date, delay_time, delay), None when empty
+        self._slots: list = [None] * len(self.layout.slot_bounds)
+
+        root = Widget('overview', self.layout.bounds)
+        for i, bounds in enumerate(self.layout.slot_bounds):
+            root.add(Widget(f'slot_{i}', bounds, self._slot_drawer(i)))
+        self.widgets = WidgetTree(self.display_manager, root)
+
+
+    def _slot_drawer(self, i: int):
+        def draw_slot():
+            slot = self._slots[i]
+            if slot is None:
+                return
+            if slot[0] == 'game':
+                self._draw_game(slot[1], i)
+            elif slot[0] == 'time':
+                self._draw_time(slot[1], slot[2], slot[3], i)
+        return draw_slot
 
 
     def clear_game(self, i: int):
@@ -29,30 +51,18 @@ class Overview:
         Args:
             i (int): Index of the game to clear
         """
-        column_offset, row_offset = self._calculate_offset(i)
-
-        row_offset -= 20
-
-        self.display_manager.clear_section(column_offset, row_offset,
-            column_offset + 128, row_offset + 42)
+        self._slots[i] = None
+        self.widgets.mark_dirty(f'slot_{i}')
+        self.widgets.render()
 
 
-    def _calculate_offset(self, i):
-        column = math.floor(i / self._games_per_column) # column number
-        column_offset = column * 128
-
-        row_offset = 20
-        row_offset += (i - self._games_per_column * column) * 42
-        return (column_offset, row_offset)
-
-
-    def _calculate_color(self, i, game: dict = None):
+    def _calculate_color(self, i, game: OverviewGame = None):
         if game is not None:
-            if (game['flags']['no_hitter'] is True) or (game['flags']['perfect_game'] is True):
+            if (game.flags.no_hitter is True) or (game.flags.perfect_game is True):
                 return Colors.pink
 
-            away_team = game['away']['abv']
-            home_team = game['home']['abv']
+            away_team = game.away.abv
+            home_team = game.home.abv
 
             rival_teams = ()
 
@@ -70,211 +80,130 @@ class Overview:
         return Colors.green
 
 
-    def _print_scores(self, game: dict, i: int):
-        column_offset, row_offset = self._calculate_offset(i)
-        color = self._calculate_color(i, game)
-
-        column_offset += 50
-
-        away_score = str(game['away']['runs'])
-        home_score = str(game['home']['runs'])
+    def _add_scores(self, game: OverviewGame, texts: dict):
+        texts['away_score'] = str(game.away.runs)
+        texts['home_score'] = str(game.home.runs)
 
-        if len(away_score) > 1:
-            self.display_manager.draw_text(Fonts.ter_u28b, column_offset-self._ddo,
-                row_offset, color, away_score)
-        else:
-            self.display_manager.draw_text(Fonts.ter_u28b, column_offset,
-                row_offset, color, away_score)
 
-        if len(home_score) > 1:
-            self.display_manager.draw_text(Fonts.ter_u28b, column_offset-self._ddo,
-                row_offset+20, color, home_score)
-        else:
-            self.display_manager.draw_text(Fonts.ter_u28b, column_offset,
-                row_offset+20, color, home_score)
+    def _add_inning(self, game: OverviewGame, texts: dict):
+        texts['inning'] = str(game.inning)
 
 
-    def _print_text(self, text: str, color, column_offset: int, row_offset: int, font, i: int):
-        c, r = self._calculate_offset(i)
-
-        column_offset += c
-        row_offset += r + 10
-
-        self.display_manager.draw_text(font, column_offset,
-            row_offset, color, text)
-
-
-    def _print_inning(self, game: dict, i: int):
-        column_offset, row_offset = self._calculate_offset(i)
+    def _print_inning_arrows(self, game: OverviewGame, i: int):
         color = self._calculate_color(i, game)
 
-        column_offset += 74
-        row_offset += 10
-
-        inning = game['inning']
-        inning = str(inning)
+        inning_state = game.inning_state
 
-        if len(inning) > 1:
-            self.display_manager.draw_text(Fonts.ter_u28b, column_offset-self._ddo,
-                row_offset, color, inning)
-        else:
-            self.display_manager.draw_text(Fonts.ter_u28b, column_offset,
-                row_offset, color, inning)
+        for mark in self.layout.slot_marks[i]:
+            if (mark.name == 'top') and (inning_state == 'T'):
+                self.display_manager.draw_inning_arrow(mark.x, mark.y, mark.size, True, color)
+            elif (mark.name == 'bottom') and (inning_state == 'B'):
+                self.display_manager.draw_inning_arrow(mark.x, mark.y, mark.size, False, color)
 
 
-    def _print_inning_arrows(self, game: dict, i: int):
-        column_offset, row_offset = self._calculate_offset(i)
+    def _print_bases(self, game: OverviewGame, i: int):
         color = self._calculate_color(i, game)
 
-        column_offset += 80
-
-        inning_state = game['inning_state']
+        runners_int = game.runners
+        runners = {
+            'first': bool(runners_int & 1),
+            'second': bool(runners_int & 2),
+            'third': bool(runners_int & 4),
+        }
 
-        if inning_state == 'T':
-            self.display_manager.draw_inning_arrow(column_offset, row_offset-11, 7, True, color)
-        elif inning_state == 'B':
-            self.display_manager.draw_inning_arrow(column_offset, row_offset+12, 7, False, color)
+        for mark in self.layout.slot_marks[i]:
+            if mark.name in runners:
+                self.display_manager.draw_diamond(mark.x, mark.y, mark.size,
+                    mark.thickness, runners[mark.name], color)
 
 
-    def _print_bases(self, game: dict, i: int):
-        column_offset, row_offset = self._calculate_offset(i)
+    def _print_outs(self, game: OverviewGame, i: int):
         color = self._calculate_color(i, game)
 
-        column_offset += 109
-        row_offset -= 8
-
-        radius = 6
-        thickness = 2
-        delta = radius + 2 # could set this to 0 to make the bases touch
-
-        runners_int = game['runners']
-        runners = [False, False, False]
-        for j in range(3):
-            if runners_int & (1 << j):
-                runners[j] = True
-
-        self.display_manager.draw_diamond(column_offset+delta, row_offset+delta, radius,
-            thickness, runners[0], color)
-        self.display_manager.draw_diamond(column_offset, row_offset, radius,
-            thickness, runners[1], color)
-        self.display_manager.draw_diamond(column_offset-delta, row_offset+delta, radius,
-            thickness, runners[2], color)
-
-
-    def _print_outs(self, game: dict, i: int):
-        column_offset, row_offset = self._calculate_offset(i)
-        color = self._calculate_color(i, game)
-
-        column_offset += 109
-        row_offset += 12
-
-        radius = 3
-        thickness = 1
-        delta = radius + 5
-
-        outs_int = game['count']['outs']
+        outs_int = game.count.outs
 
         if outs_int is None:
             return
 
-        outs = [False, False, False]
-        for j in range(3):
-            if outs_int > j:
-                outs[j] = True
-
-        self.display_manager.draw_circle(column_offset-delta, row_offset, radius,
-            thickness, outs[0], color)
-        self.display_manager.draw_circle(column_offset, row_offset, radius,
-            thickness, outs[1], color)
-        self.display_manager.draw_circle(column_offset+delta, row_offset, radius,
-            thickness, outs[2], color)
-        return
+        for mark in self.layout.slot_marks[i]:
+            if mark.name != 'outs':
+                continue
+            for j in range(mark.count):
+                self.display_manager.draw_circle(mark.x + j*mark.dx, mark.y + j*mark.dy,
+                    mark.size, mark.thickness, outs_int > j, color)
 
 
-    def _print_start_time(self, game: dict, i: int):
-        column_offset, row_offset = self._calculate_offset(i)
-        color = self._calculate_color(i, game)
-
-        column_offset += 50
-        row_offset += 10
-
-        start_time = game['start_time']
+    def _add_start_time(self, game: OverviewGame, texts: dict):
+        start_time = game.start_time
         if len(start_time) < 5:
             start_time = ' ' + start_time
 
-        self.display_manager.draw_text(Fonts.ter_u28b, column_offset,
-            row_offset, color, start_time)
+        texts['start_time'] = start_time
 
 
-    def print_game(self, game: dict, i: int):
+    def print_game(self, game: OverviewGame, i: int):
         """
         Prints the game information on the display. This includes team
         names, scores, inning information, bases, outs, and other
         relevant information.
 
         Args:
-            game (dict): Game data dictionary containing information
+            game (OverviewGame): Game record containing information
                 about the game.
             i (int): Index of the game to print.
         """
-        column_offset, row_offset = self._calculate_offset(i)
-        color = self._calculate_color(i, game)
+        self._slots[i] = None if game is None else ('game', game)
+        self.widgets.mark_dirty(f'slot_{i}')
+        self.widgets.render()
 
-        self.clear_game(i)
-
-        if game is None:
-            return
 
-        away_team = game['away']['abv']
-        home_team = game['home']['abv']
+    def _draw_game(self, game: OverviewGame, i: int):
+        color = self._calculate_color(i, game)
 
-        self.display_manager.draw_text(Fonts.ter_u28b, column_offset,
-            row_offset, color, away_team)
-        self.display_manager.draw_text(Fonts.ter_u28b, column_offset,
-            row_offset+20, color, home_team)
+        texts = {'away': game.away.abv, 'home': game.home.abv}
 
-        game_state = game['game_state']
+        game_state = game.game_state
 
         # Live
         if game_state == 'L':
-            self._print_scores(game, i)
-            self._print_inning(game, i)
+            self._add_scores(game, texts)
+            self._add_inning(game, texts)
             self._print_inning_arrows(game, i)
             self._print_bases(game, i)
             self._print_outs(game, i)
 
         # Final
         elif game_state == 'F':
-            self._print_scores(game, i)
-            inning = game['inning']
-            if inning == 9:
-                self._print_text('F', color, 74, 0, Fonts.ter_u28b, i)
-            else:
-                # Multiple print statements to squeeze the text into
-                # tight space
-                self._print_text('F', color, 74, 0, Fonts.ter_u28b, i)
-                self._print_text('/', color, 84, 0, Fonts.ter_u28b, i)
-                self._print_text(f'{inning}', color, 94, 0, Fonts.ter_u28b, i)
+            self._add_scores(game, texts)
+            inning = game.inning
+            texts['final'] = 'F'
+            if inning != 9:
+                # Separate elements to squeeze the text into tight
+                # space
+                texts['final_slash'] = '/'
+                texts['final_inning'] = f'{inning}'
 
         # Pregame
         elif game_state == 'P':
-            self._print_start_time(game, i)
+            self._add_start_time(game, texts)
 
         # Suspended / Postposed
         elif game_state == 'S':
-            self._print_scores(game, i)
-            self._print_inning(game, i)
+            self._add_scores(game, texts)
+            self._add_inning(game, texts)
             self._print_inning_arrows(game, i)
             self._print_outs(game, i)
-            self._print_text('SUSP', color, 94, -8, Fonts.ter_u16b, i)
+            texts['suspended'] = 'SUSP'
 
         # Delay
         elif game_state == 'D':
-            self._print_scores(game, i)
-            self._print_inning(game, i)
+            self._add_scores(game, texts)
+            self._add_inning(game, texts)
             self._print_inning_arrows(game, i)
             self._print_outs(game, i)
-            self._print_text('DLY', color, 92, -8, Fonts.ter_u16b, i)
+            texts['delayed'] = 'DLY'
+
+        draw_elements(self.display_manager, self.layout.slot_elements[i], texts, color=color)
 
 
 
@@ -289,31 +218,24 @@ class Overview:
             delay (int): Delay in seconds
             i (int): Index of the game to print time for
         """
+        self._slots[i] = ('time', delay_date, delay_time, delay)
+        self.widgets.mark_dirty(f'slot_{i}')
+        self.widgets.render()
+        self.display_manager.swap_frame()
+
+
+    def _draw_time(self, delay_date: str, delay_time: str, delay: str, i: int):
         # Texts need to move to better looking location
         # But all the logic is here
-        self.clear_game(i)
-
-        column_offset, row_offset = self._calculate_offset(i)
         color = self._calculate_color(i, None)
 
-        column_offset += 33
-
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset-16,
-            row_offset-6, color, delay_date)
-        # self.display_manager.draw_text(Fonts.ter_u16b, column_offset,
-        #     row_offset-6, color, current_time)
-
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset,
-            row_offset+6, color, delay_time)
-
-        if len(delay) > 8:
-            # incase delay is super large
-            # like it is in offseason testing
-            column_offset -= (8 * (len(delay) - 8))
-        self.display_manager.draw_text(Fonts.ter_u16b, column_offset,
-            row_offset+18, color, delay)
-
-        self.display_manager.swap_frame()
+        # The delay is right aligned with the delay time so a super
+        # large delay (like it is in offseason testing) grows to the left
+        draw_elements(self.display_manager, self.layout.slot_elements[i], {
+            'delay_date': delay_date,
+            'delay_time': delay_time,
+            'delay': delay,
+        }, color=color)
 
 
 if __name__ == '__main__':
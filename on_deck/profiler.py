@@ -0,0 +1,198 @@
+"""
+Sampling profiler the display and fetcher can be told to run while
+they keep running, so hot paths can be captured during a live game.
+
+    GET /profile?seconds=10&process=display    start a profile
+    GET /profile?process=display               top functions as JSON
+    GET /profile?process=display&format=collapsed
+                                               stacks for flamegraph.pl
+                                               or speedscope
+    GET /settings?profile=10                   profile every process
+
+The server publishes the request on PROFILE_CHANNEL. The listener
+thread of every matching process samples the stacks of all its threads
+for the given number of seconds and saves the result to Redis under
+profile:<process>. cProfile is not used since it only sees the thread
+that started it and the handlers draw from their own threads.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+PROFILE_CHANNEL = 'profile'
+RESULT_PREFIX = 'profile:'
+
+# Longest profile a request can ask for, in seconds
+MAX_SECONDS = 120
+# Seconds between samples
+INTERVAL = 0.01
+# Stacks kept in a saved profile, the rest are summed into one entry
+MAX_STACKS = 500
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of every thread but its own.
+
+    Args:
+        interval (float): Seconds between samples
+    """
+    def __init__(self, interval: float = INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def sample(self, names: Dict[int, str]):
+        """
+        Takes one sample of every thread.
+
+        Args:
+            names (Dict[int, str]): Thread names by thread ident
+        """
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float):
+        """
+        Samples for a number of seconds.
+
+        Args:
+            seconds (float): How long to sample
+        """
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.sample(names)
+            next_sample += self.interval
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+
+    def result(self, process: str, seconds: float) -> dict:
+        """
+        Summarizes the samples.
+
+        Args:
+            process (str): Name of the profiled process
+            seconds (float): How long was sampled
+
+        Returns:
+            dict: Samples, every function with its samples at the top
+                of the stack (self) and anywhere in it (total), most
+                self samples first, and the most common stacks
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            # The first entry is the thread name
+            if len(stack) > 1:
+                own[stack[-1]] += count
+            for name in set(stack[1:]):
+                total[name] += count
+
+        stacks = self.stacks.most_common(MAX_STACKS)
+        other = sum(self.stacks.values()) - sum(count for _, count in stacks)
+        if other:
+            stacks.append((('other',), other))
+
+        return {
+            'process': process,
+            'time': time.time(),
+            'seconds': seconds,
+            'interval': self.interval,
+            'samples': self.samples,
+            'functions': [
+                {'function': name, 'self': own[name], 'total': total[name]}
+                for name in sorted(total, key=lambda name: (own[name], total[name]), reverse=True)
+            ],
+            'stacks': [[';'.join(stack), count] for stack, count in stacks],
+        }
+
+
+def collapsed(result: dict) -> str:
+    """
+    Returns the stacks of a profile in the collapsed format flamegraph.pl
+    and speedscope read.
+
+    Args:
+        result (dict): Profile from SamplingProfiler.result
+
+    Returns:
+        str: One 'frame;frame;frame count' line per stack
+    """
+    return ''.join(f'{stack} {count}\n' for stack, count in result['stacks'])
+
+
+def parse_request(data: bytes) -> Tuple[float, str]:
+    """
+    Reads a profile request published on PROFILE_CHANNEL.
+
+    Args:
+        data (bytes): Message data
+
+    Returns:
+        Tuple[float, str]: Seconds to profile and the process to
+            profile, None for every process
+    """
+    request = json.loads(data)
+    seconds = min(max(float(request.get('seconds', 10)), 0.1), MAX_SECONDS)
+    return seconds, request.get('process')
+
+
+def listen(redis_client, process: str):
+    """
+    Starts a thread that runs a profile whenever one is requested for
+    this process. Requests that come in while a profile runs are
+    ignored.
+
+    Args:
+        redis_client (redis.Redis): Redis client
+        process (str): Name of this process, for example 'display'
+    """
+    def listener():
+        pubsub = redis_client.pubsub()
+        pubsub.subscribe(PROFILE_CHANNEL)
+        while True:
+            message = pubsub.get_message(timeout=60)
+            if (not message) or (message['type'] != 'message'):
+                continue
+
+            try:
+                seconds, target = parse_request(message['data'])
+            except (ValueError, TypeError, AttributeError):
+                print(f'Ignoring profile request {message["data"]!r}')
+                continue
+            if target not in (None, process):
+                continue
+
+            print(f'Profiling {process} for {seconds} seconds')
+            profiler = SamplingProfiler()
+            profiler.run(seconds)
+            result = profiler.result(process, seconds)
+            redis_client.set(f'{RESULT_PREFIX}{process}', json.dumps(result))
+            print(f'Profile of {process} saved, {profiler.samples} samples')
+
+            # Requests that came in during the profile would otherwise
+            # run back to back
+            while pubsub.get_message(timeout=0) is not None:
+                pass
+
+    threading.Thread(target=listener, name='profiler', daemon=True).start()
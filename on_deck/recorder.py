@@ -0,0 +1,199 @@
+"""
+Records the Redis pub/sub traffic of the scoreboard so a live game can be
+replayed offline with on_deck.replay.
+
+A recording is an append-only binary file. After the header every entry
+is either a key the display reads (a snapshot of it taken when the
+recording starts and again after every settings or init message) or a
+published message. Each entry has its offset in seconds from the start
+of the recording:
+
+    header: magic b'ODRC', version, start time (unix seconds)
+    entry:  kind, offset, channel length, data length, channel, data
+
+Entries are flushed one at a time so a recording that is cut off still
+replays up to its last complete entry.
+
+Run this module to record until it is stopped with Ctrl+C:
+    python -m on_deck.recorder game.odr [--host 10.0.1.10] [--duration 600]
+"""
+
+import argparse
+import os
+import struct
+import time
+from typing import BinaryIO, Iterator, NamedTuple
+
+import redis
+
+from on_deck.display_keys import SETTINGS_CHANNELS, SNAPSHOT_KEYS
+
+MAGIC = b'ODRC'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHd')
+# kind, offset, channel length, data length
+ENTRY = struct.Struct('<BdHI')
+
+KEY = 0
+MESSAGE = 1
+
+# Seconds after a settings message to snapshot the keys again. The
+# fetcher sets the new gamecast some time after publishing gamecast_id
+# and does not publish when it does, the display waits 1 second before
+# reading it
+SETTINGS_DELAY = 1.5
+
+REDIS_IP = '10.0.1.10'
+
+
+class Entry(NamedTuple):
+    """One recorded key or message."""
+    kind: int
+    offset: float
+    channel: bytes
+    data: bytes
+
+
+def write_entry(f: BinaryIO, kind: int, offset: float, channel: bytes, data: bytes):
+    """
+    Appends an entry to a recording.
+
+    Args:
+        f (BinaryIO): Recording opened for appending
+        kind (int): KEY or MESSAGE
+        offset (float): Seconds since the start of the recording
+        channel (bytes): Key or channel name
+        data (bytes): Value or message data
+    """
+    f.write(ENTRY.pack(kind, offset, len(channel), len(data)) + channel + data)
+
+
+def read_recording(path: str) -> Iterator[Entry]:
+    """
+    Reads the entries of a recording in order. A cut off last entry is
+    ignored.
+
+    Args:
+        path (str): Path to the recording
+
+    Returns:
+        Iterator[Entry]: Recorded entries
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise ValueError(f'{path} is not a recording')
+        magic, version, _ = HEADER.unpack(header)
+        if (magic != MAGIC) or (version != VERSION):
+            raise ValueError(f'{path} is not a version {VERSION} recording')
+
+        while True:
+            fixed = f.read(ENTRY.size)
+            if len(fixed) != ENTRY.size:
+                return
+            kind, offset, channel_length, data_length = ENTRY.unpack(fixed)
+            payload = f.read(channel_length + data_length)
+            if len(payload) != channel_length + data_length:
+                return
+            yield Entry(kind, offset, payload[:channel_length], payload[channel_length:])
+
+
+class Recorder:
+    """
+    Records every message published on the Redis server, plus the keys
+    the display reads.
+
+    Args:
+        client (redis.Redis): Redis client (or LocalRedis) to record
+        path (str): Path of the recording to write
+    """
+    def __init__(self, client: redis.Redis, path: str):
+        self.redis = client
+        self.path = path
+        self.messages = 0
+        self._running = False
+        self._start: float = None
+        self._file: BinaryIO = None
+
+    def _record(self, kind: int, channel: bytes, data: bytes):
+        write_entry(self._file, kind, time.monotonic() - self._start, channel, data)
+        self._file.flush()
+
+    def snapshot(self):
+        """Records the current value of every key the display reads."""
+        keys = list(SNAPSHOT_KEYS)
+        num_games = self.redis.get('num_games')
+        if num_games is not None:
+            keys += [f'{i}' for i in range(int(num_games))]
+
+        for key, value in zip(keys, self.redis.mget(keys)):
+            if value is not None:
+                self._record(KEY, key.encode('utf-8'), value)
+
+    def start(self, duration: float = None):
+        """
+        Records until stop is called or duration seconds have passed.
+
+        Args:
+            duration (float): Seconds to record. None records until stop
+        """
+        pubsub = self.redis.pubsub()
+        pubsub.psubscribe('*')
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'wb') as self._file:
+            self._start = time.monotonic()
+            self._file.write(HEADER.pack(MAGIC, VERSION, time.time()))
+            self.snapshot()
+
+            # When to snapshot again after a settings message
+            resnapshot: float = None
+            self._running = True
+            while self._running:
+                if (duration is not None) and (time.monotonic() - self._start >= duration):
+                    break
+
+                message = pubsub.get_message(timeout=1)
+                if (resnapshot is not None) and ((time.monotonic() >= resnapshot) or (
+                        message and message.get('channel') == b'gamecast')):
+                    # The new gamecast is set by now, or it is set before
+                    # the first delta of it is published
+                    self.snapshot()
+                    resnapshot = None
+                if (not message) or (message['type'] != 'pmessage'):
+                    continue
+
+                channel = message['channel']
+                data = message['data']
+                if isinstance(data, int):
+                    data = str(data).encode('utf-8')
+
+                if channel in SETTINGS_CHANNELS:
+                    # The publisher sets the keys before publishing, the
+                    # replay needs them to be set before the message too
+                    self.snapshot()
+                    resnapshot = time.monotonic() + SETTINGS_DELAY
+                self._record(MESSAGE, channel, data)
+                self.messages += 1
+
+        pubsub.close()
+
+    def stop(self):
+        """Stops a recording started in another thread."""
+        self._running = False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record the scoreboard pub/sub traffic')
+    parser.add_argument('path', help='recording to write')
+    parser.add_argument('--host', default=REDIS_IP, help='Redis host')
+    parser.add_argument('--duration', type=float, default=None, help='seconds to record')
+    args = parser.parse_args()
+
+    recorder = Recorder(redis.Redis(host=args.host, port=6379, db=0), args.path)
+    try:
+        recorder.start(args.duration)
+    except KeyboardInterrupt:
+        pass
+    print(f'recorded {recorder.messages} messages to {args.path}')
@@ -0,0 +1,121 @@
+"""
+Replays a recording made with on_deck.recorder into a Redis server or an
+in-process LocalRedis bus, at the recorded speed, N times faster or as
+fast as possible.
+
+Replay into a Redis server the display is connected to:
+    python -m on_deck.replay game.odr --host localhost --speed 4
+
+Replay into a display running in this process, no Redis server needed:
+    python -m on_deck.replay game.odr --display --speed 0
+"""
+
+import argparse
+import threading
+import time
+from typing import List
+
+import redis
+
+from on_deck.recorder import KEY, Entry, read_recording
+
+
+class Replayer:
+    """
+    Feeds the keys and messages of a recording to a Redis client.
+
+    Args:
+        path (str): Path to the recording
+        client (redis.Redis): Redis client or LocalRedis to replay into
+        speed (float): 1 replays in real time, 2 twice as fast and so
+            on. 0 replays as fast as possible
+    """
+    def __init__(self, path: str, client: redis.Redis, speed: float = 1.0):
+        self.redis = client
+        self.speed = speed
+        self.entries: List[Entry] = list(read_recording(path))
+        self._position = 0
+
+    def prime(self):
+        """
+        Sets the keys that were recorded when the recording started.
+        Call this before creating handlers that read keys when they are
+        created. run does it otherwise.
+        """
+        while (self._position < len(self.entries)) and (self.entries[self._position].kind == KEY):
+            entry = self.entries[self._position]
+            self.redis.set(entry.channel, entry.data)
+            self._position += 1
+
+    def run(self) -> dict:
+        """
+        Replays the rest of the recording.
+
+        Returns:
+            dict: messages and keys replayed, duration in seconds and
+                max_lag, the most the replay fell behind the schedule
+        """
+        self.prime()
+
+        messages = 0
+        keys = 0
+        max_lag = 0.0
+        first_offset = self.entries[self._position].offset if self._position < len(self.entries) else 0
+        start = time.monotonic()
+
+        for entry in self.entries[self._position:]:
+            if self.speed > 0:
+                delay = start + (entry.offset - first_offset) / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    max_lag = max(max_lag, -delay)
+
+            if entry.kind == KEY:
+                self.redis.set(entry.channel, entry.data)
+                keys += 1
+            else:
+                self.redis.publish(entry.channel, entry.data)
+                messages += 1
+
+        self._position = len(self.entries)
+
+        return {
+            'messages': messages,
+            'keys': keys,
+            'duration': time.monotonic() - start,
+            'max_lag': max_lag,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a scoreboard recording')
+    parser.add_argument('path', help='recording to replay')
+    parser.add_argument('--speed', type=float, default=1.0,
+        help='replay speed, 0 replays as fast as possible')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--host', help='Redis host to replay into')
+    target.add_argument('--display', action='store_true',
+        help='run the display in this process on an in-process bus')
+    args = parser.parse_args()
+
+    if args.host is not None:
+        replayer = Replayer(args.path, redis.Redis(host=args.host, port=6379, db=0), args.speed)
+        print(replayer.run())
+    else:
+        # Only needed here, the matrix library is slow to load
+        from on_deck.local_redis import LocalRedis
+        from on_deck.on_deck_display import Scoreboard
+
+        bus = LocalRedis()
+        replayer = Replayer(args.path, bus, args.speed)
+        replayer.prime()
+
+        def replay():
+            # Let the handlers subscribe to the game channels first
+            time.sleep(2)
+            print(replayer.run())
+
+        scoreboard = Scoreboard(redis_client=bus)
+        threading.Thread(target=replay, daemon=True).start()
+        scoreboard.start()
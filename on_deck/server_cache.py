@@ -0,0 +1,180 @@
+"""
+Caches and response helpers shared by the Flask server in
+on_deck_server and the asyncio server in async_server.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+# Games built for /<gamepk> that are kept and for how many seconds
+GAME_CACHE_SIZE = 32
+GAME_CACHE_TTL = 15
+
+
+def is_set(value: str) -> bool:
+    """
+    Returns if a query argument like reset=1 is turned on.
+
+    Args:
+        value (str): Value of the argument, None if it is missing
+
+    Returns:
+        bool: True for 1 and true
+    """
+    return (value is not None) and (value.lower() in ('1', 'true'))
+
+
+def encode_json(data, compact: bool, gzipped: bool) -> Tuple[bytes, str]:
+    """
+    Encodes a response body and its ETag. The ETag is a hash of the
+    JSON, gzipped bodies get their own.
+
+    Args:
+        data: Data to encode
+        compact (bool): Leave out the indentation
+        gzipped (bool): Compress the body
+
+    Returns:
+        Tuple[bytes, str]: Body and ETag without quotes
+    """
+    if compact:
+        body = json.dumps(data, separators=(',', ':'))
+    else:
+        body = json.dumps(data, indent=4)
+    body = body.encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()[:20]
+    if gzipped:
+        body = gzip.compress(body, compresslevel=6)
+        etag += '-gzip'
+    return body, etag
+
+
+def build_game(gamepk: int) -> str:
+    """
+    Builds a game from the Stats API for /<gamepk>.
+
+    Args:
+        gamepk (int): Gamepk of the game
+
+    Returns:
+        str: Game as indented JSON
+    """
+    # at_bat is slow to import and only needed here
+    from at_bat.scoreboard_data import ScoreboardData
+
+    game = ScoreboardData(gamepk, 0)
+    return json.dumps(game.to_dict(), indent=4)
+
+
+class SingleFlightCache:
+    """
+    LRU cache whose entries expire after a number of seconds. When a
+    key is missing only the first caller builds it, callers that ask
+    for the same key in the meantime wait for that build.
+
+    Args:
+        build (Callable): Builds the value of a key
+        max_size (int): Number of entries kept
+        ttl (float): Seconds an entry is kept
+    """
+    def __init__(self, build: Callable, max_size: int = GAME_CACHE_SIZE,
+            ttl: float = GAME_CACHE_TTL):
+        self.build = build
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._flights: dict = {}
+
+    def _cached(self, key):
+        entry = self._entries.get(key)
+        if (entry is not None) and (time.monotonic() - entry[0] < self.ttl):
+            self._entries.move_to_end(key)
+            return entry
+        return None
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Returns the value of a key, building it if needed. Errors of the
+        build are raised in every caller that waited for it.
+
+        Args:
+            key: Key to get
+
+        Returns:
+            Value of the key
+        """
+        with self._lock:
+            entry = self._cached(key)
+            if entry is not None:
+                return entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {'done': threading.Event()}
+
+        if not leader:
+            flight['done'].wait()
+            if 'error' in flight:
+                raise flight['error']
+            return flight['value']
+
+        try:
+            flight['value'] = self.build(key)
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                if 'value' in flight:
+                    self._store(key, flight['value'])
+                del self._flights[key]
+            flight['done'].set()
+        return flight['value']
+
+
+class AsyncSingleFlightCache(SingleFlightCache):
+    """
+    SingleFlightCache for asyncio. The build is a blocking function,
+    it runs in the event loop's default executor.
+    """
+    async def get(self, key):
+        """
+        Returns the value of a key, building it if needed. Errors of the
+        build are raised in every caller that waited for it.
+
+        Args:
+            key: Key to get
+
+        Returns:
+            Value of the key
+        """
+        entry = self._cached(key)
+        if entry is not None:
+            return entry[1]
+
+        future = self._flights.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(None, self.build, key)
+            self._flights[key] = future
+            future.add_done_callback(lambda done: self._landed(key, done))
+        # A caller that gives up must not cancel the build for the others
+        return await asyncio.shield(future)
+
+    def _landed(self, key, future: asyncio.Future):
+        del self._flights[key]
+        if (not future.cancelled()) and (future.exception() is None):
+            self._store(key, future.result())
@@ -5,6 +5,7 @@ import math
 from on_deck.display_manager import DisplayManager
 from on_deck.colors import Colors as c
 from on_deck.fonts import Fonts
+from on_deck.layout import load_layout
 from on_deck.matrix_loader import graphics, RGBMatrixOptions
 
 def get_options() -> RGBMatrixOptions:
@@ -14,8 +15,6 @@ def get_options() -> RGBMatrixOptions:
     Returns:
         RGBMatrixOptions: RGBMatrixOptions object
     """
-    options = RGBMatrixOptions()
-
     parser = argparse.ArgumentParser()
     parser.add_argument('--use-emulator', action='store_true')
     args = parser.parse_args()
@@ -25,18 +24,11 @@ def get_options() -> RGBMatrixOptions:
     else:
         use_emulator = False
 
-    if (platform.system() == 'Windows') or (use_emulator):
-        options.cols = int(384)
-        options.rows = int(256)
-    else:
-        options.cols = 128
-        options.rows = 64
-        options.pixel_mapper_config = 'V-mapper'
-        options.chain_length = 4
-        options.parallel = 3
-        options.disable_hardware_pulsing = True
+    emulator = (platform.system() == 'Windows') or (use_emulator)
+    options = load_layout('main').matrix_options(emulator)
+    if not emulator:
         options.pwm_bits = 2 # Can run 2 with sudo, 1 without
-        options.gpio_slowdown = 4
+        options.pwm_dither_bits = 0
 
     return options
 
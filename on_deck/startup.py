@@ -0,0 +1,172 @@
+"""
+Measures how long the entry points take to start. Startup timing is
+turned on with ON_DECK_STARTUP_TIMING=1 or by passing --startup-timing
+to an entry point. Each entry point marks the end of its startup phases
+(imports, fonts, matrix init, Redis connect, first snapshot, first
+frame) and the timings are printed once the last phase is done.
+
+Run this module to see the import cost of every module an entry point
+imports, measured with python -X importtime in a fresh interpreter:
+    python -m on_deck.startup on_deck.on_deck_display
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+ENABLED = (os.environ.get('ON_DECK_STARTUP_TIMING', '').lower() in ('1', 'true')
+    or '--startup-timing' in sys.argv)
+
+def _process_age() -> float:
+    """
+    Returns how many seconds ago the process started, or None if it
+    can not be read (not Linux). This includes the interpreter startup
+    that happens before any module is imported.
+    """
+    try:
+        with open('/proc/self/stat', encoding='utf-8') as f:
+            # The command name can contain spaces, fields start after it
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime', encoding='utf-8') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    start_ticks = int(fields[19])
+    return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+
+
+class StartupTimer:
+    """
+    Records the end of each startup phase. Phases are measured from the
+    end of the previous phase, so the phase names should be marked in
+    the order they happen. Marking a phase twice only keeps the first.
+    The first phase starts when the process started if that can be
+    read, so it includes the interpreter startup.
+
+    Args:
+        enabled (bool): False makes every method do nothing
+    """
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._origin = time.monotonic() - ((_process_age() or 0) if enabled else 0)
+        self._last = self._origin
+        self._phases: List[Tuple[str, float]] = []
+        self._final: str = None
+        self._reported = False
+
+    def finish_after(self, name: str):
+        """
+        Sets the phase that completes startup. The timings are printed
+        as soon as it is marked.
+
+        Args:
+            name (str): Name of the last phase
+        """
+        self._final = name
+
+    def mark(self, name: str, after: str = None):
+        """
+        Marks the end of a phase.
+
+        Args:
+            name (str): Name of the phase
+            after (str): Only mark the phase if this phase was already
+                marked. Used for points that are passed many times, like
+                a frame swap that only counts once there is data to show
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            marked = [phase for phase, _ in self._phases]
+            if name in marked:
+                return
+            if (after is not None) and (after not in marked):
+                return
+            now = time.monotonic()
+            self._phases.append((name, now - self._last))
+            self._last = now
+
+        if name == self._final:
+            self.report()
+
+    def report(self):
+        """Prints the time of every phase marked so far."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._reported:
+                return
+            self._reported = True
+            phases = list(self._phases)
+            total = self._last - self._origin
+
+        print('startup timing:')
+        for name, seconds in phases:
+            print(f'  {name:<16} {seconds * 1000:8.1f} ms')
+        print(f'  {"total":<16} {total * 1000:8.1f} ms')
+
+
+timer = StartupTimer(ENABLED)
+
+
+def import_costs(module: str) -> List[Tuple[str, int, int]]:
+    """
+    Imports a module in a fresh interpreter with -X importtime and
+    returns the cost of every module it imported.
+
+    Args:
+        module (str): Name of the module to import
+
+    Returns:
+        List[Tuple[str, int, int]]: (module, self microseconds,
+            cumulative microseconds) for every imported module, the
+            most expensive first. The cumulative time of a module
+            includes the modules it imported
+    """
+    # Only the audit needs these, the entry points should not pay for them
+    import re
+    import subprocess
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=False,
+        cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+    if result.returncode != 0:
+        # The import error is printed after the import times
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+
+    costs = []
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)', line)
+        if match is None:
+            continue
+        self_us, cumulative_us, name = match.groups()
+        costs.append((name, int(self_us), int(cumulative_us)))
+
+    costs.sort(key=lambda cost: cost[2], reverse=True)
+    return costs
+
+
+if __name__ == '__main__':
+    entry_points = sys.argv[1:] or ['on_deck.on_deck_display', 'on_deck.on_deck_fetcher',
+        'on_deck.on_deck_server', 'on_deck.on_desk']
+
+    for entry_point in entry_points:
+        try:
+            module_costs = import_costs(entry_point)
+        except ImportError as e:
+            print(f'{entry_point}: {e}\n')
+            continue
+
+        total_us = next(cost[2] for cost in module_costs if cost[0] == entry_point)
+        print(f'{entry_point}: {total_us / 1000:.1f} ms')
+        module_costs = [cost for cost in module_costs if cost[0] != entry_point]
+        for name, self_us, cumulative_us in module_costs[:15]:
+            print(f'  {name:<40} {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:.1f} ms)')
+        print()
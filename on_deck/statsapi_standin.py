@@ -0,0 +1,269 @@
+"""
+Local stand-in for the MLB Stats API so the fetchers can be run and
+benchmarked without network access.
+
+The stand-in is an HTTP server that answers from recorded fixtures. A
+request for https://statsapi.mlb.com/api/v1/schedule?date=2024-05-29 is
+rewritten to <stand-in>/statsapi.mlb.com/api/v1/schedule?date=2024-05-29
+and served from
+
+    <fixtures>/statsapi.mlb.com/api/v1/schedule/date=2024-05-29.N.json
+
+where N counts the requests made for that URL. The last fixture is
+served again once they run out, so a recorded live game plays out over
+repeated requests and then stays final. Latency, jitter and error
+responses can be injected to see how the fetchers cope.
+
+Record fixtures by running the stand-in with --record and pointing a
+fetcher at it, every request is then passed to the real API and saved:
+    python -m on_deck.statsapi_standin fixtures/2024-05-29 --record
+    STATSAPI_STANDIN=http://localhost:8400 python -m on_deck.on_deck_fetcher
+
+Serve them again, 50 ms slower and failing one request in 20:
+    python -m on_deck.statsapi_standin fixtures/2024-05-29 --latency 0.05 --error-rate 0.05
+
+at_bat makes its requests with the requests library. When the
+STATSAPI_STANDIN environment variable is set, install_from_env points
+every request at the stand-in it names.
+"""
+
+import argparse
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import quote, urlsplit
+
+ENV_VAR = 'STATSAPI_STANDIN'
+PORT = 8400
+
+
+def fixture_path(fixtures: str, host: str, path: str, query: str, index: int) -> str:
+    """
+    Returns the file a response is stored in.
+
+    Args:
+        fixtures (str): Fixtures directory
+        host (str): Host of the real API
+        path (str): Request path
+        query (str): Request query string without the '?'
+        index (int): Number of earlier requests for the same URL
+
+    Returns:
+        str: Path of the fixture
+    """
+    segments = [quote(segment, safe='') for segment in path.split('/')
+        if segment not in ('', '.', '..')]
+    name = quote(query, safe='=&,') if query else '_'
+    return os.path.join(fixtures, quote(host, safe=''), *segments, f'{name}.{index}.json')
+
+
+class StandinServer:
+    """
+    Serves recorded Stats API responses.
+
+    Args:
+        fixtures (str): Fixtures directory
+        port (int): Port to listen on. 0 picks a free port
+        latency (float): Seconds added to every response
+        jitter (float): Up to this many more seconds are added at random
+        error_rate (float): Fraction of requests answered with
+            error_status instead of the fixture
+        error_status (int): Status of the injected errors
+        record (bool): Pass requests to the real API and save the
+            responses as fixtures
+        seed (int): Random seed for the jitter and errors
+    """
+    def __init__(self, fixtures: str, port: int = PORT, latency: float = 0.0,
+            jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+            record: bool = False, seed: int = 0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.record = record
+
+        self.stats = {'requests': 0, 'errors': 0, 'missing': 0, 'recorded': 0}
+        self._random = random.Random(seed)
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread = None
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = standin.respond(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json;charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """URL of the stand-in, for example http://127.0.0.1:8400"""
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def reset(self):
+        """Serves every URL from its first fixture again and clears the stats."""
+        with self._lock:
+            self._requests.clear()
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def _next_index(self, key: Tuple[str, str, str]) -> int:
+        with self._lock:
+            self.stats['requests'] += 1
+            index = self._requests.get(key, 0)
+            self._requests[key] = index + 1
+            return index
+
+    def _upstream(self, host: str, path: str, query: str) -> Tuple[int, bytes]:
+        # Only needed when recording
+        import urllib.error
+        import urllib.request
+
+        url = f'https://{host}{path}' + (f'?{query}' if query else '')
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def respond(self, request_path: str) -> Tuple[int, bytes]:
+        """
+        Answers a request made to the stand-in.
+
+        Args:
+            request_path (str): Path and query of the request, starting
+                with the host of the real API
+
+        Returns:
+            Tuple[int, bytes]: Status and body
+        """
+        parts = urlsplit(request_path)
+        host, _, path = parts.path.lstrip('/').partition('/')
+        path = f'/{path}'
+        index = self._next_index((host, path, parts.query))
+
+        if self.latency or self.jitter:
+            with self._lock:
+                delay = self.latency + self._random.uniform(0, self.jitter)
+            time.sleep(delay)
+
+        if self.record:
+            status, body = self._upstream(host, path, parts.query)
+            if status == 200:
+                file_path = fixture_path(self.fixtures, host, path, parts.query, index)
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, 'wb') as f:
+                    f.write(body)
+                with self._lock:
+                    self.stats['recorded'] += 1
+            return status, body
+
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.stats['errors'] += 1
+        if failed:
+            return self.error_status, b'{"message": "injected error"}'
+
+        # Fall back to the last fixture recorded for this URL
+        while index >= 0:
+            file_path = fixture_path(self.fixtures, host, path, parts.query, index)
+            if os.path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    return 200, f.read()
+            index -= 1
+
+        with self._lock:
+            self.stats['missing'] += 1
+        print(f'No fixture for {host}{path}?{parts.query}')
+        return 404, b'{"message": "no fixture"}'
+
+    def start(self) -> str:
+        """
+        Starts serving in a background thread.
+
+        Returns:
+            str: URL of the stand-in
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        """Stops serving and closes the socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def use_standin(url: str):
+    """
+    Points every request made with the requests library, which is what
+    at_bat uses, at a stand-in.
+
+    Args:
+        url (str): URL of the stand-in, for example http://localhost:8400
+    """
+    import requests
+
+    url = url.rstrip('/')
+    request = requests.Session.request
+    if getattr(request, 'standin_url', None) is not None:
+        request = request.original
+
+    def standin_request(session, method, request_url, *args, **kwargs):
+        if not request_url.startswith(url):
+            parts = urlsplit(request_url)
+            request_url = f'{url}/{parts.netloc}{parts.path}' + (f'?{parts.query}' if parts.query else '')
+        return request(session, method, request_url, *args, **kwargs)
+
+    standin_request.original = request
+    standin_request.standin_url = url
+    requests.Session.request = standin_request
+    print(f'Stats API requests go to {url}')
+
+
+def install_from_env():
+    """
+    Calls use_standin when the STATSAPI_STANDIN environment variable is
+    set. Does nothing, and does not import requests, otherwise.
+    """
+    url = os.environ.get(ENV_VAR)
+    if url:
+        use_standin(url)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve recorded MLB Stats API responses')
+    parser.add_argument('fixtures', help='fixtures directory')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many more seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--record', action='store_true', help='save responses of the real API')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    standin = StandinServer(args.fixtures, args.port, args.latency, args.jitter,
+        args.error_rate, args.error_status, args.record, args.seed)
+    print(f'Serving {args.fixtures} on {standin.url}')
+    try:
+        standin.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(standin.stats)
@@ -0,0 +1,303 @@
+"""
+Bridges the game deltas the fetcher publishes to Server-Sent Events
+clients of the server's /stream endpoint. One Redis subscription feeds
+every client: each delta is encoded as an event once and put on the
+queue of every connected client.
+
+A client first gets a snapshot of every game and the gamecast, then
+the deltas:
+
+    event: snapshot
+    data: {"games": [...], "gamecast": {...}}
+
+    event: game
+    data: {"index": 3, "delta": {...}}
+
+    event: gamecast
+    data: {...}
+
+Deltas are JSON merge patches of absolute values, so a delta that was
+already part of the snapshot can be applied again without harm. When
+the fetcher starts over with a new slate of games, or a client falls
+QUEUE_SIZE events behind, the client gets a new snapshot.
+
+StreamHub serves the threaded Flask server, AsyncStreamHub the asyncio
+server in on_deck.async_server.
+"""
+
+import asyncio
+import queue
+import threading
+from typing import List
+
+# Events a client can fall behind before it gets a new snapshot instead
+QUEUE_SIZE = 256
+# Seconds without events before a comment is sent to keep the
+# connection open through proxies
+KEEPALIVE = 15
+KEEPALIVE_EVENT = b': keepalive\n\n'
+
+# Put on a client's queue when it needs a new snapshot
+RESYNC = None
+
+GAME_CHANNELS = '[0-9]*'
+
+
+def snapshot_event(snapshot: bytes) -> bytes:
+    """
+    Encodes a snapshot as an event. Clients retry after 5 seconds if
+    the connection drops.
+
+    Args:
+        snapshot (bytes): JSON with games and gamecast
+
+    Returns:
+        bytes: Event
+    """
+    return b'retry: 5000\nevent: snapshot\ndata: ' + snapshot + b'\n\n'
+
+
+def delta_event(channel: bytes, data: bytes) -> bytes:
+    """
+    Encodes a delta published on a game or the gamecast channel as an
+    event. The delta is copied in as it was published.
+
+    Args:
+        channel (bytes): Channel of the delta
+        data (bytes): JSON of the delta
+
+    Returns:
+        bytes: Event, None for other channels
+    """
+    if channel == b'gamecast':
+        return b'event: gamecast\ndata: ' + data + b'\n\n'
+    if channel.isdigit():
+        return b'event: game\ndata: {"index": ' + channel + b', "delta": ' + data + b'}\n\n'
+    return None
+
+
+class StreamHub:
+    """
+    Holds the one Redis subscription of the server and the queues of
+    the connected clients. The subscription is started with the first
+    client.
+
+    Args:
+        redis_client (redis.Redis): Redis client
+        queue_size (int): Events a client can fall behind
+    """
+    def __init__(self, redis_client, queue_size: int = QUEUE_SIZE):
+        self.redis = redis_client
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._clients: List[queue.Queue] = []
+        self._thread: threading.Thread = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    def subscribe(self) -> queue.Queue:
+        """
+        Adds a client.
+
+        Returns:
+            queue.Queue: Queue the client's events are put on
+        """
+        client = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._clients.append(client)
+        self.resubscribe()
+        return client
+
+    def resubscribe(self):
+        """
+        Starts the Redis subscription if it is not running, after the
+        first client joins or after the subscription was lost.
+        """
+        with self._lock:
+            if self._thread is None:
+                # Subscribed here rather than in the thread so the
+                # client's snapshot cannot miss a delta
+                pubsub = self.redis.pubsub()
+                pubsub.subscribe('gamecast', 'init')
+                pubsub.psubscribe(GAME_CHANNELS)
+                self._thread = threading.Thread(target=self._listen, args=(pubsub,),
+                    name='stream hub', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, client: queue.Queue):
+        """
+        Removes a client.
+
+        Args:
+            client (queue.Queue): Queue from subscribe
+        """
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def broadcast(self, event: bytes):
+        """
+        Puts an event on the queue of every client. Clients whose queue
+        is full lose their queued events and get RESYNC instead.
+
+        Args:
+            event (bytes): Event, or RESYNC
+        """
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(event)
+            except queue.Full:
+                while True:
+                    try:
+                        client.get_nowait()
+                    except queue.Empty:
+                        break
+                client.put_nowait(RESYNC)
+
+    def _listen(self, pubsub):
+        try:
+            while True:
+                message = pubsub.get_message(timeout=60)
+                if (not message) or (message['type'] not in ('message', 'pmessage')):
+                    continue
+                if message['channel'] == b'init':
+                    self.broadcast(RESYNC)
+                    continue
+                event = delta_event(message['channel'], message['data'])
+                if event is not None:
+                    self.broadcast(event)
+        except Exception as e:
+            print(f'Stream hub lost its subscription: {e}')
+            with self._lock:
+                self._thread = None
+            # Deltas were missed, the clients resubscribe and get a new
+            # snapshot
+            self.broadcast(RESYNC)
+
+    def events(self, snapshot):
+        """
+        Yields the events of one client until it disconnects.
+
+        Args:
+            snapshot (Callable[[], bytes]): Returns the JSON of a
+                snapshot
+
+        Yields:
+            bytes: Events
+        """
+        # Subscribed before the snapshot is read so no delta falls in
+        # between
+        client = self.subscribe()
+        try:
+            yield snapshot_event(snapshot())
+            while True:
+                try:
+                    event = client.get(timeout=KEEPALIVE)
+                except queue.Empty:
+                    yield KEEPALIVE_EVENT
+                    continue
+                if event is RESYNC:
+                    self.resubscribe()
+                    yield snapshot_event(snapshot())
+                else:
+                    yield event
+        finally:
+            self.unsubscribe(client)
+
+
+class AsyncStreamHub:
+    """
+    StreamHub for asyncio, with an async Redis client such as
+    redis.asyncio.Redis. Clients get asyncio queues.
+
+    Args:
+        redis_client (redis.asyncio.Redis): Redis client
+        queue_size (int): Events a client can fall behind
+    """
+    def __init__(self, redis_client, queue_size: int = QUEUE_SIZE):
+        self.redis = redis_client
+        self.queue_size = queue_size
+        self._clients: List[asyncio.Queue] = []
+        self._task: asyncio.Task = None
+        self._subscribed: asyncio.Event = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    async def subscribe(self) -> asyncio.Queue:
+        """
+        Adds a client. Returns once the Redis subscription is active.
+
+        Returns:
+            asyncio.Queue: Queue the client's events are put on
+        """
+        client = asyncio.Queue(maxsize=self.queue_size)
+        self._clients.append(client)
+        await self.resubscribe()
+        return client
+
+    async def resubscribe(self):
+        """
+        Starts the Redis subscription if it is not running and waits
+        until it is active or has failed. A failed subscription puts
+        RESYNC on every queue.
+        """
+        if self._task is None:
+            self._subscribed = asyncio.Event()
+            self._task = asyncio.ensure_future(self._listen(self._subscribed))
+        await self._subscribed.wait()
+
+    def unsubscribe(self, client: asyncio.Queue):
+        """
+        Removes a client.
+
+        Args:
+            client (asyncio.Queue): Queue from subscribe
+        """
+        if client in self._clients:
+            self._clients.remove(client)
+
+    def broadcast(self, event: bytes):
+        """
+        Puts an event on the queue of every client. Clients whose queue
+        is full lose their queued events and get RESYNC instead.
+
+        Args:
+            event (bytes): Event, or RESYNC
+        """
+        for client in self._clients:
+            try:
+                client.put_nowait(event)
+            except asyncio.QueueFull:
+                while not client.empty():
+                    client.get_nowait()
+                client.put_nowait(RESYNC)
+
+    async def _listen(self, subscribed: asyncio.Event):
+        try:
+            pubsub = self.redis.pubsub()
+            await pubsub.subscribe('gamecast', 'init')
+            await pubsub.psubscribe(GAME_CHANNELS)
+            subscribed.set()
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=60)
+                if (not message) or (message['type'] not in ('message', 'pmessage')):
+                    continue
+                if message['channel'] == b'init':
+                    self.broadcast(RESYNC)
+                    continue
+                event = delta_event(message['channel'], message['data'])
+                if event is not None:
+                    self.broadcast(event)
+        except Exception as e:
+            print(f'Stream hub lost its subscription: {e}')
+            self._task = None
+            # Lets subscribe return, the RESYNC makes its client and
+            # every other one resubscribe
+            subscribed.set()
+            self.broadcast(RESYNC)
@@ -0,0 +1,126 @@
+"""
+Board side of server side rendering. Draws the frames a renderer
+(on_deck.frame_stream) publishes instead of rendering the games
+itself. Every run of a frame is one horizontal line, drawn by the
+matrix library.
+
+    python -m on_deck.thin_client
+
+The board asks for a keyframe when it starts and whenever a frame is
+missing, and ignores deltas until the keyframe arrives.
+"""
+
+from typing import Dict
+
+import redis
+
+from on_deck.board import brightness_dict, get_options, get_redis
+from on_deck.frame_codec import iter_runs, read_header
+from on_deck.frame_stream import FRAME_CHANNEL, REQUEST_CHANNEL
+from on_deck.matrix_loader import RGBMatrix, RGBMatrixOptions, graphics
+from on_deck.metrics import registry
+
+FRAMES_DRAWN = registry.counter('thin_client_frames', 'Streamed frames drawn by the board')
+KEYFRAME_REQUESTS = registry.counter('thin_client_keyframe_requests',
+    'Keyframes the board asked for')
+
+
+class ThinClient:
+    """
+    Draws streamed frames onto the matrix.
+
+    Args:
+        redis_client (redis.Redis): Client the frames are published
+            with. Defaults to the scoreboard's Redis server
+        options (RGBMatrixOptions): Matrix options. Default to the
+            options of the board layout
+    """
+    def __init__(self, redis_client: redis.Redis = None, options: RGBMatrixOptions = None):
+        self.redis = redis_client if redis_client is not None else get_redis()
+        self.matrix = RGBMatrix(options=options if options is not None else get_options())
+        self.canvas = self.matrix.CreateFrameCanvas()
+        self._colors: Dict[bytes, graphics.Color] = {}
+        # Sequence number of the frame on the matrix, None until the
+        # first keyframe
+        self.seq: int = None
+
+        self.pubsub = self.redis.pubsub()
+        self.pubsub.subscribe(FRAME_CHANNEL, 'brightness')
+
+        try:
+            brightness = int(self.redis.get('brightness'))
+        except TypeError:
+            brightness = 3
+        self.matrix.brightness = brightness_dict[brightness]
+
+    def request_keyframe(self):
+        """Asks the renderer for a keyframe."""
+        self.seq = None
+        self.redis.publish(REQUEST_CHANNEL, 'keyframe')
+        KEYFRAME_REQUESTS.inc()
+
+    def _color(self, rgb: bytes) -> graphics.Color:
+        color = self._colors.get(rgb)
+        if color is None:
+            color = self._colors[rgb] = graphics.Color(rgb[0], rgb[1], rgb[2])
+        return color
+
+    def draw(self, message: bytes) -> bool:
+        """
+        Draws a frame if it follows the frame on the matrix or is a
+        newer keyframe.
+
+        Args:
+            message (bytes): Message from the renderer
+
+        Returns:
+            bool: If the frame was drawn
+        """
+        header = read_header(message)
+        if header.keyframe and ((header.width, header.height)
+                != (self.matrix.width, self.matrix.height)):
+            print(f'Frame is {header.width}x{header.height}, '
+                f'matrix is {self.matrix.width}x{self.matrix.height}')
+
+        if header.keyframe:
+            if (self.seq is not None) and (header.seq <= self.seq):
+                return False
+        elif self.seq is None:
+            return False
+        elif header.seq != self.seq + 1:
+            print(f'Missed frames {self.seq + 1} to {header.seq - 1}')
+            self.request_keyframe()
+            return False
+
+        canvas = self.canvas
+        for x, y, length, rgb in iter_runs(message):
+            graphics.DrawLine(canvas, x, y, x + length - 1, y, self._color(rgb))
+        self.matrix.SwapOnVSync(canvas)
+        self.seq = header.seq
+        FRAMES_DRAWN.inc()
+        return True
+
+    def start(self):
+        """Draws frames as they arrive."""
+        registry.connect(self.redis, 'thin_client')
+        self.request_keyframe()
+        while True:
+            message = self.pubsub.get_message(timeout=5)
+            if message is None:
+                # No keyframe in 5 seconds, the renderer may have missed
+                # the request
+                if self.seq is None:
+                    self.request_keyframe()
+                continue
+            if message['type'] != 'message':
+                continue
+
+            if message['channel'] == b'brightness':
+                self.matrix.brightness = brightness_dict[int(message['data'])]
+            else:
+                self.draw(message['data'])
+
+
+if __name__ == '__main__':
+    client = ThinClient()
+    client.start()
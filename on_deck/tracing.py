@@ -0,0 +1,254 @@
+"""
+Traces how long a change takes to get from the Stats API to the board.
+Tracing is turned on in the fetcher with ON_DECK_TRACE=1. The fetcher
+then sends a '_trace' dict of timestamps with every delta, the display
+adds its own and the time between them is collected per stage:
+
+    poll       previous_fetch -> fetch_start   time since the game was
+                                               last fetched, how old a
+                                               change can be when the
+                                               fetch that sees it starts
+    api        fetch_start -> fetched          Stats API request
+    fetcher    fetched -> published            diffing and hashing
+    transport  published -> received           Redis, the pubsub backlog
+                                               and the coalescing window
+    decode     received -> render_start        JSON decoding and merging
+    render     render_start -> rendered        drawing
+    swap       rendered -> swapped             waiting for the frame swap
+    total      fetch_start -> swapped
+
+Timestamps are unix times so stages that cross machines are only as
+accurate as their clocks are in sync.
+
+The display keeps a histogram per stage and saves them to Redis every
+few seconds under TRACE_KEY, the server serves them at /trace.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Sequence
+
+ENABLED = os.environ.get('ON_DECK_TRACE', '').lower() in ('1', 'true')
+
+TRACE_FIELD = '_trace'
+TRACE_KEY = 'trace_stats'
+
+# Seconds between saving the histograms to Redis
+SAVE_INTERVAL = 5
+
+STAGES = (
+    ('poll', 'previous_fetch', 'fetch_start'),
+    ('api', 'fetch_start', 'fetched'),
+    ('fetcher', 'fetched', 'published'),
+    ('transport', 'published', 'received'),
+    ('decode', 'received', 'render_start'),
+    ('render', 'render_start', 'rendered'),
+    ('swap', 'rendered', 'swapped'),
+    ('total', 'fetch_start', 'swapped'),
+)
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 60)
+
+
+class Histogram:
+    """
+    Counts observations into fixed buckets.
+
+    Args:
+        bounds (Sequence[float]): Upper bound of every bucket in
+            increasing order. Larger values go into an overflow bucket
+    """
+    def __init__(self, bounds: Sequence[float] = BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """
+        Adds an observation.
+
+        Args:
+            value (float): Observed value
+        """
+        i = 0
+        for bound in self.bounds:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the upper bound of the bucket the q quantile falls in,
+        or the largest observation for the overflow bucket.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float: Approximate quantile, 0 without observations
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        """
+        Returns the histogram with a few quantiles for serving as JSON.
+
+        Returns:
+            dict: count, sum, mean, max, p50, p90, p99 and buckets as
+                [upper bound, count] pairs with None for the overflow
+        """
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': [[bound, count] for bound, count
+                in zip(self.bounds + (None,), self.counts)],
+        }
+
+
+def start_trace(previous_fetch: float = None) -> dict:
+    """
+    Starts a trace when the fetcher starts fetching a game.
+
+    Args:
+        previous_fetch (float): When the same game was fetched before
+
+    Returns:
+        dict: Trace to send with the delta
+    """
+    trace = {'fetch_start': time.time()}
+    if previous_fetch is not None:
+        trace['previous_fetch'] = previous_fetch
+    return trace
+
+
+def stamp(trace: dict, name: str):
+    """
+    Adds a timestamp to a trace.
+
+    Args:
+        trace (dict): Trace, nothing happens if it is None
+        name (str): Name of the timestamp
+    """
+    if trace is not None:
+        trace[name] = time.time()
+
+
+class Tracer:
+    """
+    Collects the traces that arrive with deltas on the display. Traces
+    wait in a per thread list while their deltas are rendered, become
+    ready when their thread asks for a frame swap and are recorded
+    when the frame is swapped.
+    """
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {name: Histogram() for name, _, _ in STAGES}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ready: List[dict] = []
+        self._redis = None
+        self._last_save = time.monotonic()
+
+    def connect(self, redis_client):
+        """
+        Sets the Redis client the histograms are saved with.
+
+        Args:
+            redis_client (redis.Redis): Redis client
+        """
+        self._redis = redis_client
+
+    def rendering(self, traces: List[dict]):
+        """
+        Marks traces whose deltas are about to be drawn by this thread.
+
+        Args:
+            traces (List[dict]): Traces of the merged deltas
+        """
+        if not traces:
+            return
+        now = time.time()
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            pending = self._local.pending = []
+        for trace in traces:
+            trace['render_start'] = now
+            pending.append(trace)
+
+    def frame_ready(self):
+        """
+        Marks the traces this thread drew as rendered. They are recorded
+        with the next frame swap.
+        """
+        pending = getattr(self._local, 'pending', None)
+        if not pending:
+            return
+        now = time.time()
+        for trace in pending:
+            trace['rendered'] = now
+        with self._lock:
+            self._ready.extend(pending)
+        pending.clear()
+
+    def discard(self):
+        """Forgets the traces of this thread when nothing was drawn."""
+        pending = getattr(self._local, 'pending', None)
+        if pending:
+            pending.clear()
+
+    def swapped(self):
+        """Records the traces that were ready when a frame was swapped."""
+        if not self._ready:
+            return
+        now = time.time()
+        with self._lock:
+            ready, self._ready = self._ready, []
+            for trace in ready:
+                trace['swapped'] = now
+                for name, start, end in STAGES:
+                    if (start in trace) and (end in trace):
+                        self.histograms[name].observe(max(0.0, trace[end] - trace[start]))
+
+            save = (self._redis is not None) and (time.monotonic() - self._last_save >= SAVE_INTERVAL)
+            if save:
+                self._last_save = time.monotonic()
+                stats = self.stats()
+
+        if save:
+            self._redis.set(TRACE_KEY, json.dumps(stats))
+
+    def stats(self) -> dict:
+        """
+        Returns the histograms of every stage.
+
+        Returns:
+            dict: Time of the stats and a histogram dict per stage
+        """
+        return {
+            'time': time.time(),
+            'stages': {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+
+tracer = Tracer()
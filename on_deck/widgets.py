@@ -0,0 +1,126 @@
+"""
+Retained mode widget tree for the scoreboard layouts. Every section of
+the display is a widget with a bounding box and a dirty flag. Instead of
+clearing and drawing sections directly, the layout classes mark widgets
+dirty and the WidgetTree redraws them once per frame. Only the bounds
+of dirty widgets are cleared, and any other widget that shares part of
+that damage is redrawn on top in tree order so nothing is left wiped.
+"""
+
+import threading
+import time
+from typing import Callable, Iterator, List, Tuple
+
+from on_deck.display_manager import DisplayManager
+from on_deck.metrics import registry
+
+Bounds = Tuple[int, int, int, int]
+
+PANEL_RENDER_SECONDS = registry.histogram('panel_render_seconds', 'Time to draw one widget')
+
+def bounds_overlap(a: Bounds, b: Bounds) -> bool:
+    """
+    Checks if two inclusive (x1, y1, x2, y2) bounding boxes share at
+    least one pixel.
+
+    Args:
+        a (Bounds): First bounding box
+        b (Bounds): Second bounding box
+
+    Returns:
+        bool: True if the boxes overlap, False otherwise
+    """
+    return (a[0] <= b[2]) and (b[0] <= a[2]) and (a[1] <= b[3]) and (b[1] <= a[3])
+
+
+class Widget:
+    """
+    A section of the display. The bounds are inclusive pixel coordinates
+    (x1, y1, x2, y2), the same as DisplayManager.clear_section. Widgets
+    without a draw function are only used to group children. Widgets
+    start clean, the owner marks them dirty for their first paint.
+    """
+    def __init__(self, name: str, bounds: Bounds, draw: Callable[[], None] = None):
+        self.name = name
+        self.bounds = bounds
+        self.draw = draw
+        self.dirty = False
+        self.children: List['Widget'] = []
+
+    def add(self, child: 'Widget') -> 'Widget':
+        """
+        Adds a child widget. Children are drawn after their parent and
+        after any sibling that was added before them.
+
+        Args:
+            child (Widget): Widget to add
+
+        Returns:
+            Widget: The added widget
+        """
+        self.children.append(child)
+        return child
+
+    def walk(self) -> Iterator['Widget']:
+        """Yields this widget and all of its children in draw order."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class WidgetTree:
+    """
+    Holds the widgets of one layout and composites the dirty ones onto
+    the display. Marking and rendering are guarded by a lock since the
+    handlers draw from separate threads.
+    """
+    def __init__(self, display_manager: DisplayManager, root: Widget):
+        self.display_manager = display_manager
+        self.root = root
+        self._widgets = {widget.name: widget for widget in root.walk()}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, name: str) -> Widget:
+        return self._widgets[name]
+
+    def mark_dirty(self, *names: str):
+        """
+        Marks widgets as needing a redraw on the next render. Passing no
+        names marks every widget in the tree.
+
+        Args:
+            names (str): Names of the widgets to mark
+        """
+        with self._lock:
+            if not names:
+                names = self._widgets.keys()
+            for name in names:
+                self._widgets[name].dirty = True
+
+    def render(self) -> bool:
+        """
+        Clears the bounds of every dirty widget and redraws them, along
+        with any clean widget that overlaps the cleared area. Widgets
+        are drawn in tree order. Does not swap the frame.
+
+        Returns:
+            bool: True if anything was drawn, False otherwise
+        """
+        with self._lock:
+            widgets = [widget for widget in self.root.walk() if widget.draw is not None]
+            damage = [widget.bounds for widget in widgets if widget.dirty]
+
+            if not damage:
+                return False
+
+            for x1, y1, x2, y2 in damage:
+                self.display_manager.clear_section(x1, y1, x2, y2)
+
+            for widget in widgets:
+                if widget.dirty or any(bounds_overlap(widget.bounds, d) for d in damage):
+                    start = time.perf_counter()
+                    widget.draw()
+                    PANEL_RENDER_SECONDS.observe(time.perf_counter() - start, panel=widget.name)
+                    widget.dirty = False
+
+            return True